@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: building a new_event() payload from a dict literal vs. copying a pre-built template.
+
+new_event() builds its nine-key payload with a dict literal on every call, reading the URL, headers and
+default website and hostname from the Config snapshot that _config() keeps (rebuilt only when a
+setting changes). An alternative is to keep a payload template with the defaults filled in and
+copy it per event, setting only the fields that vary. This script times both, and _event_body()
+end to end for scale, so the choice can be re-checked on a given machine and Python.
+
+On CPython 3.11 the template copy saves a few hundred nanoseconds per payload, but the payload
+is a small part of _event_body(), which also validates the arguments and handles scoped(), sampling
+and dedup keys, and the saving did not show up in events/s for new_event() as a whole once it had
+to be kept in sync with every way a setting can change. That is why the SDK keeps the literal
+rather than caching templates. Timings on shared machines vary by tens of percent between runs;
+compare several runs before drawing conclusions.
+
+Run directly:  python umami/scripts/bench_event_body.py [--events 200000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # the umami/ project dir, for `import umami`
+
+import umami  # noqa: E402
+from umami import impl  # noqa: E402
+
+
+def literal_payload(event_name: str, url: str = '/') -> dict:
+    """The payload as _event_body() builds it: a fresh dict literal."""
+    config = impl._config()
+    return {
+        'hostname': config.hostname,
+        'language': 'en-US',
+        'referrer': '',
+        'screen': '1920x1080',
+        'title': event_name,
+        'url': url,
+        'website': config.website_id,
+        'name': event_name,
+        'data': {},
+    }
+
+
+def make_template() -> dict:
+    """A payload with the defaults filled in and placeholders for the per-event fields."""
+    return {**literal_payload(''), 'title': None, 'url': None, 'name': None, 'data': None}
+
+
+def template_payload(template: dict, event_name: str, url: str = '/') -> dict:
+    """The same payload built by copying `template` and setting the fields that vary."""
+    impl._config()  # a real cache would be looked up here, so both ways pay for one settings read
+    payload = template.copy()
+    payload['title'] = event_name
+    payload['url'] = url
+    payload['name'] = event_name
+    payload['data'] = {}
+    return payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    umami.set_url_base('https://umami.example.com')
+    umami.set_website_id('978435e2-7ba1-4337-9860-ec31ece2db60')
+    umami.set_hostname('example.com')
+    template = make_template()
+    assert literal_payload('signup', '/join') == template_payload(template, 'signup', '/join')
+    assert literal_payload('signup', '/join') == impl._event_body('signup', url='/join')['payload']
+
+    cases = {
+        'dict literal (current)': lambda: literal_payload('signup', '/join'),
+        'pre-built template, copied': lambda: template_payload(template, 'signup', '/join'),
+        '_event_body() end to end': lambda: impl._event_body('signup', url='/join'),
+    }
+
+    print(f'{args.events:,} events per run; best of {args.repeat} runs')
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.events, repeat=args.repeat))
+        print(f'  {name:<40} {args.events / best:12,.0f} events/s  {best / args.events * 1e9:8.0f} ns/event')
+
+
+if __name__ == '__main__':
+    main()
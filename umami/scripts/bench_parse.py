@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: parsing a 10k-website /api/websites response, old path vs. new.
+
+The SDK used to decode a response with `resp.json()` into Python dicts and then build the model
+from them (`models.WebsitesResponse(**data)`), walking the data twice. It now hands the raw bytes
+straight to pydantic's Rust JSON parser (`model_validate_json`, or a cached `TypeAdapter` for bare
+list types), which is what `umami.impl._parse()` does. This script times both on the same payload.
+
+Run directly:  python umami/scripts/bench_parse.py [--sites 10000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # the umami/ project dir, for `import umami`
+
+from umami.impl import _type_adapter  # noqa: E402
+
+from umami import models  # noqa: E402
+
+
+def make_payload(sites: int) -> bytes:
+    """A /api/websites page holding `sites` websites, as the server would send it."""
+    site = {
+        'name': 'Talk Python',
+        'domain': 'talkpython.fm',
+        'shareId': None,
+        'resetAt': None,
+        'userId': 'c0ffee00-0000-4000-8000-000000000000',
+        'createdAt': '2024-01-01T00:00:00.000Z',
+        'updatedAt': '2024-06-01T00:00:00.000Z',
+        'deletedAt': None,
+        'teamId': None,
+        'user': {'username': 'admin', 'id': 'c0ffee00-0000-4000-8000-000000000000'},
+    }
+    data = [{'id': f'00000000-0000-4000-8000-{n:012d}', **site} for n in range(sites)]
+    return json.dumps({'data': data, 'count': sites, 'page': 1, 'pageSize': sites}).encode('utf-8')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sites', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payload = make_payload(args.sites)
+    rows = json.dumps(json.loads(payload)['data']).encode('utf-8')
+    website_list = list[models.Website]
+
+    cases = {
+        'dict then model (old)': lambda: models.WebsitesResponse(**json.loads(payload)),
+        'model_validate_json (new)': lambda: models.WebsitesResponse.model_validate_json(payload),
+        'list: dicts then models (old)': lambda: [models.Website(**row) for row in json.loads(rows)],
+        'list: TypeAdapter.validate_json (new)': lambda: _type_adapter(website_list).validate_json(rows),
+    }
+
+    print(f'{args.sites:,} websites, {len(payload) / 1024:,.0f} KiB; best of {args.repeat} runs')
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f'  {name:<40} {best * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,82 @@
 """Shared test doubles and fixtures for the umami HTTP boundary.
 
-The SDK does ``import httpx2 as httpx`` and calls module-level ``httpx.get``/``httpx.post`` plus
-``httpx.AsyncClient()``. Tests patch ``umami.impl.httpx.*`` and assert on the request that would be
-sent. These builders centralize the mock plumbing so every test file shares one response contract.
+The SDK does ``import httpx2 as httpx``. Sync calls go through the ``umami.impl._http_get`` /
+``umami.impl._http_post`` seams (which wrap the shared, pooled client) and async calls go through
+``umami.impl._http_get_async`` / ``umami.impl._http_post_async`` (which wrap the running loop's pooled
+AsyncClient). Tests patch those seams and assert on the request that would be sent, or, to exercise
+the seams themselves (retries, timeouts, rate limits, encoding), route the pooled clients through
+recording_transport(). These builders centralize the mock plumbing so every test file shares one
+response contract.
 """
 
+import json
+from contextlib import contextmanager
 from datetime import datetime
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx2 as httpx
+
+import umami
 
 
 def mock_response(payload=None):
-    """A response stand-in exposing .json() and a no-op .raise_for_status()."""
+    """A response stand-in exposing .content (the JSON bytes), .json() and a no-op .raise_for_status()."""
+    payload = {} if payload is None else payload
     resp = MagicMock()
-    resp.json.return_value = {} if payload is None else payload
+    resp.content = json.dumps(payload).encode('utf-8')
+    resp.json.return_value = payload
     resp.raise_for_status = MagicMock()
     return resp
 
 
 def make_sync_mock(payload=None):
-    """Stand-in for httpx.get / httpx.post (returns the same response object each call)."""
+    """Stand-in for impl._http_get / impl._http_post (returns the same response object each call)."""
     return MagicMock(return_value=mock_response(payload))
 
 
 def make_async_client(payload=None):
-    """Stand-in for httpx.AsyncClient(); both .get and .post return the same response.
+    """Stand-in for the pooled httpx.AsyncClient; both .get and .post return the same response.
 
     Wiring both verbs is harmless when a test only uses one, and keeps the helper uniform.
     """
     resp = mock_response(payload)
     client = AsyncMock()
-    client.__aenter__ = AsyncMock(return_value=client)
-    client.__aexit__ = AsyncMock(return_value=False)
     client.get = AsyncMock(return_value=resp)
     client.post = AsyncMock(return_value=resp)
     return client
 
 
+@contextmanager
+def patch_async_client(client):
+    """Route the async seams to `client` (from make_async_client) so tests can assert on client.get/.post."""
+    with patch('umami.impl._http_get_async', client.get), patch('umami.impl._http_post_async', client.post):
+        yield client
+
+
+def recording_transport(monkeypatch, respond=None):
+    """Route the sync pool and every loop's async pool through one httpx.MockTransport; returns its requests.
+
+    `respond(request)` returns the httpx.Response for each request (or raises, like a failing network);
+    by default every request gets a 200 with an empty JSON object. The returned list fills as requests
+    are sent.
+    """
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={}) if respond is None else respond(request)
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(umami.impl, '_client', httpx.Client(transport=transport, follow_redirects=True))
+    async_client = httpx.AsyncClient(transport=transport, follow_redirects=True)
+
+    async def get_async_client():
+        return async_client
+
+    monkeypatch.setattr(umami.impl, '_get_async_client', get_async_client)
+    return seen
+
+
 # A minimal but valid WebsiteStats payload (see models.WebsiteStats).
 STATS_JSON = {
     'pageviews': 10,
@@ -13,3 +13,14 @@ def _setup_umami():
     umami.clear_cloud_api_key()  # ensure no Cloud-mode state leaks between tests
     yield
     umami.clear_cloud_api_key()  # tear down Cloud mode set during a test
+    umami.stop_background_sender()  # join any worker thread a test started
+    umami.stop_counters()
+    umami.stop_spool()  # stop any spool drainer a test started
+    umami.configure(transport='http')  # back to direct HTTP; also drops any pooled client a test created
+    umami.clear_circuit_breaker()
+    umami.clear_dedup_window()
+    umami.clear_sampling()
+    umami.clear_rate_limits()
+    umami.set_compression(None)
+    umami.set_exit_flush()  # default exit behavior, no SIGTERM handler
+    umami.set_retry_policy(max_attempts=1)  # retries stay off unless a test turns them on
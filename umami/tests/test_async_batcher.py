@@ -0,0 +1,139 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import make_async_client, make_sync_mock, patch_async_client
+from umami.impl.background import AsyncBatcher
+
+import umami
+
+
+class TestBufferedAsyncSends:
+    """buffered=True queues on the loop's AsyncBatcher and returns before anything is sent."""
+
+    async def test_buffered_events_are_sent_together_on_flush(self):
+        client = make_async_client({'size': 3})
+        with patch_async_client(client):
+            await umami.start_async_batcher(flush_interval=10)
+            assert await umami.new_event_async(event_name='a', buffered=True) == {}
+            await umami.new_revenue_event_async(revenue=5.0, buffered=True)
+            await umami.new_events_async([{'event_name': 'c'}], buffered=True)
+            client.post.assert_not_called()
+
+            await umami.flush_async()
+
+        client.post.assert_called_once()
+        assert client.post.call_args.args[0] == 'https://example.com/api/batch'
+        names = [b['payload']['name'] for b in client.post.call_args.kwargs['json']]
+        assert names == ['a', 'revenue', 'c']
+
+    async def test_single_buffered_event_uses_send_endpoint(self):
+        client = make_async_client()
+        with patch_async_client(client):
+            await umami.new_page_view_async('Home', '/', buffered=True)
+            await umami.flush_async()
+
+        assert client.post.call_args.args[0] == 'https://example.com/api/send'
+        assert client.post.call_args.kwargs['json']['payload']['title'] == 'Home'
+
+    async def test_batch_size_caps_each_request(self):
+        client = make_async_client()
+        with patch_async_client(client):
+            await umami.start_async_batcher(batch_size=2, flush_interval=10)
+            for name in 'abc':
+                await umami.new_event_async(event_name=name, buffered=True)
+            await umami.flush_async()
+
+        sizes = [len(c.kwargs['json']) if isinstance(c.kwargs['json'], list) else 1 for c in client.post.call_args_list]
+        assert sizes == [2, 1]
+
+    async def test_send_errors_are_not_raised(self):
+        client = make_async_client()
+        client.post = AsyncMock(side_effect=Exception('down'))
+        with patch_async_client(client):
+            await umami.new_event_async(event_name='e', buffered=True)
+            await umami.flush_async()
+        assert umami.impl._async_batchers[asyncio.get_running_loop()].failed == 1
+
+    async def test_validation_happens_before_buffering(self):
+        with pytest.raises(umami.errors.ValidationError):
+            await umami.new_event_async(event_name=' ', buffered=True)
+
+    async def test_flush_without_batcher_is_a_no_op(self):
+        await umami.flush_async()
+
+    async def test_invalid_settings_raise(self):
+        with pytest.raises(umami.errors.ValidationError):
+            await umami.start_async_batcher(batch_size=0)
+
+    def test_loop_shutdown_sends_what_is_still_buffered(self):
+        client = make_async_client()
+
+        async def app():
+            await umami.start_async_batcher(flush_interval=60)
+            await umami.new_event_async(event_name='last-words', buffered=True)
+            await asyncio.sleep(0)  # let the batcher pick it up; it now waits on flush_interval
+
+        with patch_async_client(client):
+            asyncio.run(app())
+
+        client.post.assert_called_once()
+        assert client.post.call_args.kwargs['json']['payload']['name'] == 'last-words'
+        assert len(umami.impl._async_batchers) == 0
+
+
+class TestAsyncBatcherCancellation:
+    async def test_batch_in_flight_is_not_resent_and_join_does_not_hang(self):
+        sending = asyncio.Event()
+        sent = []
+
+        async def send(bodies, headers):
+            sent.append([body['n'] for body in bodies])
+            if len(sent) == 1:
+                sending.set()
+                await asyncio.sleep(60)
+
+        batcher = AsyncBatcher(send, batch_size=2, flush_interval=0)
+        batcher.submit({'n': 1}, {})
+        batcher.submit({'n': 2}, {})
+        await sending.wait()
+        batcher.submit({'n': 3}, {})
+
+        batcher._task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batcher._task
+        assert sent == [[1, 2], [3]]
+        await asyncio.wait_for(batcher._queue.join(), 1)
+
+
+class TestBufferedSyncSends:
+    """The sync twins accept buffered=True too, queueing on the background sender."""
+
+    def test_buffered_queues_without_starting_the_background_sender(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            assert umami.new_event(event_name='e', buffered=True) == {}
+            assert umami.impl._background is None
+            assert umami.flush(timeout=5) == 0
+
+        assert mock_post.call_args.kwargs['json']['payload']['name'] == 'e'
+
+    def test_unbuffered_sends_stay_inline_after_a_buffered_one(self):
+        with patch('umami.impl._http_post', make_sync_mock()):
+            umami.new_event(event_name='queued', buffered=True)
+            assert umami.flush(timeout=5) == 0
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_event(event_name='inline')
+            mock_post.assert_called_once()  # sent before new_event() returned
+
+        with patch('umami.impl._http_post', side_effect=httpx.ConnectError('down')):
+            with pytest.raises(httpx.ConnectError):
+                umami.new_event(event_name='inline')
+
+    def test_stop_background_sender_drains_buffered_events(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_event(event_name='e', buffered=True)
+            assert umami.stop_background_sender(timeout=5)
+            assert umami.impl._call_buffer is None
+
+        mock_post.assert_called_once()
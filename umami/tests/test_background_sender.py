@@ -0,0 +1,142 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from _mocks import make_sync_mock
+from umami.impl.background import BackgroundSender
+
+import umami
+
+
+class TestBackgroundSendFunctions:
+    """With the background sender running, sync sends enqueue and return {} right away."""
+
+    def test_new_event_is_queued_and_sent_on_worker(self):
+        umami.start_background_sender()
+        with patch('umami.impl._http_post', make_sync_mock({'sent': True})) as mock_post:
+            result = umami.new_event(event_name='e', url='/x')
+            assert umami.stop_background_sender(timeout=5)
+
+        assert result == {}
+        assert mock_post.call_args.args[0] == 'https://example.com/api/send'
+        assert mock_post.call_args.kwargs['json']['payload']['name'] == 'e'
+
+    def test_page_view_keeps_its_user_agent(self):
+        umami.start_background_sender()
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_page_view('Home', '/', ua='Custom-UA')
+            umami.stop_background_sender(timeout=5)
+
+        assert mock_post.call_args.kwargs['headers']['User-Agent'] == 'Custom-UA'
+
+    def test_caller_does_not_wait_for_the_server(self):
+        release = threading.Event()
+        resp = make_sync_mock().return_value
+        slow_post = MagicMock(side_effect=lambda *a, **kw: release.wait(5) and resp)
+
+        umami.start_background_sender()
+        with patch('umami.impl._http_post', slow_post):
+            umami.new_event(event_name='e')  # would block for 5s if sent inline
+            release.set()
+            umami.stop_background_sender(timeout=5)
+        slow_post.assert_called_once()
+
+    def test_errors_are_not_raised_to_the_caller(self):
+        umami.start_background_sender()
+        with patch('umami.impl._http_post', MagicMock(side_effect=Exception('down'))):
+            assert umami.new_event(event_name='e') == {}
+            sender = umami.impl._background
+            umami.stop_background_sender(timeout=5)
+        assert sender.failed == 1
+
+    def test_validation_still_runs_on_the_calling_thread(self):
+        umami.start_background_sender()
+        with pytest.raises(umami.errors.ValidationError):
+            umami.new_event(event_name='   ')
+
+    def test_stop_restores_inline_sending(self):
+        umami.start_background_sender()
+        umami.stop_background_sender()
+        with patch('umami.impl._http_post', make_sync_mock({'sent': True})):
+            assert umami.new_event(event_name='e') == {'sent': True}
+
+    def test_start_twice_keeps_one_worker(self):
+        umami.start_background_sender()
+        first = umami.impl._background
+        umami.start_background_sender()
+        assert umami.impl._background is first
+
+    @pytest.mark.parametrize(
+        'kwargs', [{'max_queue_size': 0}, {'max_queue_size': True}, {'batch_size': 0}, {'flush_interval': -1}]
+    )
+    def test_invalid_settings_raise(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.start_background_sender(**kwargs)
+
+
+class TestBackgroundBatching:
+    """With batch_size > 1 the worker posts queued events together to /api/batch."""
+
+    def test_queued_events_share_one_batch_request(self):
+        umami.stop_background_sender()
+        with patch('umami.impl._http_post', make_sync_mock({'size': 3})) as mock_post:
+            umami.start_background_sender(batch_size=3, flush_interval=5)
+            for name in ('a', 'b', 'c'):
+                umami.new_event(event_name=name)
+            umami.stop_background_sender(timeout=5)
+
+        mock_post.assert_called_once()
+        assert mock_post.call_args.args[0] == 'https://example.com/api/batch'
+        assert [b['payload']['name'] for b in mock_post.call_args.kwargs['json']] == ['a', 'b', 'c']
+
+    def test_partial_batch_is_flushed_after_interval(self):
+        sent = threading.Event()
+        mock_post = MagicMock(side_effect=lambda *a, **kw: sent.set() or make_sync_mock().return_value)
+        with patch('umami.impl._http_post', mock_post):
+            umami.start_background_sender(batch_size=100, flush_interval=0.05)
+            umami.new_event(event_name='lonely')
+            assert sent.wait(5)  # well before batch_size is reached
+            umami.stop_background_sender(timeout=5)
+
+        # A batch of one goes to the plain /api/send endpoint.
+        assert mock_post.call_args.args[0] == 'https://example.com/api/send'
+
+
+class TestBackgroundSender:
+    def test_full_queue_drops_instead_of_blocking(self):
+        sender = BackgroundSender(MagicMock(), max_queue_size=2)  # not started, so nothing drains
+        assert sender.submit({}, {}) is True
+        assert sender.submit({}, {}) is True
+        assert sender.submit({}, {}) is False
+        assert sender.dropped == 1
+
+    def test_stop_drains_queued_items_in_order(self):
+        send = MagicMock()
+        sender = BackgroundSender(send)
+        for i in range(5):
+            sender.submit({'i': i}, {})
+        sender.start()
+
+        assert sender.stop(timeout=5) is True
+        assert [c.args[0] for c in send.call_args_list] == [[{'i': i}] for i in range(5)]
+        assert sender.sent == 5
+
+    def test_batches_respect_size_and_split_by_headers(self):
+        send = MagicMock()
+        sender = BackgroundSender(send, batch_size=3, flush_interval=5)
+        for i in range(4):
+            sender.submit({'i': i}, {'User-Agent': 'A'})
+        sender.submit({'i': 4}, {'User-Agent': 'B'})
+        sender.start()
+        sender.stop(timeout=5)
+
+        calls = [([b['i'] for b in c.args[0]], c.args[1]['User-Agent']) for c in send.call_args_list]
+        assert calls == [([0, 1, 2], 'A'), ([3], 'A'), ([4], 'B')]
+
+    def test_failed_batch_counts_every_event(self):
+        sender = BackgroundSender(MagicMock(side_effect=Exception('down')), batch_size=10, flush_interval=5)
+        for i in range(3):
+            sender.submit({'i': i}, {})
+        sender.start()
+        sender.stop(timeout=5)
+        assert (sender.sent, sender.failed) == (0, 3)
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+import pytest
+from _mocks import make_async_client, make_sync_mock, patch_async_client
+
+import umami
+
+_EVENTS = [
+    {'event_name': 'signup', 'url': '/join'},
+    {'event_name': 'download', 'url': '/files', 'custom_data': {'file': 'guide.pdf'}, 'distinct_id': 42},
+]
+
+
+class TestNewEvents:
+    """new_events() sends every item in one /api/batch request."""
+
+    def test_posts_one_batch_request(self):
+        with patch('umami.impl._http_post', make_sync_mock({'size': 2, 'processed': 2})) as mock_post:
+            result = umami.new_events(_EVENTS)
+
+        mock_post.assert_called_once()
+        assert mock_post.call_args.args[0] == 'https://example.com/api/batch'
+        assert result == {'size': 2, 'processed': 2}
+
+    def test_bodies_match_new_event(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_events(_EVENTS)
+        batch = mock_post.call_args.kwargs['json']
+
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            for event in _EVENTS:
+                umami.new_event(**event)
+        singles = [c.kwargs['json'] for c in mock_post.call_args_list]
+
+        assert batch == singles
+        assert batch[1]['payload']['id'] == '42'
+
+    def test_cloud_routes_to_cloud_batch(self):
+        umami.set_cloud_api_key('cloud-key')
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_events(_EVENTS)
+        assert mock_post.call_args.args[0] == 'https://cloud.umami.is/api/batch'
+
+    def test_one_invalid_item_sends_nothing(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            with pytest.raises(umami.errors.ValidationError):
+                umami.new_events([{'event_name': 'ok'}, {'event_name': '  '}])
+            with pytest.raises(umami.errors.ValidationError):
+                umami.new_events([{'event_name': 'ok'}, 'not-a-dict'])  # type: ignore[list-item]
+        mock_post.assert_not_called()
+
+    @pytest.mark.parametrize(
+        'event', [{'event_name': 'a', 'bogus': 1}, {'event_name': 'a', 'sample': False}, {'url': '/'}]
+    )
+    def test_unknown_or_missing_arguments_are_validation_errors(self, event):
+        umami.set_sampling(default_rate=0.0)  # sample=False would otherwise have sent the event anyway
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            with pytest.raises(umami.errors.ValidationError):
+                umami.new_events([event])
+        mock_post.assert_not_called()
+
+    @pytest.mark.parametrize('disable, events', [(True, _EVENTS), (False, [])])
+    def test_no_request_when_disabled_or_empty(self, disable, events):
+        if disable:
+            umami.disable()
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            assert umami.new_events(events) == {}
+        mock_post.assert_not_called()
+
+    async def test_async_parity(self):
+        with patch('umami.impl._http_post', make_sync_mock({'size': 2})) as mock_post:
+            sync_result = umami.new_events(_EVENTS)
+
+        client = make_async_client({'size': 2})
+        with patch_async_client(client):
+            async_result = await umami.new_events_async(_EVENTS)
+
+        assert client.post.call_args.args[0] == mock_post.call_args.args[0]
+        assert client.post.call_args.kwargs['json'] == mock_post.call_args.kwargs['json']
+        assert sync_result == async_result
@@ -0,0 +1,176 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from umami.impl.buffer import EventBuffer
+
+import umami
+
+
+def drain(buffer):
+    items = []
+    while buffer.qsize():
+        items.append(buffer.get_nowait())
+    return items
+
+
+class TestEventBuffer:
+    def test_bounded_by_bytes_not_count(self):
+        buffer = EventBuffer(max_items=100, max_bytes=10)
+        assert buffer.put('a', 6) == (True, 0)
+        assert buffer.put('b', 5) == (False, 0)
+        assert buffer.put('c', 4) == (True, 0)
+        assert (buffer.qsize(), buffer.nbytes) == (2, 10)
+        assert buffer.dropped == {'full': 1}
+        assert buffer.dropped_bytes == 5
+
+    def test_drop_oldest_evicts_until_the_new_item_fits(self):
+        buffer = EventBuffer(max_items=100, max_bytes=10, overflow='drop_oldest')
+        for name in 'abc':
+            buffer.put(name, 3)
+        assert buffer.put('d', 6) == (True, 2)
+        assert drain(buffer) == ['c', 'd']
+        assert buffer.dropped == {'evicted': 2}
+
+    def test_drop_oldest_never_evicts_control_items(self):
+        buffer = EventBuffer(max_items=1, overflow='drop_oldest')
+        stop = object()
+        buffer.put('a')
+        buffer.put_control(stop)
+        buffer.put('b')
+        assert [buffer.get_nowait(), buffer.get_nowait()] == [stop, 'b']
+
+    def test_block_waits_for_room(self):
+        buffer = EventBuffer(max_items=1, overflow='block', block_timeout=5)
+        buffer.put('a')
+        threading.Timer(0.05, buffer.get).start()
+        assert buffer.put('b') == (True, 0)
+        assert drain(buffer) == ['b']
+
+    def test_block_gives_up_after_the_timeout(self):
+        buffer = EventBuffer(max_items=1, overflow='block', block_timeout=0.05)
+        buffer.put('a')
+        started = time.monotonic()
+        assert buffer.put('b') == (False, 0)
+        assert time.monotonic() - started < 1
+        assert buffer.dropped == {'block_timeout': 1}
+
+    def test_spill_hands_over_what_does_not_fit(self):
+        spill = MagicMock(return_value=True)
+        buffer = EventBuffer(max_items=1, overflow='spill', spill=spill)
+        buffer.put('a')
+        assert buffer.put('b') == (False, 0)
+        spill.assert_called_once_with('b')
+        assert (buffer.spilled, buffer.dropped) == (1, {})
+
+    def test_failed_spill_is_dropped(self):
+        buffer = EventBuffer(max_items=1, overflow='spill', spill=MagicMock(return_value=False))
+        buffer.put('a')
+        buffer.put('b')
+        assert buffer.dropped == {'spill_failed': 1}
+
+    def test_item_larger_than_the_whole_buffer(self):
+        buffer = EventBuffer(max_items=10, max_bytes=10, overflow='drop_oldest')
+        buffer.put('a', 5)
+        assert buffer.put('huge', 11) == (False, 0)
+        assert drain(buffer) == ['a']
+        assert buffer.dropped == {'too_large': 1}
+
+    def test_first_drop_of_a_run_is_logged(self, caplog):
+        buffer = EventBuffer(max_items=1)
+        buffer.put('a')
+        buffer.put('b')
+        buffer.put('c')
+        assert caplog.text.count('dropping events') == 1
+
+    def test_one_warning_per_overflow_episode(self, caplog):
+        buffer = EventBuffer(max_items=10)
+        for n in range(10):
+            buffer.put(n)
+        for _ in range(300):  # a slow consumer that frees one slot while three events arrive
+            buffer.get_nowait()
+            for n in range(3):
+                buffer.put(n)
+        assert buffer.dropped == {'full': 600}
+        assert caplog.text.count('dropping events') == 1
+
+        drain(buffer)
+        for n in range(11):
+            buffer.put(n)
+        assert caplog.text.count('dropping events') == 2  # drained, then overflowed again
+
+
+class TestBackgroundSenderBuffer:
+    @pytest.fixture
+    def stalled(self):
+        """Start senders whose worker takes the first event and then waits until the test ends."""
+        release = threading.Event()
+        taken = threading.Event()
+
+        def deliver(bodies, headers, **kwargs):
+            taken.set()
+            release.wait(5)
+
+        def start(**settings):
+            with patch('umami.impl._deliver', deliver):
+                umami.start_background_sender(**settings)
+            umami.new_event(event_name='in-flight')
+            assert taken.wait(5)
+
+        yield start
+        release.set()
+
+    def test_events_are_measured_by_serialized_size(self, stalled):
+        stalled(max_buffer_bytes=1000)
+        umami.new_event(event_name='small')
+        umami.new_event(event_name='big', custom_data={'blob': 'x' * 1000})
+
+        stats = umami.buffer_stats()
+        assert stats['queued'] == 1
+        assert 0 < stats['queued_bytes'] < 1000
+        assert stats['dropped'] == {'too_large': 1}
+        assert stats['dropped_bytes'] > 1000
+
+    def test_drop_oldest_keeps_the_newest_events(self, stalled):
+        stalled(max_queue_size=2, overflow='drop_oldest')
+        for n in range(5):
+            umami.new_event(event_name=f'e{n}')
+
+        assert umami.buffer_stats()['dropped'] == {'evicted': 3}
+        queued = [body['payload']['name'] for body, _ in drain(umami.impl._background.buffer)]
+        assert queued == ['e3', 'e4']
+
+    def test_spill_writes_overflow_to_the_spool(self, stalled, tmp_path):
+        umami.start_spool(str(tmp_path / 'spool.db'), check_interval=60)
+        stalled(max_queue_size=1, overflow='spill')
+        for n in range(3):
+            umami.new_event(event_name=f'e{n}')
+
+        spool = umami.impl._spool
+        assert umami.buffer_stats()['spilled'] == len(spool) == 2
+        assert [body['payload']['name'] for _, body, _ in spool.peek(10)] == ['e1', 'e2']
+
+    def test_spill_without_a_spool_drops(self, stalled):
+        stalled(max_queue_size=1, overflow='spill')
+        umami.new_event(event_name='e0')
+        umami.new_event(event_name='e1')
+
+        assert umami.buffer_stats()['dropped'] == {'spill_failed': 1}
+        assert umami.impl._background.unsent == 2  # the in-flight event and e0
+
+    def test_no_stats_without_a_sender(self):
+        assert umami.buffer_stats() is None
+
+    @pytest.mark.parametrize(
+        'kwargs',
+        [
+            {'max_buffer_bytes': 0},
+            {'max_buffer_bytes': 1.5},
+            {'overflow': 'drop_everything'},
+            {'block_timeout': -1},
+        ],
+    )
+    def test_invalid_settings_raise(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.start_background_sender(**kwargs)
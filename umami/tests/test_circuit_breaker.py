@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import make_sync_mock
+from umami.errors import CircuitOpenError
+from umami.impl.breaker import CircuitBreaker
+
+import umami
+
+
+def connect_error(*args, **kwargs):
+    raise httpx.ConnectError('connection refused')
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()  # resets the count
+        breaker.record_failure()
+        assert breaker.state == 'closed'
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        assert not breaker.allow()
+        breaker.close()
+
+    def test_probe_moves_to_half_open_and_one_trial_closes(self):
+        changes = []
+        half_open = threading.Event()
+
+        def on_change(old, new):
+            changes.append((old, new))
+            if new == 'half_open':
+                half_open.set()
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01, probe=lambda: True, on_state_change=on_change)
+        breaker.record_failure()
+        assert half_open.wait(5)
+
+        assert breaker.allow()
+        assert not breaker.allow()  # only one trial request at a time
+        breaker.record_success()
+        assert changes == [('closed', 'open'), ('open', 'half_open'), ('half_open', 'closed')]
+
+    def test_failed_trial_reopens(self):
+        half_open = threading.Event()
+        breaker = CircuitBreaker(
+            failure_threshold=1,
+            reset_timeout=0.01,
+            on_state_change=lambda old, new: new == 'half_open' and half_open.set(),
+        )
+        breaker.record_failure()
+        assert half_open.wait(5)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        breaker.close()
+
+    def test_stays_open_while_probe_fails(self):
+        probed = threading.Event()
+
+        def probe():
+            probed.set()
+            return False
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01, probe=probe)
+        breaker.record_failure()
+        assert probed.wait(5)
+        assert breaker.state == 'open'
+        breaker.close()
+
+    def test_callback_errors_are_swallowed(self):
+        callback = MagicMock(side_effect=ValueError)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, on_state_change=callback)
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        callback.assert_called_once_with('closed', 'open')
+        breaker.close()
+
+
+class TestSendThroughBreaker:
+    def test_fails_fast_once_open(self):
+        umami.set_circuit_breaker(failure_threshold=2, reset_timeout=60)
+        with patch('umami.impl._http_post', MagicMock(side_effect=connect_error)) as mock_post:
+            for _ in range(2):
+                with pytest.raises(httpx.ConnectError):
+                    umami.new_event(event_name='e')
+            with pytest.raises(CircuitOpenError):
+                umami.new_event(event_name='e')
+        assert mock_post.call_count == 2
+
+    def test_client_errors_do_not_open_it(self):
+        umami.set_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        resp = httpx.Response(400, request=httpx.Request('POST', 'https://example.com/api/send'))
+        with patch('umami.impl._http_post', MagicMock(return_value=resp)):
+            with pytest.raises(httpx.HTTPStatusError):
+                umami.new_event(event_name='e')
+        assert umami.impl._breaker.state == 'closed'
+
+    def test_queries_are_not_blocked(self):
+        umami.set_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        umami.impl._breaker.record_failure()
+        with patch('umami.impl._http_get', make_sync_mock()):
+            assert umami.heartbeat() is True
+
+    def test_open_breaker_diverts_to_spool(self, tmp_path):
+        umami.start_spool(str(tmp_path / 'spool.db'), check_interval=60)
+        umami.set_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        umami.impl._breaker.record_failure()
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            assert umami.new_event(event_name='e') == {}
+        mock_post.assert_not_called()
+        assert len(umami.impl._spool) == 1
+
+    async def test_async_fails_fast_once_open(self):
+        umami.set_circuit_breaker(failure_threshold=1, reset_timeout=60)
+        with patch('umami.impl._http_post_async', AsyncMock(side_effect=connect_error)) as mock_post:
+            with pytest.raises(httpx.ConnectError):
+                await umami.new_event_async(event_name='e')
+            with pytest.raises(CircuitOpenError):
+                await umami.new_event_async(event_name='e')
+        assert mock_post.await_count == 1
+
+    def test_recovers_after_heartbeat(self):
+        half_open = threading.Event()
+        umami.set_circuit_breaker(
+            failure_threshold=1,
+            reset_timeout=0.01,
+            on_state_change=lambda old, new: new == 'half_open' and half_open.set(),
+        )
+        with patch('umami.impl._http_get', make_sync_mock()), patch('umami.impl._http_post', make_sync_mock({'ok': 1})):
+            umami.impl._breaker.record_failure()
+            assert half_open.wait(5)
+            assert umami.new_event(event_name='e') == {'ok': 1}
+        assert umami.impl._breaker.state == 'closed'
+
+    @pytest.mark.parametrize('kwargs', [{'failure_threshold': 0}, {'reset_timeout': 0}])
+    def test_invalid_settings(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_circuit_breaker(**kwargs)
+
+
+class TestHalfOpenTrial:
+    @pytest.fixture
+    def half_open(self):
+        """Set a breaker with a 0.2s reset timeout and wait until it is half-open."""
+        reached = threading.Event()
+        umami.set_circuit_breaker(
+            failure_threshold=1,
+            reset_timeout=0.2,
+            on_state_change=lambda old, new: new == 'half_open' and reached.set(),
+        )
+        with patch('umami.impl._http_get', make_sync_mock()):
+            umami.impl._breaker.record_failure()
+            assert reached.wait(5)
+        return umami.impl._breaker
+
+    def test_released_trial_lets_the_next_one_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker._state = 'half_open'
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.release_trial()
+        assert breaker.allow()
+
+    def test_stuck_trial_times_out(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker._state = 'half_open'
+        assert breaker.allow()
+        assert not breaker.allow()
+        time.sleep(0.06)
+        assert breaker.allow()
+
+    async def test_cancelled_trial_does_not_wedge_the_breaker(self, half_open):
+        started = asyncio.Event()
+
+        async def hang(*args, **kwargs):
+            started.set()
+            await asyncio.sleep(60)
+
+        with patch('umami.impl._http_post_async', hang):
+            task = asyncio.create_task(umami.new_event_async(event_name='trial'))
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with patch('umami.impl._http_post_async', AsyncMock(return_value=make_sync_mock({'ok': 1}).return_value)):
+            assert await umami.new_event_async(event_name='next') == {'ok': 1}
+        assert half_open.state == 'closed'
+
+    def test_interrupted_sync_trial_is_released(self, half_open):
+        with patch('umami.impl._http_post', MagicMock(side_effect=KeyboardInterrupt)):
+            with pytest.raises(KeyboardInterrupt):
+                umami.new_event(event_name='trial')
+        with patch('umami.impl._http_post', make_sync_mock({'ok': 1})):
+            assert umami.new_event(event_name='next') == {'ok': 1}
+        assert half_open.state == 'closed'
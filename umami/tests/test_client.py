@@ -0,0 +1,170 @@
+import dataclasses
+import threading
+from unittest.mock import patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import END, START, STATS_JSON, make_async_client, make_sync_mock, patch_async_client
+
+import umami
+
+LOGIN_JSON = {
+    'token': 'new-token',
+    'user': {'id': 'u1', 'username': 'admin', 'role': 'admin', 'createdAt': '2026-01-01T00:00:00Z', 'isAdmin': True},
+}
+
+
+@pytest.fixture
+def tenant():
+    with umami.Client('https://tenant.example.com/', auth_token='tenant-token', website_id='w1', hostname='t.com') as c:
+        yield c
+
+
+class TestClient:
+    def test_events_use_the_clients_settings(self, tenant):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            tenant.new_event(event_name='signup')
+
+        assert mock_post.call_args.args[0] == 'https://tenant.example.com/api/send'
+        assert mock_post.call_args.kwargs['headers']['Authorization'] == 'Bearer tenant-token'
+        payload = mock_post.call_args.kwargs['json']['payload']
+        assert (payload['website'], payload['hostname']) == ('w1', 't.com')
+
+    def test_module_functions_keep_the_global_settings(self, tenant):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            tenant.new_event(event_name='e')
+            umami.new_event(event_name='e')
+
+        assert mock_post.call_args.args[0] == 'https://example.com/api/send'
+        assert mock_post.call_args.kwargs['json']['payload']['website'] == 'test-website-id'
+
+    def test_base_class_cannot_be_instantiated(self):
+        with pytest.raises(TypeError):
+            umami.impl.client._BaseClient('https://tenant.example.com')
+
+    def test_login_keeps_the_token_on_the_client(self):
+        client = umami.Client('https://tenant.example.com')
+        assert not client.is_logged_in()
+        with patch('umami.impl._http_post', make_sync_mock(LOGIN_JSON)):
+            client.login('admin', 'secret')
+
+        assert client.config.auth_token == 'new-token'
+        assert client.is_logged_in()
+        assert umami.impl.auth_token != 'new-token'
+
+    def test_cloud_client(self):
+        client = umami.Client(api_key='key', cloud_region='eu', website_id='w1')
+        with patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get:
+            client.website_stats(START, END)
+
+        assert mock_get.call_args.args[0] == 'https://api.umami.is/v1/eu/websites/w1/stats'
+        assert mock_get.call_args.kwargs['headers']['x-umami-api-key'] == 'key'
+
+    def test_clients_side_by_side_on_threads(self):
+        clients = [
+            umami.Client(f'https://t{n}.example.com', auth_token=f'tok{n}', website_id=f'w{n}', hostname='h')
+            for n in range(8)
+        ]
+        seen = []
+
+        def post(url, **kwargs):
+            seen.append((url, kwargs['headers']['Authorization'], kwargs['json']['payload']['website']))
+            return make_sync_mock().return_value
+
+        with patch('umami.impl._http_post', post):
+            threads = [
+                threading.Thread(target=lambda c=c: [c.new_event(event_name='e') for _ in range(20)]) for c in clients
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(seen) == 160
+        assert set(seen) == {(f'https://t{n}.example.com/api/send', f'Bearer tok{n}', f'w{n}') for n in range(8)}
+
+    def test_events_are_sent_inline_even_with_the_background_sender(self, tenant):
+        umami.start_background_sender()
+        with patch('umami.impl._http_post', make_sync_mock({'sent': True})):
+            assert tenant.new_event(event_name='e', buffered=True) == {'sent': True}
+
+    def test_owns_its_connection_pool(self, tenant):
+        requests = []
+
+        def handler(request):
+            requests.append(str(request.url))
+            return httpx.Response(200, json={})
+
+        with patch('umami.impl._new_client', lambda: httpx.Client(transport=httpx.MockTransport(handler))):
+            tenant.new_event(event_name='e')
+            tenant.new_event(event_name='e')
+            pool = tenant._pool
+
+        assert requests == ['https://tenant.example.com/api/send'] * 2
+        assert pool is not None and pool is not umami.impl._client
+        tenant.close()
+        assert tenant._pool is None
+
+    def test_config_is_frozen_and_prebuilt(self, tenant):
+        config = tenant.config
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.url_base = 'https://elsewhere.example.com'  # type: ignore[misc]
+        assert not hasattr(config, '__dict__')
+        assert config.send_url == 'https://tenant.example.com/api/send'
+        assert config.data_url('/api/websites') == 'https://tenant.example.com/api/websites'
+
+    @pytest.mark.parametrize(
+        'args, kwargs',
+        [
+            ((), {}),
+            (('https://a.example.com',), {'api_key': 'key'}),
+            (('not-a-url',), {}),
+            (('https://a.example.com',), {'cloud_region': 'us'}),
+            ((), {'api_key': 'key', 'auth_token': 'tok'}),
+            ((), {'api_key': 'key', 'cloud_region': 'mars'}),
+        ],
+    )
+    def test_invalid_settings(self, args, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.Client(*args, **kwargs)
+
+
+class TestAsyncClient:
+    async def test_events_use_the_clients_settings(self):
+        client = make_async_client()
+        async with umami.AsyncClient(api_key='key', website_id='w1', hostname='t.com') as tenant:
+            with patch_async_client(client):
+                await tenant.new_event(event_name='signup')
+
+        assert client.post.call_args.args[0] == 'https://cloud.umami.is/api/send'
+        assert client.post.call_args.kwargs['json']['payload']['website'] == 'w1'
+
+    async def test_login_keeps_the_token_on_the_client(self):
+        client = make_async_client(LOGIN_JSON)
+        tenant = umami.AsyncClient('https://tenant.example.com', hostname='t.com', website_id='w1')
+        with patch_async_client(client):
+            await tenant.login('admin', 'secret')
+            await tenant.new_event(event_name='e')
+
+        assert tenant.config.auth_token == 'new-token'
+        assert client.post.call_args.kwargs['headers']['Authorization'] == 'Bearer new-token'
+
+    async def test_owns_its_connection_pool(self):
+        tenant = umami.AsyncClient('https://tenant.example.com')
+        pool = tenant._get_pool()
+        assert isinstance(pool, httpx.AsyncClient)
+        await tenant.aclose()
+        assert pool.is_closed and tenant._pool is None
+
+
+class TestDefaultConfig:
+    def test_module_globals_are_read_live(self):
+        with patch('umami.impl.auth_token', 'patched'), patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_event(event_name='e')
+        assert mock_post.call_args.kwargs['headers']['Authorization'] == 'Bearer patched'
+
+        umami.set_url_base('https://moved.example.com')
+        assert umami.impl._send_url() == 'https://moved.example.com/api/send'
+
+    def test_snapshot_is_reused_while_nothing_changes(self):
+        assert umami.impl._config() is umami.impl._config()
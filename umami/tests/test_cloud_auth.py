@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 import pytest
-from _mocks import END, START, STATS_JSON, WEBSITES_JSON, make_async_client, make_sync_mock
+from _mocks import END, START, STATS_JSON, WEBSITES_JSON, make_async_client, make_sync_mock, patch_async_client
 
 import umami
 
@@ -45,7 +45,7 @@ class TestCloudDataRouting:
 
     def test_websites_routing_and_headers(self):
         umami.set_cloud_api_key('cloud-key')
-        with patch('umami.impl.httpx.get', make_sync_mock(WEBSITES_JSON)) as mock_get:
+        with patch('umami.impl._http_get', make_sync_mock(WEBSITES_JSON)) as mock_get:
             umami.websites()
         url = mock_get.call_args.args[0]
         headers = mock_get.call_args.kwargs['headers']
@@ -55,13 +55,13 @@ class TestCloudDataRouting:
 
     def test_region_appears_in_path(self):
         umami.set_cloud_api_key('cloud-key', region='eu')
-        with patch('umami.impl.httpx.get', make_sync_mock(WEBSITES_JSON)) as mock_get:
+        with patch('umami.impl._http_get', make_sync_mock(WEBSITES_JSON)) as mock_get:
             umami.websites()
         assert mock_get.call_args.args[0] == 'https://api.umami.is/v1/eu/websites'
 
     def test_active_users_routing(self):
         umami.set_cloud_api_key('cloud-key', region='us')
-        with patch('umami.impl.httpx.get', make_sync_mock({'visitors': 7})) as mock_get:
+        with patch('umami.impl._http_get', make_sync_mock({'visitors': 7})) as mock_get:
             result = umami.active_users()
         assert result == 7
         url = mock_get.call_args.args[0]
@@ -72,7 +72,7 @@ class TestCloudDataRouting:
 
     def test_website_stats_routing_and_params(self):
         umami.set_cloud_api_key('cloud-key')
-        with patch('umami.impl.httpx.get', make_sync_mock(STATS_JSON)) as mock_get:
+        with patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get:
             umami.website_stats(start_at=START, end_at=END, url='/pricing', host='example.com')
         url = mock_get.call_args.args[0]
         headers = mock_get.call_args.kwargs['headers']
@@ -88,7 +88,7 @@ class TestCloudDataRouting:
     async def test_websites_async_routing_and_headers(self):
         umami.set_cloud_api_key('cloud-key')
         mock_client = make_async_client(WEBSITES_JSON)
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.websites_async()
         url = mock_client.get.call_args.args[0]
         headers = mock_client.get.call_args.kwargs['headers']
@@ -102,7 +102,7 @@ class TestCloudEventRouting:
 
     def test_new_event_routing(self):
         umami.set_cloud_api_key('cloud-key', region='eu')
-        with patch('umami.impl.httpx.post', make_sync_mock({})) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock({})) as mock_post:
             umami.new_event(event_name='purchase', url='/checkout')
         url = mock_post.call_args.args[0]
         headers = mock_post.call_args.kwargs['headers']
@@ -113,7 +113,7 @@ class TestCloudEventRouting:
 
     def test_new_page_view_routing_preserves_ua(self):
         umami.set_cloud_api_key('cloud-key')
-        with patch('umami.impl.httpx.post', make_sync_mock({})) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock({})) as mock_post:
             umami.new_page_view(page_title='Home', url='/')
         url = mock_post.call_args.args[0]
         headers = mock_post.call_args.kwargs['headers']
@@ -125,7 +125,7 @@ class TestCloudEventRouting:
     async def test_new_event_async_routing(self):
         umami.set_cloud_api_key('cloud-key')
         mock_client = make_async_client({})
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_event_async(event_name='purchase', url='/checkout')
         url = mock_client.post.call_args.args[0]
         headers = mock_client.post.call_args.kwargs['headers']
@@ -140,7 +140,7 @@ class TestCloudVerifyToken:
     def test_verify_token_hits_me_endpoint(self):
         umami.set_cloud_api_key('cloud-key', region='eu')
         # Real /api/me nests username under 'user'; matched by the 'user' in body clause.
-        with patch('umami.impl.httpx.get', make_sync_mock({'user': {'id': '1', 'username': 'me'}})) as mock_get:
+        with patch('umami.impl._http_get', make_sync_mock({'user': {'id': '1', 'username': 'me'}})) as mock_get:
             result = umami.verify_token()
         assert result is True
         url = mock_get.call_args.args[0]
@@ -155,7 +155,7 @@ class TestCloudVerifyToken:
     async def test_verify_token_async_hits_me_endpoint(self):
         umami.set_cloud_api_key('cloud-key')
         mock_client = make_async_client({'user': {'id': '1'}})
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             result = await umami.verify_token_async()
         assert result is True
         assert mock_client.get.call_args.args[0] == 'https://api.umami.is/v1/me'
@@ -166,7 +166,7 @@ class TestSelfHostedRegression:
 
     def test_stats_url_and_headers_unchanged(self):
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.get', make_sync_mock(STATS_JSON)) as mock_get:
+            with patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get:
                 umami.website_stats(start_at=START, end_at=END)
         url = mock_get.call_args.args[0]
         headers = mock_get.call_args.kwargs['headers']
@@ -179,7 +179,7 @@ class TestSelfHostedRegression:
 
     def test_event_url_and_headers_unchanged(self):
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.post', make_sync_mock({})) as mock_post:
+            with patch('umami.impl._http_post', make_sync_mock({})) as mock_post:
                 umami.new_event(event_name='e', url='/x')
         url = mock_post.call_args.args[0]
         headers = mock_post.call_args.kwargs['headers']
@@ -193,7 +193,7 @@ class TestSelfHostedRegression:
     async def test_stats_async_url_and_headers_unchanged(self):
         mock_client = make_async_client(STATS_JSON)
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+            with patch_async_client(mock_client):
                 await umami.website_stats_async(start_at=START, end_at=END)
         url = mock_client.get.call_args.args[0]
         headers = mock_client.get.call_args.kwargs['headers']
@@ -206,7 +206,7 @@ class TestSelfHostedRegression:
 
     def test_heartbeat_self_hosted_uses_get(self):
         # Umami's /api/heartbeat is a GET (POST returns 405); see regression note in changelog.
-        with patch('umami.impl.httpx.get', make_sync_mock({'ok': True})) as mock_get:
+        with patch('umami.impl._http_get', make_sync_mock({'ok': True})) as mock_get:
             result = umami.heartbeat()
         assert result is True
         url = mock_get.call_args.args[0]
@@ -220,7 +220,7 @@ class TestSelfHostedVerifyToken:
 
     def test_verify_token_hits_verify_endpoint(self):
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.post', make_sync_mock({'username': 'me'})) as mock_post:
+            with patch('umami.impl._http_post', make_sync_mock({'username': 'me'})) as mock_post:
                 result = umami.verify_token()
         assert result is True
         url = mock_post.call_args.args[0]
@@ -232,7 +232,7 @@ class TestSelfHostedVerifyToken:
     async def test_verify_token_async_hits_verify_endpoint(self):
         mock_client = make_async_client({'username': 'me'})
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+            with patch_async_client(mock_client):
                 result = await umami.verify_token_async()
         assert result is True
         url = mock_client.post.call_args.args[0]
@@ -250,7 +250,7 @@ class TestCloudHeartbeat:
 
     def test_heartbeat_hits_me(self):
         umami.set_cloud_api_key('cloud-key', region='eu')
-        with patch('umami.impl.httpx.get', make_sync_mock({'user': {'id': '1'}})) as mock_get:
+        with patch('umami.impl._http_get', make_sync_mock({'user': {'id': '1'}})) as mock_get:
             result = umami.heartbeat()
         assert result is True
         url = mock_get.call_args.args[0]
@@ -262,7 +262,7 @@ class TestCloudHeartbeat:
     async def test_heartbeat_async_hits_me(self):
         umami.set_cloud_api_key('cloud-key')
         mock_client = make_async_client({'user': {'id': '1'}})
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             result = await umami.heartbeat_async()
         assert result is True
         url = mock_client.get.call_args.args[0]
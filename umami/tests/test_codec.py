@@ -0,0 +1,84 @@
+import json
+from unittest.mock import patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import recording_transport
+from umami.impl.codec import JsonCodec, make_codec
+
+import umami
+
+
+@pytest.fixture(autouse=True)
+def _restore_codec():
+    saved = umami.impl.json_codec
+    yield
+    umami.impl.json_codec = saved
+
+
+@pytest.fixture
+def bodies(monkeypatch):
+    """Route calls through a real client; returns the requests it saw, whose raw bodies the codec wrote."""
+    return recording_transport(monkeypatch, lambda request: httpx.Response(200, content=b'{"ok":true}'))
+
+
+class TestCodecs:
+    def test_stdlib_round_trip_is_compact_utf8(self):
+        codec = JsonCodec()
+        data = codec.encode({'name': 'café', 'n': [1, 2]})
+        assert data == '{"name":"café","n":[1,2]}'.encode()
+        assert codec.decode(data) == {'name': 'café', 'n': [1, 2]}
+
+    @pytest.mark.parametrize('name', ['orjson', 'msgspec'])
+    def test_optional_backends_round_trip(self, name):
+        pytest.importorskip(name)
+        codec = make_codec(name)
+        assert codec.name == name
+        assert codec.decode(codec.encode({'a': [1, 'b']})) == {'a': [1, 'b']}
+
+    def test_auto_falls_back_to_stdlib(self):
+        with (
+            patch('umami.impl.codec.OrjsonCodec', side_effect=ImportError),
+            patch('umami.impl.codec.MsgspecCodec', side_effect=ImportError),
+        ):
+            assert make_codec('auto').name == 'stdlib'
+
+    def test_missing_backend_explains_how_to_install(self):
+        with patch.dict('sys.modules', {'msgspec': None}):
+            with pytest.raises(ImportError, match=r'umami-analytics\[msgspec\]'):
+                umami.set_json_codec('msgspec')
+
+
+class TestCodecOnTheWire:
+    def test_requests_are_encoded_by_the_codec(self, bodies):
+        umami.new_event(event_name='e')
+        content, content_type = bodies[0].content, bodies[0].headers['Content-Type']
+        assert content_type == 'application/json'
+        assert json.loads(content)['payload']['name'] == 'e'
+
+    def test_custom_codec_is_used_both_ways(self, bodies):
+        class Recording(JsonCodec):
+            calls = []
+
+            def encode(self, obj):
+                self.calls.append('encode')
+                return super().encode(obj)
+
+            def decode(self, data):
+                self.calls.append('decode')
+                return super().decode(data)
+
+        umami.set_json_codec(Recording())
+        assert umami.new_event(event_name='e') == {'ok': True}
+        assert Recording.calls == ['encode', 'decode']
+
+    def test_orjson_end_to_end(self, bodies):
+        pytest.importorskip('orjson')
+        umami.set_json_codec('orjson')
+        assert umami.new_events([{'event_name': 'a'}, {'event_name': 'b'}]) == {'ok': True}
+        assert [b['payload']['name'] for b in json.loads(bodies[0].content)] == ['a', 'b']
+
+    @pytest.mark.parametrize('codec', ['ujson', object()])
+    def test_invalid_codec(self, codec):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_json_codec(codec)
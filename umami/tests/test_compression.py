@@ -0,0 +1,74 @@
+import gzip
+import json
+import sys
+
+import httpx2 as httpx
+import pytest
+from _mocks import recording_transport
+
+import umami
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    """Route calls through a real client; returns the requests it saw."""
+    return recording_transport(monkeypatch, lambda request: httpx.Response(200, json={'token': 't', 'user': USER}))
+
+
+USER = {'id': 'u1', 'username': 'admin', 'role': 'admin', 'createdAt': '2024-01-01', 'isAdmin': True}
+
+
+def big_custom_data():
+    return {f'key{n}': 'value ' * 10 for n in range(50)}
+
+
+class TestCompression:
+    def test_off_by_default(self, requests):
+        umami.new_event(event_name='e', custom_data=big_custom_data())
+        assert 'Content-Encoding' not in requests[0].headers
+
+    def test_large_ingestion_bodies_are_gzipped(self, requests):
+        umami.set_compression('gzip', min_size=1024)
+        umami.new_events([{'event_name': 'a', 'custom_data': big_custom_data()}] * 3)
+
+        request = requests[0]
+        assert request.headers['Content-Encoding'] == 'gzip'
+        assert request.headers['Content-Type'] == 'application/json'
+        body = json.loads(gzip.decompress(request.content))
+        assert [b['payload']['name'] for b in body] == ['a', 'a', 'a']
+        assert len(request.content) < len(gzip.decompress(request.content)) / 5
+
+    def test_small_bodies_are_sent_as_is(self, requests):
+        umami.set_compression('gzip', min_size=1024)
+        umami.new_event(event_name='e')
+        assert 'Content-Encoding' not in requests[0].headers
+        assert json.loads(requests[0].content)['payload']['name'] == 'e'
+
+    def test_data_calls_are_never_compressed(self, requests):
+        umami.set_compression('gzip', min_size=0)
+        umami.login('admin', 'x' * 2000)
+        assert 'Content-Encoding' not in requests[0].headers
+
+    def test_disable(self, requests):
+        umami.set_compression('gzip', min_size=0)
+        umami.set_compression(None)
+        umami.new_event(event_name='e', custom_data=big_custom_data())
+        assert 'Content-Encoding' not in requests[0].headers
+
+    def test_zstd(self, requests):
+        if sys.version_info >= (3, 14):
+            from compression import zstd
+
+            decompress = zstd.decompress
+        else:
+            zstandard = pytest.importorskip('zstandard')
+            decompress = zstandard.ZstdDecompressor().decompress
+        umami.set_compression('zstd', min_size=0)
+        umami.new_event(event_name='e')
+        assert requests[0].headers['Content-Encoding'] == 'zstd'
+        assert json.loads(decompress(requests[0].content))['payload']['name'] == 'e'
+
+    @pytest.mark.parametrize('kwargs', [{'algorithm': 'brotli'}, {'min_size': -1}, {'level': 'high'}])
+    def test_invalid_settings(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_compression(**kwargs)
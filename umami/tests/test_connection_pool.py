@@ -0,0 +1,96 @@
+import asyncio
+
+import httpx2 as httpx
+import pytest
+from _mocks import recording_transport
+
+import umami
+
+
+class TestSharedSyncClient:
+    """Sync calls share one lazily created, keep-alive httpx.Client."""
+
+    def test_not_created_until_first_use(self):
+        umami.close()
+        assert umami.impl._client is None
+        umami.set_url_base('https://example.com')
+        assert umami.impl._client is None
+
+    def test_same_client_is_reused(self):
+        first = umami.impl._get_client()
+        assert umami.impl._get_client() is first
+
+    def test_events_go_through_the_shared_client(self, monkeypatch):
+        seen = recording_transport(monkeypatch, lambda request: httpx.Response(200, json={'ok': True}))
+        client = umami.impl._client
+
+        umami.new_event(event_name='one')
+        umami.new_page_view('Home', '/')
+
+        assert [str(r.url) for r in seen] == ['https://example.com/api/send'] * 2
+        assert umami.impl._get_client() is client
+
+    def test_close_releases_and_next_call_recreates(self):
+        first = umami.impl._get_client()
+        umami.close()
+        assert first.is_closed
+        assert umami.impl._client is None
+        assert umami.impl._get_client() is not first
+
+    def test_close_is_idempotent(self):
+        umami.close()
+        umami.close()
+
+
+class TestConfigure:
+    def test_limits_apply_to_new_pool(self, monkeypatch):
+        first = umami.impl._get_client()
+        monkeypatch.setattr(umami.impl, 'pool_limits', umami.impl.pool_limits)
+        umami.configure(max_connections=7, keepalive_expiry=30)
+
+        assert first.is_closed
+        assert umami.impl.pool_limits.max_connections == 7
+        assert umami.impl.pool_limits.keepalive_expiry == 30
+        assert umami.impl.pool_limits.max_keepalive_connections == 20  # untouched
+
+    @pytest.mark.parametrize('kwargs', [{'max_connections': 0}, {'keepalive_expiry': -1}, {'max_connections': True}])
+    def test_invalid_values_raise(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.configure(**kwargs)
+
+
+class TestPerLoopAsyncClient:
+    """Async calls share one pooled AsyncClient per running event loop."""
+
+    async def test_same_loop_reuses_client(self):
+        first = await umami.impl._get_async_client()
+        assert await umami.impl._get_async_client() is first
+        await umami.close_async()
+
+    async def test_close_async_closes_and_next_call_recreates(self):
+        first = await umami.impl._get_async_client()
+        await umami.close_async()
+        assert first.is_closed
+        assert await umami.impl._get_async_client() is not first
+        await umami.close_async()
+        await umami.close_async()  # idempotent
+
+    def test_each_loop_gets_its_own_client_closed_at_shutdown(self):
+        async def grab():
+            return await umami.impl._get_async_client()
+
+        first = asyncio.run(grab())
+        second = asyncio.run(grab())
+
+        assert first is not second
+        # asyncio.run() finalizes async generators on exit, which closes that loop's pool.
+        assert first.is_closed and second.is_closed
+        assert len(umami.impl._async_clients) == 0
+
+    async def test_events_go_through_the_loop_client(self, monkeypatch):
+        seen = recording_transport(monkeypatch, lambda request: httpx.Response(200, json={'ok': True}))
+        await umami.new_event_async(event_name='one')
+        await umami.new_page_view_async('Home', '/')
+        await (await umami.impl._get_async_client()).aclose()
+
+        assert [str(r.url) for r in seen] == ['https://example.com/api/send'] * 2
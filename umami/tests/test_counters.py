@@ -0,0 +1,126 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from _mocks import make_async_client, make_sync_mock, patch_async_client
+from umami.impl.counters import CounterAggregator
+
+import umami
+
+
+def sent_events(mock_post):
+    """(name, url, custom_data) for every event in every /api/batch request `mock_post` saw, in order."""
+    return [
+        (body['payload']['name'], body['payload']['url'], body['payload']['data'])
+        for call in mock_post.call_args_list
+        for body in call.kwargs['json']
+    ]
+
+
+class TestIncrement:
+    def test_identical_calls_become_one_event(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            for _ in range(1000):
+                umami.increment('api-call', custom_data={'endpoint': '/search'})
+            umami.flush_counters()
+
+        assert mock_post.call_count == 1
+        assert mock_post.call_args.args[0] == 'https://example.com/api/batch'
+        assert sent_events(mock_post) == [('api-call', '/', {'endpoint': '/search', 'count': 1000})]
+
+    def test_counted_per_event_url_and_data(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.increment('api-call', custom_data={'a': 1, 'b': 2})
+            umami.increment('api-call', custom_data={'b': 2, 'a': 1}, count=4)  # same data, other order
+            umami.increment('api-call', custom_data={'a': 2})
+            umami.increment('api-call', url='/other')
+            umami.increment('login')
+            umami.flush_counters()
+
+        assert sent_events(mock_post) == [
+            ('api-call', '/', {'a': 1, 'b': 2, 'count': 5}),
+            ('api-call', '/', {'a': 2, 'count': 1}),
+            ('api-call', '/other', {'count': 1}),
+            ('login', '/', {'count': 1}),
+        ]
+
+    def test_counts_restart_after_a_send(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.increment('e')
+            umami.flush_counters()
+            umami.flush_counters()  # nothing pending, no request
+            umami.increment('e', count=2)
+            umami.flush_counters()
+
+        assert [c.kwargs['json'][0]['payload']['data']['count'] for c in mock_post.call_args_list] == [1, 2]
+
+    def test_sent_periodically_by_the_counter_thread(self):
+        sent = threading.Event()
+        mock_post = make_sync_mock()
+        mock_post.side_effect = lambda *a, **kw: sent.set() or mock_post.return_value
+        with patch('umami.impl._http_post', mock_post):
+            umami.start_counters(flush_interval=0.01)
+            umami.increment('e')
+            assert sent.wait(5)
+
+    def test_stop_sends_pending_counts(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.start_counters(flush_interval=60)
+            umami.increment('e')
+            assert umami.stop_counters(5)
+        assert sent_events(mock_post) == [('e', '/', {'count': 1})]
+
+    def test_not_sampled(self):
+        umami.set_sampling(default_rate=0.0)
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.increment('e')
+            umami.flush_counters()
+        assert sent_events(mock_post) == [('e', '/', {'count': 1})]
+
+    def test_disabled_tracking_counts_nothing(self):
+        umami.disable()
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.increment('e')
+            umami.flush_counters()
+        mock_post.assert_not_called()
+
+    async def test_flush_counters_async(self):
+        client = make_async_client()
+        with patch_async_client(client):
+            umami.increment('e', count=3)
+            await umami.flush_counters_async()
+        assert client.post.call_args.args[0] == 'https://example.com/api/batch'
+        assert client.post.call_args.kwargs['json'][0]['payload']['data'] == {'count': 3}
+
+    @pytest.mark.parametrize(
+        'kwargs', [{'count': 0}, {'count': 1.5}, {'count': True}, {'custom_data': {'count': 1}}, {'hostname': ''}]
+    )
+    def test_invalid_arguments(self, kwargs, monkeypatch):
+        monkeypatch.setattr(umami.impl, 'default_hostname', None)
+        with pytest.raises(umami.errors.ValidationError):
+            umami.increment('e', **kwargs)
+
+    @pytest.mark.parametrize('kwargs', [{'flush_interval': 0}, {'max_keys': 0}, {'max_keys': 2.0}])
+    def test_invalid_settings(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.start_counters(**kwargs)
+
+
+class TestCounterAggregator:
+    def make(self, send=None, max_keys=10):
+        return CounterAggregator(send or MagicMock(), MagicMock(), flush_interval=60, max_keys=max_keys)
+
+    def test_new_keys_beyond_max_keys_are_dropped(self):
+        counters = self.make(max_keys=1)
+        assert counters.add(('a',) * 5, {}, 1)
+        assert counters.add(('a',) * 5, {}, 1)  # existing keys still count
+        assert not counters.add(('b',) * 5, {}, 3)
+        assert counters.dropped == 3
+        assert counters.drain() == {('a',) * 5: ({}, 2)}
+
+    def test_send_errors_are_logged_not_raised(self):
+        counters = self.make(send=MagicMock(side_effect=RuntimeError('down')))
+        counters.add(('a',) * 5, {}, 2)
+        counters.flush()
+        assert counters.failed == 2
+        assert counters.drain() == {}
@@ -0,0 +1,139 @@
+from unittest.mock import MagicMock, patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import make_async_client, make_sync_mock, patch_async_client
+from umami.impl.dedup import KEY_FIELD, DedupWindow
+
+import umami
+
+
+def keyed(key, name='e'):
+    return {'type': 'event', 'payload': {'name': name}, KEY_FIELD: key}
+
+
+class TestDedupWindow:
+    def test_unsent_skips_known_keys(self):
+        window = DedupWindow()
+        window.add([keyed('a')])
+        assert window.unsent([keyed('a'), keyed('b'), {'type': 'event'}]) == [keyed('b'), {'type': 'event'}]
+        assert window.skipped == 1
+
+    def test_bounded_by_max_keys(self):
+        window = DedupWindow(max_keys=2)
+        window.add([keyed('a'), keyed('b'), keyed('c')])
+        assert len(window) == 2
+        assert 'a' not in window
+        assert 'c' in window
+
+    def test_keys_expire_after_ttl(self):
+        window = DedupWindow(ttl=10)
+        with patch('umami.impl.dedup.time.monotonic', return_value=100.0):
+            window.add([keyed('a')])
+        with patch('umami.impl.dedup.time.monotonic', return_value=109.0):
+            assert 'a' in window
+        with patch('umami.impl.dedup.time.monotonic', return_value=111.0):
+            assert 'a' not in window
+            assert len(window) == 0
+
+
+class TestIdempotencyKeys:
+    def test_off_by_default(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_event(event_name='e')
+        assert 'Idempotency-Key' not in mock_post.call_args.kwargs['headers']
+        assert KEY_FIELD not in mock_post.call_args.kwargs['json']
+
+    def test_single_event_sends_key_as_header_not_in_body(self):
+        umami.set_dedup_window()
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_revenue_event(event_name='purchase', revenue=10, currency='USD')
+            umami.new_revenue_event(event_name='purchase', revenue=10, currency='USD')
+
+        first, second = mock_post.call_args_list
+        assert KEY_FIELD not in first.kwargs['json']
+        assert len(first.kwargs['headers']['Idempotency-Key']) == 32
+        assert first.kwargs['headers']['Idempotency-Key'] != second.kwargs['headers']['Idempotency-Key']
+
+    def test_batch_bodies_are_sent_without_keys(self):
+        umami.set_dedup_window()
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_events([{'event_name': 'a'}, {'event_name': 'b'}])
+        assert all(KEY_FIELD not in body for body in mock_post.call_args.kwargs['json'])
+
+    async def test_async_event_sends_key_as_header(self):
+        umami.set_dedup_window()
+        client = make_async_client()
+        with patch_async_client(client):
+            await umami.new_event_async(event_name='e')
+        assert 'Idempotency-Key' in client.post.call_args.kwargs['headers']
+        assert KEY_FIELD not in client.post.call_args.kwargs['json']
+
+
+class TestDeliveredEventsAreNotResent:
+    def test_delivered_body_is_skipped(self):
+        umami.set_dedup_window()
+        body = umami.impl._event_body('purchase')
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.impl._post_events([body], umami.impl._send_headers())
+            assert umami.impl._post_events([body], umami.impl._send_headers()) == {}
+        assert mock_post.call_count == 1
+        assert umami.impl._dedup.skipped == 1
+
+    async def test_async_delivered_body_is_skipped(self):
+        umami.set_dedup_window()
+        body = umami.impl._event_body('purchase')
+        client = make_async_client()
+        with patch_async_client(client):
+            await umami.impl._post_events_async([body, body], umami.impl._send_headers())
+            await umami.impl._post_events_async([body], umami.impl._send_headers())
+        assert client.post.call_count == 1
+        assert client.post.call_args.args[0] == 'https://example.com/api/send'  # the duplicate was dropped
+
+    def test_failed_send_is_not_remembered(self):
+        umami.set_dedup_window()
+        body = umami.impl._event_body('purchase')
+        with patch('umami.impl._http_post', MagicMock(side_effect=httpx.ConnectError('down'))):
+            with pytest.raises(httpx.ConnectError):
+                umami.impl._post_events([body], umami.impl._send_headers())
+        assert len(umami.impl._dedup) == 0
+
+    def test_spool_replay_skips_events_already_delivered(self, tmp_path):
+        umami.set_dedup_window()
+        umami.start_spool(str(tmp_path / 'spool.db'), check_interval=60)
+        delivered, pending = umami.impl._event_body('a'), umami.impl._event_body('b')
+        # A drainer that sent a batch but stopped before removing its rows leaves them behind.
+        umami.impl._spool.add([delivered, pending], umami.impl.event_user_agent)
+        with patch('umami.impl._http_post', make_sync_mock()):
+            umami.impl._post_events([delivered], umami.impl._send_headers())
+
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            for _, body, ua in umami.impl._spool.peek(10):
+                umami.impl._replay_spooled([body], ua)
+
+        assert mock_post.call_count == 1
+        assert mock_post.call_args.kwargs['json']['payload']['name'] == 'b'
+
+    def test_background_sender_and_direct_sends_share_the_window(self):
+        umami.set_dedup_window()
+        body = umami.impl._event_body('a')
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.impl._post_events([body], umami.impl._send_headers())
+            umami.start_background_sender()
+            umami.impl._background.submit(body, umami.impl._send_headers())
+            umami.impl._background.submit(umami.impl._event_body('b'), umami.impl._send_headers())
+            assert umami.stop_background_sender(5)
+
+        assert [c.kwargs['json']['payload']['name'] for c in mock_post.call_args_list] == ['a', 'b']
+
+
+class TestSettings:
+    def test_clear(self):
+        umami.set_dedup_window()
+        umami.clear_dedup_window()
+        assert KEY_FIELD not in umami.impl._event_body('e')
+
+    @pytest.mark.parametrize('kwargs', [{'max_keys': 0}, {'max_keys': 1.5}, {'ttl': 0}, {'ttl': 'long'}])
+    def test_invalid_settings(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_dedup_window(**kwargs)
@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 import pytest
-from _mocks import make_async_client, make_sync_mock
+from _mocks import make_async_client, make_sync_mock, patch_async_client
 from umami.errors import ValidationError
 from umami.impl import normalize_distinct_id
 
@@ -12,13 +12,13 @@ class TestDistinctIdSync:
     """distinct_id handling for the sync event / page_view / revenue functions."""
 
     def test_new_event_includes_distinct_id(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_event(event_name='signup', distinct_id='user-123')
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['id'] == 'user-123'
 
     def test_new_event_normalizes_integer_distinct_id(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_event(event_name='signup', distinct_id=12345)
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['id'] == '12345'
@@ -28,46 +28,46 @@ class TestDistinctIdSync:
             umami.new_event(event_name='signup', distinct_id=['bad-type'])  # type: ignore[arg-type]
 
     def test_new_page_view_includes_distinct_id(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_page_view(page_title='Account', url='/account', distinct_id='user-456')
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['id'] == 'user-456'
 
     def test_new_revenue_event_includes_distinct_id(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_revenue_event(revenue=19.99, distinct_id='user-789')
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['id'] == 'user-789'
 
     def test_new_revenue_event_normalizes_integer_distinct_id(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_revenue_event(revenue=19.99, distinct_id=42)
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['id'] == '42'
 
     def test_new_event_omits_id_when_distinct_id_default(self):
         # Backward-compat: legacy callers who never pass distinct_id must get no 'id' field.
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_event(event_name='signup')
         payload = mock_post.call_args.kwargs['json']['payload']
         assert 'id' not in payload
 
     @pytest.mark.parametrize('blank', ['', '   '])
     def test_new_event_omits_id_for_blank_distinct_id(self, blank):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_event(event_name='signup', distinct_id=blank)
         payload = mock_post.call_args.kwargs['json']['payload']
         assert 'id' not in payload
 
     def test_new_event_strips_whitespace_from_distinct_id(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_event(event_name='signup', distinct_id='  user-1  ')
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['id'] == 'user-1'
 
     def test_new_event_zero_distinct_id(self):
         # 0 is a valid integer id that must survive as the string '0' (falsy-value trap).
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_event(event_name='signup', distinct_id=0)
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['id'] == '0'
@@ -85,7 +85,7 @@ class TestDistinctIdAsync:
     @pytest.mark.asyncio
     async def test_new_event_async_includes_distinct_id(self):
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_event_async(event_name='signup', distinct_id='user-123')
         payload = mock_client.post.call_args.kwargs['json']['payload']
         assert payload['id'] == 'user-123'
@@ -93,7 +93,7 @@ class TestDistinctIdAsync:
     @pytest.mark.asyncio
     async def test_new_page_view_async_includes_distinct_id(self):
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_page_view_async(page_title='Account', url='/account', distinct_id='user-456')
         payload = mock_client.post.call_args.kwargs['json']['payload']
         assert payload['id'] == 'user-456'
@@ -101,7 +101,7 @@ class TestDistinctIdAsync:
     @pytest.mark.asyncio
     async def test_new_page_view_async_normalizes_integer_distinct_id(self):
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_page_view_async(page_title='Account', url='/account', distinct_id=67890)
         payload = mock_client.post.call_args.kwargs['json']['payload']
         assert payload['id'] == '67890'
@@ -109,7 +109,7 @@ class TestDistinctIdAsync:
     @pytest.mark.asyncio
     async def test_new_revenue_event_async_includes_distinct_id(self):
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_revenue_event_async(revenue=19.99, distinct_id='user-789')
         payload = mock_client.post.call_args.kwargs['json']['payload']
         assert payload['id'] == 'user-789'
@@ -117,7 +117,7 @@ class TestDistinctIdAsync:
     @pytest.mark.asyncio
     async def test_new_event_async_omits_id_when_distinct_id_default(self):
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_event_async(event_name='signup')
         payload = mock_client.post.call_args.kwargs['json']['payload']
         assert 'id' not in payload
@@ -1,6 +1,6 @@
 from unittest.mock import patch
 
-from _mocks import make_async_client, make_sync_mock
+from _mocks import make_async_client, make_sync_mock, patch_async_client
 
 import umami
 
@@ -14,23 +14,23 @@ class TestEventUrlDefault:
     """
 
     def test_new_event_defaults_url_to_root(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_event(event_name='e')
         assert mock_post.call_args.kwargs['json']['payload']['url'] == '/'
 
     async def test_new_event_async_defaults_url_to_root(self):
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_event_async(event_name='e')
         assert mock_client.post.call_args.kwargs['json']['payload']['url'] == '/'
 
     def test_new_revenue_event_defaults_url_to_root(self):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             umami.new_revenue_event(revenue=9.99)
         assert mock_post.call_args.kwargs['json']['payload']['url'] == '/'
 
     async def test_new_revenue_event_async_defaults_url_to_root(self):
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_revenue_event_async(revenue=9.99)
         assert mock_client.post.call_args.kwargs['json']['payload']['url'] == '/'
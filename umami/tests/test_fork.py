@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import make_sync_mock
+
+import umami
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork()')
+
+
+def in_child(fn):
+    """Run `fn` in a forked child and return its JSON-serializable result (or raise if the child failed)."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        os.close(read_fd)
+        status = 0
+        try:
+            result = {'ok': fn()}
+        except BaseException as e:
+            result, status = {'error': repr(e)}, 1
+        with os.fdopen(write_fd, 'w') as out:
+            json.dump(result, out)
+        os._exit(status)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as src:
+        result = json.load(src)
+    os.waitpid(pid, 0)
+    assert 'error' not in result, result.get('error')
+    return result['ok']
+
+
+def names(mock_post):
+    """Event names in every request `mock_post` saw (single /api/send or /api/batch)."""
+    found = []
+    for call in mock_post.call_args_list:
+        body = call.kwargs['json']
+        found += [b['payload']['name'] for b in body] if isinstance(body, list) else [body['payload']['name']]
+    return found
+
+
+class TestForkedChild:
+    def test_child_gets_its_own_connection_pool(self):
+        parent_client = umami.impl._get_client()
+
+        def child():
+            assert umami.impl._client is None
+            assert umami.impl._get_client() is not parent_client
+            return True
+
+        assert in_child(child)
+        assert umami.impl._client is parent_client
+        assert not parent_client.is_closed
+
+    def test_buffered_events_are_sent_once_by_the_parent(self):
+        mock_post = make_sync_mock()
+        with patch('umami.impl._http_post', mock_post):
+            # A large batch with a long interval keeps the parent's events buffered across the fork.
+            umami.start_background_sender(batch_size=100, flush_interval=60)
+            umami.new_event(event_name='parent-1')
+            umami.new_event(event_name='parent-2')
+
+            def child():
+                assert umami.impl._background.is_alive()
+                umami.new_event(event_name='child')
+                assert umami.stop_background_sender(5)
+                return names(mock_post)
+
+            assert in_child(child) == ['child']
+            assert umami.stop_background_sender(5)
+
+        assert names(mock_post) == ['parent-1', 'parent-2']
+
+    def test_pending_counts_are_not_sent_by_the_child(self):
+        mock_post = make_sync_mock()
+        with patch('umami.impl._http_post', mock_post):
+            umami.increment('hits', count=5)
+
+            def child():
+                umami.increment('hits')
+                umami.flush_counters()
+                return [c.kwargs['json'][0]['payload']['data'] for c in mock_post.call_args_list]
+
+            assert in_child(child) == [{'count': 1}]
+            umami.flush_counters()
+
+        assert mock_post.call_args.kwargs['json'][0]['payload']['data'] == {'count': 5}
+
+    def test_parent_replays_what_the_child_spooled(self, tmp_path):
+        umami.start_spool(str(tmp_path / 'spool.db'), check_interval=0.05)
+        parent_spool = umami.impl._spool
+        replayed = threading.Event()
+
+        def post(url, **kwargs):
+            if kwargs['json']['payload']['name'] == 'from-child':
+                replayed.set()
+            return make_sync_mock().return_value
+
+        def child():
+            assert umami.impl._spool is not parent_spool
+            assert umami.impl._spool_drainer is None  # only the parent replays
+            with patch('umami.impl._http_post', side_effect=httpx.ConnectError('down')):
+                assert umami.new_event(event_name='from-child') == {}
+            return umami.stop_spool(5)
+
+        with patch('umami.impl._http_get', make_sync_mock()), patch('umami.impl._http_post', post):
+            assert len(parent_spool) == 0
+            assert in_child(child)
+            assert replayed.wait(5)  # sent by the parent's drainer, through the normal send path
+            deadline = time.monotonic() + 5
+            while not umami.impl._spool_drainer.replayed and time.monotonic() < deadline:
+                time.sleep(0.01)  # the row is removed just after its send returns
+        assert umami.impl._spool_drainer.replayed == 1
+        assert len(parent_spool) == 0
+
+    def test_locks_held_at_fork_time_are_not_inherited(self):
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_client_lock():
+            with umami.impl._client_lock:
+                held.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_client_lock)
+        holder.start()
+        assert held.wait(5)
+        try:
+            # The holding thread doesn't exist in the child, so an inherited lock would never be released.
+            assert in_child(lambda: umami.impl._client_lock.acquire(timeout=1))
+        finally:
+            release.set()
+            holder.join(5)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import END, START, STATS_JSON
+
+import umami
+
+
+@pytest.fixture
+def http2_config(monkeypatch):
+    """Let tests call configure(http2=...) without leaking the setting."""
+    monkeypatch.setattr(umami.impl, 'pool_limits', umami.impl.pool_limits)
+    monkeypatch.setattr(umami.impl, 'use_http2', False)
+
+
+class H2Server:
+    """
+    A local cleartext HTTP/2 server (h2c, prior knowledge) that answers every request after a short delay.
+
+    Records how many TCP connections were opened and the most streams that were in flight at once.
+    """
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.connections = 0
+        self.paths: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        self.url = 'http://127.0.0.1:{}'.format(self._server.sockets[0].getsockname()[1])
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+
+    async def _serve(self, reader, writer):
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        self.connections += 1
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        paths = {}
+        while data := await reader.read(65536):
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    paths[event.stream_id] = dict(event.headers)[b':path'].decode().partition('?')[0]
+                elif isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    asyncio.create_task(self._respond(conn, writer, event.stream_id, paths.pop(event.stream_id)))
+            writer.write(conn.data_to_send())
+        writer.close()
+
+    async def _respond(self, conn, writer, stream_id, path):
+        self.paths.append(path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+        body = json.dumps(STATS_JSON if path.endswith('/stats') else {}).encode()
+        conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'application/json')])
+        conn.send_data(stream_id, body, end_stream=True)
+        writer.write(conn.data_to_send())
+
+
+class TestConfigureHttp2:
+    def test_off_by_default(self):
+        assert umami.impl.use_http2 is False
+
+    def test_pools_are_recreated_with_http2(self, http2_config):
+        pytest.importorskip('h2')
+        first = umami.impl._get_client()
+        umami.configure(http2=True)
+        assert first.is_closed
+        assert umami.impl.use_http2 is True
+
+        umami.configure(max_connections=5)
+        assert umami.impl.use_http2 is True  # unchanged unless passed
+
+    def test_missing_h2_raises(self, http2_config):
+        with patch.dict('sys.modules', {'h2': None}):
+            with pytest.raises(ImportError, match=r'umami-analytics\[http2\]'):
+                umami.configure(http2=True)
+        assert umami.impl.use_http2 is False
+
+    def test_must_be_bool(self, http2_config):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.configure(http2='yes')  # type: ignore[arg-type]
+
+
+class TestMultiplexing:
+    async def test_concurrent_async_calls_share_one_connection(self, http2_config, monkeypatch):
+        pytest.importorskip('h2')
+        umami.configure(http2=True)
+        # The test server has no TLS, so there is no ALPN to negotiate HTTP/2; speak it from the first byte.
+        real_async_client = httpx.AsyncClient
+        monkeypatch.setattr(httpx, 'AsyncClient', lambda **kw: real_async_client(http1=False, **kw))
+
+        async with H2Server() as server:
+            umami.set_url_base(server.url)
+            with patch('umami.impl.auth_token', 'fake-token'):
+                results = await asyncio.gather(
+                    *(umami.new_event_async(event_name=f'e{n}') for n in range(20)),
+                    *(umami.website_stats_async(START, END) for _ in range(5)),
+                )
+            await umami.close_async()
+
+        assert server.connections == 1
+        assert server.max_in_flight == 25
+        assert server.paths.count('/api/send') == 20
+        assert results[-1].pageviews == STATS_JSON['pageviews']
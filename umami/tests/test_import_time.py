@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import umami
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(umami.__file__)))
+
+# Generous for slow CI machines; the eager import took ~300 ms, the lazy one ~3 ms.
+IMPORT_BUDGET_US = 50_000
+
+HEAVY_MODULES = ['httpx2', 'pydantic', 'umami.impl', 'umami.impl.config', 'umami.models', 'importlib.metadata']
+
+
+def import_times(code):
+    """Run `code` in a fresh interpreter and return {module: cumulative µs} from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:') :].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime:
+    def test_import_umami_loads_no_heavy_dependencies(self):
+        times = import_times('import umami')
+        assert 'umami' in times
+        assert [name for name in HEAVY_MODULES if name in times] == []
+
+    def test_import_umami_is_within_budget(self):
+        assert import_times('import umami')['umami'] < IMPORT_BUDGET_US
+
+    def test_first_use_imports_the_sdk(self):
+        times = import_times('import umami; umami.new_event')
+        assert 'umami.impl.config' in times and 'httpx2' in times
+
+
+class TestLazyAttributes:
+    def test_functions_are_the_impl_functions(self):
+        assert umami.new_event is umami.impl.new_event
+        assert umami.Client is umami.impl.client.Client
+        assert umami.models.Website is not None
+
+    def test_star_import(self):
+        namespace = {}
+        exec('from umami import *', namespace)
+        assert namespace['new_event_async'] is umami.impl.new_event_async
+        assert {'errors', 'models', 'Client'} <= namespace.keys()
+
+    def test_dir_lists_the_public_api(self):
+        assert set(umami.__all__) <= set(dir(umami))
+
+    def test_unknown_names_raise_attribute_error(self):
+        with pytest.raises(AttributeError):
+            umami.no_such_function  # noqa: B018
+        assert not hasattr(umami, 'no_such_function')
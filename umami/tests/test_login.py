@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 import pytest
-from _mocks import make_async_client, make_sync_mock
+from _mocks import make_async_client, make_sync_mock, patch_async_client
 
 import umami
 
@@ -22,7 +22,7 @@ class TestLogin:
 
     def test_login_posts_and_caches_token(self):
         with patch('umami.impl.auth_token', None):
-            with patch('umami.impl.httpx.post', make_sync_mock(_LOGIN_JSON)) as mock_post:
+            with patch('umami.impl._http_post', make_sync_mock(_LOGIN_JSON)) as mock_post:
                 result = umami.login('mkennedy', 'pw')
             assert result.token == 'tok-123'
             assert result.user.username == 'mkennedy'
@@ -43,7 +43,7 @@ class TestLoginAsync:
     async def test_login_async_caches_token(self):
         mock_client = make_async_client(_LOGIN_JSON)
         with patch('umami.impl.auth_token', None):
-            with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+            with patch_async_client(mock_client):
                 result = await umami.login_async('mkennedy', 'pw')
             assert result.token == 'tok-123'
             assert umami.impl.auth_token == 'tok-123'
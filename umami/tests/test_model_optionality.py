@@ -16,7 +16,7 @@ class TestWebsiteStatsComparisonOptional:
     def test_website_stats_parses_without_comparison(self):
         payload = {'pageviews': 10, 'visitors': 5, 'visits': 7, 'bounces': 2, 'totaltime': 100}
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.get', make_sync_mock(payload)):
+            with patch('umami.impl._http_get', make_sync_mock(payload)):
                 stats = umami.website_stats(start_at=START, end_at=END)
         assert stats.comparison is None
         assert stats.visitors == 5
@@ -0,0 +1,55 @@
+import json
+from unittest.mock import patch
+
+import pydantic
+import pytest
+from _mocks import END, START, STATS_JSON, make_sync_mock, mock_response
+
+import umami
+from umami import models
+
+WEBSITE = {
+    'id': 'site-1',
+    'domain': 'talkpython.fm',
+    'createdAt': '2024-01-01T00:00:00.000Z',
+    'updatedAt': '2024-01-01T00:00:00.000Z',
+    'user': {'username': 'admin', 'id': 'u1'},
+}
+
+
+class TestParseFromBytes:
+    """Model responses are validated straight from resp.content, never via resp.json()."""
+
+    def test_models_parse_from_content(self):
+        resp = mock_response(STATS_JSON)
+        stats = umami.impl._parse(resp, models.WebsiteStats)
+        assert stats == models.WebsiteStats(**STATS_JSON)
+        resp.json.assert_not_called()
+
+    def test_aliases_still_apply(self):
+        resp = mock_response({'data': [WEBSITE], 'count': 1, 'page': 1, 'pageSize': 10})
+        assert umami.impl._parse(resp, models.WebsitesResponse).websites[0].domain == 'talkpython.fm'
+
+    def test_list_types_use_a_cached_type_adapter(self):
+        resp = mock_response([WEBSITE, WEBSITE])
+        sites = umami.impl._parse(resp, list[models.Website])
+        assert [s.id for s in sites] == ['site-1', 'site-1']
+        assert umami.impl._type_adapter(list[models.Website]) is umami.impl._type_adapter(list[models.Website])
+
+    def test_websites_and_stats_skip_resp_json(self):
+        with patch('umami.impl.auth_token', 'fake-token'):
+            page = make_sync_mock({'data': [WEBSITE], 'count': 1, 'page': 1, 'pageSize': 10})
+            with patch('umami.impl._http_get', page):
+                assert umami.websites()[0].id == 'site-1'
+            page.return_value.json.assert_not_called()
+
+            stats = make_sync_mock(STATS_JSON)
+            with patch('umami.impl._http_get', stats):
+                assert umami.website_stats(START, END).visits == 7
+            stats.return_value.json.assert_not_called()
+
+    def test_invalid_payload_raises_validation_error(self):
+        resp = mock_response()
+        resp.content = json.dumps({'pageviews': 'many'}).encode()
+        with pytest.raises(pydantic.ValidationError):
+            umami.impl._parse(resp, models.WebsiteStats)
@@ -0,0 +1,136 @@
+import time
+from unittest.mock import patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import recording_transport
+from umami.impl.ratelimit import TokenBucket
+
+import umami
+
+
+@pytest.fixture
+def seen(monkeypatch):
+    """Route sync and async calls through real clients whose transport records each request."""
+    return recording_transport(monkeypatch)
+
+
+def paths(requests):
+    return [request.url.path for request in requests]
+
+
+class TestTokenBucket:
+    def test_burst_then_waits_at_the_rate(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert not bucket.has_token()
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)  # waiting callers queue up behind each other
+
+    def test_will_not_wait_past_a_deadline(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        bucket.reserve()
+        assert not bucket.acquire(deadline=time.monotonic() + 0.1)
+        assert bucket.reserve(deadline=time.monotonic() + 2) == pytest.approx(1, abs=0.01)  # nothing was taken
+
+    def test_refills_over_time(self):
+        bucket = TokenBucket(rate=1000, burst=1)
+        bucket.reserve()
+        with patch('umami.impl.ratelimit.time.monotonic', return_value=bucket._updated + 0.01):
+            assert bucket.has_token()
+
+
+class TestRateLimitedRequests:
+    def test_sends_wait_for_a_token(self, seen):
+        umami.set_rate_limits(send_rate=10, send_burst=1)
+        with patch('umami.impl.ratelimit.time.sleep') as sleep:
+            umami.new_event(event_name='a')
+            umami.new_event(event_name='b')
+        assert len(seen) == 2
+        assert sleep.call_args.args[0] == pytest.approx(0.1, abs=0.01)
+
+    def test_per_call_timeout_does_not_wait_for_a_token(self, seen):
+        umami.set_rate_limits(send_rate=0.5, send_burst=1)
+        umami.new_event(event_name='a')
+        started = time.monotonic()
+        with pytest.raises(httpx.PoolTimeout):
+            umami.new_event(event_name='b', timeout=0.1)
+        assert time.monotonic() - started < 0.1
+        assert paths(seen) == ['/api/send']
+
+    def test_buckets_are_separate(self, seen):
+        umami.set_rate_limits(send_rate=10, send_burst=1)
+        umami.new_event(event_name='a')
+        with patch('umami.impl.ratelimit.time.sleep') as sleep:
+            assert umami.heartbeat()
+        sleep.assert_not_called()
+
+    def test_data_calls_are_limited(self, seen):
+        umami.set_rate_limits(data_rate=10, data_burst=1)
+        with patch('umami.impl.ratelimit.time.sleep') as sleep:
+            umami.heartbeat()
+            umami.heartbeat()
+        sleep.assert_called_once()
+
+    def test_drop_when_limited(self, seen):
+        umami.set_rate_limits(send_rate=0.001, send_burst=1, when_limited='drop')
+        assert umami.new_event(event_name='a') == {}
+        assert umami.new_event(event_name='b') == {}
+        assert paths(seen) == ['/api/send']
+
+    def test_buffer_when_limited(self, seen):
+        umami.set_rate_limits(send_rate=100, send_burst=1, when_limited='buffer')
+        umami.new_event(event_name='a')
+        umami.new_event(event_name='b')
+        assert umami.impl._background is None  # overflow is queued without switching every send to the queue
+        assert umami.flush(timeout=5) == 0
+        assert paths(seen) == ['/api/send', '/api/send']
+
+    def test_sends_are_inline_again_after_clear_rate_limits(self, seen):
+        umami.set_rate_limits(send_rate=100, send_burst=1, when_limited='buffer')
+        umami.new_event(event_name='a')
+        umami.new_event(event_name='b')
+        umami.clear_rate_limits()
+        assert umami.flush(timeout=5) == 0
+        with patch('umami.impl._http_post', side_effect=httpx.ConnectError('down')):
+            with pytest.raises(httpx.ConnectError):
+                umami.new_event(event_name='c')
+
+    async def test_async_waits_for_a_token(self, seen):
+        umami.set_rate_limits(send_rate=10, send_burst=1)
+        with patch('umami.impl.ratelimit.asyncio.sleep') as sleep:
+            await umami.new_event_async(event_name='a')
+            await umami.new_event_async(event_name='b')
+        assert len(seen) == 2
+        sleep.assert_awaited_once()
+
+    async def test_async_per_call_timeout_does_not_wait_for_a_token(self, seen):
+        umami.set_rate_limits(data_rate=0.5, data_burst=1)
+        assert await umami.heartbeat_async()
+        started = time.monotonic()
+        assert not await umami.heartbeat_async(timeout=0.1)
+        assert time.monotonic() - started < 0.1
+        assert paths(seen) == ['/api/heartbeat']
+
+    async def test_async_buffer_when_limited(self, seen):
+        umami.set_rate_limits(send_rate=100, send_burst=1, when_limited='buffer')
+        await umami.new_event_async(event_name='a')
+        await umami.new_event_async(event_name='b')
+        await umami.flush_async()
+        assert paths(seen) == ['/api/send', '/api/send']
+
+    def test_clear_rate_limits(self, seen):
+        umami.set_rate_limits(send_rate=0.001, send_burst=1, when_limited='drop')
+        umami.clear_rate_limits()
+        umami.new_event(event_name='a')
+        umami.new_event(event_name='b')
+        assert len(seen) == 2
+
+    @pytest.mark.parametrize(
+        'kwargs',
+        [{'send_rate': 0}, {'data_rate': -1}, {'send_rate': 1, 'send_burst': 0}, {'when_limited': 'block'}],
+    )
+    def test_invalid_settings(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_rate_limits(**kwargs)
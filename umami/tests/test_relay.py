@@ -0,0 +1,180 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from _mocks import make_async_client, make_sync_mock, patch_async_client
+from umami.relay import Relay
+from umami.relay.__main__ import build_parser, main
+
+import umami
+
+needs_unix_sockets = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='needs Unix datagram sockets')
+
+
+@pytest.fixture
+def relay_at():
+    """Start an in-process relay on an address; yields a function that returns it. Stopped afterwards."""
+    relays = []
+
+    def start(address):
+        umami.start_background_sender()
+        relay = Relay(address)
+        thread = threading.Thread(target=relay.serve_forever, daemon=True)
+        thread.start()
+        relays.append((relay, thread))
+        return relay
+
+    yield start
+    for relay, thread in relays:
+        relay.stop()
+        thread.join(5)
+        relay.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@needs_unix_sockets
+class TestUnixSocketRelay:
+    def test_events_reach_umami_through_the_relay(self, relay_at, tmp_path):
+        relay = relay_at(str(tmp_path / 'relay.sock'))
+        umami.configure(transport='relay', socket=relay.address)
+
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post, patch('umami.impl.auth_token', 'tok'):
+            assert umami.new_event(event_name='signup', custom_data={'plan': 'pro'}) == {}
+            assert umami.new_page_view('Home', '/', ua='Custom-UA') == {}
+            assert wait_for(lambda: mock_post.call_count == 2)
+
+        event, page_view = mock_post.call_args_list
+        assert event.args[0] == 'https://example.com/api/send'
+        assert event.kwargs['json']['payload']['data'] == {'plan': 'pro'}
+        assert event.kwargs['headers'] == {'User-Agent': umami.impl.event_user_agent, 'Authorization': 'Bearer tok'}
+        assert page_view.kwargs['headers']['User-Agent'] == 'Custom-UA'
+
+    async def test_async_sends_use_the_relay(self, relay_at, tmp_path):
+        relay = relay_at(str(tmp_path / 'relay.sock'))
+        umami.configure(transport='relay', socket=relay.address)
+        client = make_async_client()
+
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post, patch_async_client(client):
+            assert await umami.new_event_async(event_name='e') == {}
+            assert wait_for(lambda: mock_post.call_count == 1)
+        client.post.assert_not_called()
+
+    def test_counters_use_the_relay(self, relay_at, tmp_path):
+        relay = relay_at(str(tmp_path / 'relay.sock'))
+        umami.configure(transport='relay', socket=relay.address)
+
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.increment('hits', count=3)
+            umami.flush_counters()
+            assert wait_for(lambda: mock_post.call_count == 1)
+        assert mock_post.call_args.kwargs['json']['payload']['data'] == {'count': 3}
+
+    def test_invalid_datagrams_are_rejected(self, relay_at, tmp_path):
+        relay = relay_at(str(tmp_path / 'relay.sock'))
+        for datagram in (b'not json', b'[1, 2]', b'{"ua": "x", "event": {"type": "event"}}'):
+            assert not relay.handle(datagram)
+        assert relay.rejected == 3
+
+    def test_bad_datagrams_do_not_stop_the_relay(self, relay_at, tmp_path):
+        relay = relay_at(str(tmp_path / 'relay.sock'))
+        umami.configure(transport='relay', socket=relay.address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for datagram in (b'[1]', b'"x"', b'\xff\xfe'):
+            sock.sendto(datagram, relay.address)
+        sock.close()
+        assert wait_for(lambda: relay.rejected == 3)
+
+        with patch('umami.impl._send_headers', side_effect=TypeError('boom')):
+            assert not relay.handle(b'{"ua": "x", "event": {"type": "event", "payload": {}}}')
+        assert relay.dropped == 1
+
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            assert umami.new_event(event_name='still-serving') == {}
+            assert wait_for(lambda: mock_post.call_count == 1)
+
+    def test_missing_relay_drops_without_raising(self, tmp_path):
+        umami.configure(transport='relay', socket=str(tmp_path / 'nobody-listening.sock'))
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            assert umami.new_event(event_name='e') == {}
+            assert umami.new_event(event_name='e') == {}
+        mock_post.assert_not_called()
+        assert umami.impl._relay.dropped == 2
+
+    def test_back_to_http(self, tmp_path):
+        umami.configure(transport='relay', socket=str(tmp_path / 'relay.sock'))
+        umami.configure(transport='http')
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_event(event_name='e')
+        mock_post.assert_called_once()
+
+
+class TestUdpRelay:
+    def test_events_reach_umami_through_the_relay(self, relay_at):
+        relay = relay_at(('127.0.0.1', 0))
+        umami.configure(transport='relay', socket=relay.address)
+
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_revenue_event(event_name='purchase', revenue=10, currency='USD')
+            assert wait_for(lambda: mock_post.call_count == 1)
+        assert mock_post.call_args.kwargs['json']['payload']['data']['revenue'] == 10
+
+
+class TestConfigure:
+    @pytest.mark.parametrize(
+        'kwargs',
+        [
+            {'transport': 'carrier-pigeon'},
+            {'transport': 'relay'},
+            {'transport': 'relay', 'socket': ''},
+            {'transport': 'relay', 'socket': ('127.0.0.1', '8125')},
+            {'socket': '/run/umami.sock'},
+        ],
+    )
+    def test_invalid(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.configure(**kwargs)
+
+
+class TestCommandLine:
+    def test_needs_exactly_one_destination(self, monkeypatch):
+        monkeypatch.delenv('UMAMI_URL', raising=False)
+        monkeypatch.delenv('UMAMI_CLOUD_API_KEY', raising=False)
+        with pytest.raises(SystemExit):
+            main(['--socket', '/tmp/x.sock'])
+        with pytest.raises(SystemExit):
+            main(['--socket', '/tmp/x.sock', '--url', 'https://a', '--cloud-api-key', 'k'])
+
+    def test_udp_address(self):
+        args = build_parser().parse_args(['--udp', '127.0.0.1:8125', '--url', 'https://a'])
+        assert args.udp == ('127.0.0.1', 8125)
+        with pytest.raises(SystemExit):
+            build_parser().parse_args(['--udp', 'no-port', '--url', 'https://a'])
+
+    @needs_unix_sockets
+    def test_runs_until_sigterm(self, tmp_path):
+        path = str(tmp_path / 'relay.sock')
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'umami.relay', '--socket', path, '--url', 'http://127.0.0.1:9'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(umami.__file__))),
+        )
+        try:
+            assert wait_for(lambda: os.path.exists(path), timeout=15)
+            process.send_signal(signal.SIGTERM)
+            assert process.wait(15) == 0
+        finally:
+            process.kill()
+        assert not os.path.exists(path)
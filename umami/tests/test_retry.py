@@ -0,0 +1,181 @@
+from unittest.mock import patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import recording_transport
+from umami.impl.retry import RetryBudget, RetryPolicy, retry_after_seconds
+
+import umami
+
+
+@pytest.fixture
+def script(monkeypatch):
+    """
+    Route sync and async calls through a scripted transport; returns (set outcomes, list of seen requests).
+
+    Outcomes are played in order: a status code, (status, headers), or an exception to raise.
+    """
+    outcomes = []
+
+    def respond(request):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        return httpx.Response(status, json={'ok': status < 400}, headers=headers)
+
+    def play(*new_outcomes):
+        outcomes[:] = new_outcomes
+
+    return play, recording_transport(monkeypatch, respond)
+
+
+class TestRetries:
+    def test_off_by_default(self, script):
+        play, seen = script
+        play(503)
+        with pytest.raises(httpx.HTTPStatusError):
+            umami.new_event(event_name='e')
+        assert len(seen) == 1
+
+    def test_retries_5xx_then_succeeds(self, script):
+        play, seen = script
+        play(503, 502, 200)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        assert umami.new_event(event_name='e') == {'ok': True}
+        assert len(seen) == 3
+
+    def test_retries_connect_errors(self, script):
+        play, seen = script
+        play(httpx.ConnectError('refused'), 200)
+        umami.set_retry_policy(max_attempts=2, backoff_base=0)
+        assert umami.heartbeat() is True
+        assert len(seen) == 2
+
+    def test_gives_up_after_max_attempts(self, script):
+        play, seen = script
+        play(500, 500, 500)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        with pytest.raises(httpx.HTTPStatusError):
+            umami.new_event(event_name='e')
+        assert len(seen) == 3
+
+    def test_client_errors_are_not_retried(self, script):
+        play, seen = script
+        play(400, 200)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        with pytest.raises(httpx.HTTPStatusError):
+            umami.new_event(event_name='e')
+        assert len(seen) == 1
+
+    def test_honors_retry_after(self, script):
+        play, seen = script
+        play((429, {'Retry-After': '2'}), 200)
+        umami.set_retry_policy(max_attempts=2, backoff_base=0)
+        with patch('umami.impl.retry.time.sleep') as sleep:
+            umami.new_event(event_name='e')
+        sleep.assert_called_once_with(2.0)
+
+    def test_retry_after_beyond_backoff_max_is_not_retried(self, script):
+        play, seen = script
+        play((503, {'Retry-After': '120'}), 200)
+        umami.set_retry_policy(max_attempts=2, backoff_max=5)
+        with pytest.raises(httpx.HTTPStatusError):
+            umami.new_event(event_name='e')
+        assert len(seen) == 1
+
+    async def test_async_retries_the_same_way(self, script):
+        play, seen = script
+        play(503, httpx.ReadTimeout('slow'), 200)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        assert await umami.new_event_async(event_name='e') == {'ok': True}
+        assert len(seen) == 3
+
+    def test_budget_limits_retries_during_an_outage(self, script):
+        play, seen = script
+        play(*[503] * 20)
+        umami.set_retry_policy(max_attempts=5, backoff_base=0, budget_ratio=0, budget_reserve=2)
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                umami.new_event(event_name='e')
+        assert len(seen) == 3 + 2  # three first attempts, then only the two reserved retries
+
+    @pytest.mark.parametrize('kwargs', [{'max_attempts': 0}, {'backoff_base': -1}, {'budget_ratio': -0.1}])
+    def test_invalid_settings(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_retry_policy(**kwargs)
+
+
+class TestRetryPolicy:
+    def test_backoff_uses_full_jitter_capped_at_backoff_max(self):
+        policy = RetryPolicy(max_attempts=10, backoff_base=1, backoff_max=4)
+        with patch('umami.impl.retry.random.uniform', side_effect=lambda lo, hi: hi) as uniform:
+            assert [policy._retry_delay(n, None) for n in (1, 2, 3, 4)] == [1, 2, 4, 4]
+        assert all(call.args[0] == 0 for call in uniform.call_args_list)
+
+    def test_budget_earns_retries_back(self):
+        budget = RetryBudget(ratio=0.5, reserve=1)
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.withdraw()
+
+    def test_retry_after_http_date(self):
+        resp = httpx.Response(503, headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        assert retry_after_seconds(resp) == 0.0  # in the past: retry now
+        assert retry_after_seconds(httpx.Response(503, headers={'Retry-After': 'soon'})) is None
+
+
+class TestRetriesUnderDedupWindow:
+    """Keyed events are retried only when the server certainly never saw them, so they can't be stored twice."""
+
+    def test_read_timeout_is_not_retried_and_counts_as_delivered(self, script):
+        play, seen = script
+        play(httpx.ReadTimeout('no response'), 200)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        umami.set_dedup_window()
+        body = umami.impl._event_body('purchase')
+        with pytest.raises(httpx.ReadTimeout):
+            umami.impl._post_events([body], umami.impl._send_headers())
+        assert len(seen) == 1
+        assert umami.impl._dedup.unsent([body]) == []  # never sent again, by any path
+
+    def test_5xx_is_not_retried(self, script):
+        play, seen = script
+        play(500, 200)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        umami.set_dedup_window()
+        with pytest.raises(httpx.HTTPStatusError):
+            umami.new_revenue_event(revenue=10)
+        assert len(seen) == 1
+
+    async def test_async_read_timeout_is_not_retried(self, script):
+        play, seen = script
+        play(httpx.ReadTimeout('no response'), 200)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        umami.set_dedup_window()
+        with pytest.raises(httpx.ReadTimeout):
+            await umami.new_revenue_event_async(revenue=10)
+        assert len(seen) == 1
+
+    def test_failures_before_the_request_reached_the_server_are_retried(self, script):
+        play, seen = script
+        play(httpx.ConnectError('refused'), 429, 200)
+        umami.set_retry_policy(max_attempts=3, backoff_base=0)
+        umami.set_dedup_window()
+        assert umami.new_revenue_event(revenue=10) == {'ok': True}
+        assert len(seen) == 3
+
+    def test_ambiguous_failure_is_not_spooled(self, script, tmp_path):
+        play, seen = script
+        play(503, 503)
+        umami.set_dedup_window()
+        umami.start_spool(str(tmp_path / 'spool.db'), check_interval=60)
+        with pytest.raises(httpx.HTTPStatusError):
+            umami.new_revenue_event(revenue=10)
+        assert len(umami.impl._spool) == 0
+
+        umami.clear_dedup_window()
+        assert umami.new_revenue_event(revenue=10) == {}  # without a window, outages are spooled as before
+        assert len(umami.impl._spool) == 1
@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 import pytest
-from _mocks import make_async_client, mock_response
+from _mocks import make_async_client, mock_response, patch_async_client
 from umami.errors import ValidationError
 
 import umami
@@ -10,7 +10,7 @@ import umami
 class TestNewRevenueEvent:
     """Tests for the sync new_revenue_event function."""
 
-    @patch('umami.impl.httpx.post')
+    @patch('umami.impl._http_post')
     def test_default_revenue_event(self, mock_post):
         mock_post.return_value = mock_response()
 
@@ -22,7 +22,7 @@ class TestNewRevenueEvent:
         assert payload['data']['revenue'] == 19.99
         assert payload['data']['currency'] == 'USD'
 
-    @patch('umami.impl.httpx.post')
+    @patch('umami.impl._http_post')
     def test_custom_currency(self, mock_post):
         mock_post.return_value = mock_response()
 
@@ -31,7 +31,7 @@ class TestNewRevenueEvent:
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['data']['currency'] == 'EUR'
 
-    @patch('umami.impl.httpx.post')
+    @patch('umami.impl._http_post')
     def test_custom_event_name(self, mock_post):
         mock_post.return_value = mock_response()
 
@@ -40,7 +40,7 @@ class TestNewRevenueEvent:
         payload = mock_post.call_args.kwargs['json']['payload']
         assert payload['name'] == 'checkout-cart'
 
-    @patch('umami.impl.httpx.post')
+    @patch('umami.impl._http_post')
     def test_additional_custom_data_preserved(self, mock_post):
         mock_post.return_value = mock_response()
 
@@ -52,7 +52,7 @@ class TestNewRevenueEvent:
         assert payload['data']['revenue'] == 25.00
         assert payload['data']['currency'] == 'USD'
 
-    @patch('umami.impl.httpx.post')
+    @patch('umami.impl._http_post')
     def test_revenue_currency_override_custom_data(self, mock_post):
         mock_post.return_value = mock_response()
 
@@ -69,7 +69,7 @@ class TestNewRevenueEvent:
         assert payload['data']['revenue'] == 30.00
         assert payload['data']['currency'] == 'GBP'
 
-    @patch('umami.impl.httpx.post')
+    @patch('umami.impl._http_post')
     def test_zero_revenue_allowed(self, mock_post):
         mock_post.return_value = mock_response()
 
@@ -96,7 +96,7 @@ class TestNewRevenueEvent:
         # Should return an empty dict without making any HTTP call
         assert result == {}
 
-    @patch('umami.impl.httpx.post')
+    @patch('umami.impl._http_post')
     def test_integer_revenue(self, mock_post):
         mock_post.return_value = mock_response()
 
@@ -113,7 +113,7 @@ class TestNewRevenueEventAsync:
     async def test_default_revenue_event_async(self):
         mock_client = make_async_client()
 
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             result = await umami.new_revenue_event_async(revenue=19.99)
 
         call_kwargs = mock_client.post.call_args
@@ -127,7 +127,7 @@ class TestNewRevenueEventAsync:
     async def test_custom_params_async(self):
         mock_client = make_async_client()
 
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             await umami.new_revenue_event_async(
                 revenue=49.00,
                 currency='EUR',
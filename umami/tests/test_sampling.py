@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+import pytest
+from _mocks import make_async_client, make_sync_mock, patch_async_client
+from umami.impl.sampling import Sampler
+
+import umami
+
+
+class TestSampler:
+    def test_event_name_beats_url_prefix_and_longest_prefix_wins(self):
+        sampler = Sampler(event_rates={'search': 0.5}, url_rates={'/api/': 0.1, '/api/admin/': 0.9}, default_rate=0.2)
+        assert sampler.rate_for('search', '/api/x') == 0.5
+        assert sampler.rate_for('other', '/api/admin/users') == 0.9
+        assert sampler.rate_for(None, '/api/users') == 0.1
+        assert sampler.rate_for(None, '/home') == 0.2
+
+    def test_distinct_id_sampling_is_deterministic(self):
+        sampler = Sampler(default_rate=0.5)
+        for user in ('alice', 'bob', 'carol', 'dave'):
+            outcomes = {sampler.sample(name, '/', user) for name in ('a', 'b', 'c', 'd')}
+            assert len(outcomes) == 1
+
+    def test_distinct_id_sampling_tracks_the_rate(self):
+        sampler = Sampler(default_rate=0.25)
+        kept = sum(sampler.sample('e', '/', f'user-{n}') is not None for n in range(10_000))
+        assert 2_000 < kept < 3_000
+
+    def test_extreme_rates(self):
+        assert Sampler(default_rate=0).sample('e', '/', None) is None
+        assert Sampler(default_rate=1).sample('e', '/', None) == 1.0
+
+
+class TestSampledSends:
+    def test_dropped_event_makes_no_request(self):
+        umami.set_sampling(event_rates={'noisy': 0})
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            assert umami.new_event(event_name='noisy') == {}
+        mock_post.assert_not_called()
+
+    def test_kept_event_records_the_rate(self):
+        umami.set_sampling(default_rate=0.5)
+        with patch('umami.impl.sampling.random.random', return_value=0.1):
+            with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+                umami.new_event(event_name='e', custom_data={'plan': 'pro'})
+        assert mock_post.call_args.kwargs['json']['payload']['data'] == {'plan': 'pro', 'sample_rate': 0.5}
+
+    def test_unsampled_events_are_unchanged(self):
+        umami.set_sampling(event_rates={'other': 0.1})
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_event(event_name='e')
+        assert mock_post.call_args.kwargs['json']['payload']['data'] == {}
+
+    def test_page_views_use_url_prefixes(self):
+        umami.set_sampling(url_rates={'/api/': 0})
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            assert umami.new_page_view('Users', '/api/users') == {}
+            mock_post.assert_not_called()
+            umami.new_page_view('Home', '/')
+            mock_post.assert_called_once()
+
+    def test_new_events_leaves_out_sampled_events(self):
+        umami.set_sampling(event_rates={'noisy': 0})
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_events([{'event_name': 'noisy'}, {'event_name': 'keep'}, {'event_name': 'keep'}])
+        assert [b['payload']['name'] for b in mock_post.call_args.kwargs['json']] == ['keep', 'keep']
+
+    async def test_async_twins_are_sampled(self):
+        umami.set_sampling(default_rate=0)
+        client = make_async_client()
+        with patch_async_client(client):
+            assert await umami.new_event_async(event_name='e') == {}
+            assert await umami.new_page_view_async('Home', '/') == {}
+        client.post.assert_not_called()
+
+    def test_clear_sampling(self):
+        umami.set_sampling(default_rate=0)
+        umami.clear_sampling()
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_event(event_name='e')
+        mock_post.assert_called_once()
+
+    @pytest.mark.parametrize(
+        'kwargs',
+        [{'default_rate': 1.5}, {'event_rates': {'e': -0.1}}, {'url_rates': {'': 0.5}}, {'event_rates': {'e': '1'}}],
+    )
+    def test_invalid_rules(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_sampling(**kwargs)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from _mocks import END, START, STATS_JSON, make_async_client, make_sync_mock, patch_async_client
+
+import umami
+
+
+def sent_payload(mock_post):
+    return mock_post.call_args.kwargs['json']['payload']
+
+
+class TestScoped:
+    def test_events_use_the_scoped_defaults(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            with umami.scoped(website_id='site-b', hostname='b.com', distinct_id=42):
+                umami.new_event(event_name='e')
+                payload = sent_payload(mock_post)
+                umami.new_page_view('Home', '/')
+                page_view = sent_payload(mock_post)
+            umami.new_event(event_name='e')
+
+        assert (payload['website'], payload['hostname'], payload['id']) == ('site-b', 'b.com', '42')
+        assert (page_view['website'], page_view['id']) == ('site-b', '42')
+        after = sent_payload(mock_post)
+        assert (after['website'], after['hostname'], 'id' in after) == ('test-website-id', 'test.com', False)
+
+    def test_explicit_arguments_win(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            with umami.scoped(website_id='site-b', distinct_id='scoped-user'):
+                umami.new_event(event_name='e', website_id='site-c', distinct_id='explicit-user')
+
+        payload = sent_payload(mock_post)
+        assert (payload['website'], payload['hostname'], payload['id']) == ('site-c', 'test.com', 'explicit-user')
+
+    def test_nested_scopes_fill_in_from_the_outer_one(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            with umami.scoped(website_id='site-b', hostname='b.com'):
+                with umami.scoped(hostname='shop.b.com'):
+                    umami.new_event(event_name='e')
+                    inner = sent_payload(mock_post)
+                umami.new_event(event_name='e')
+                outer = sent_payload(mock_post)
+
+        assert (inner['website'], inner['hostname']) == ('site-b', 'shop.b.com')
+        assert (outer['website'], outer['hostname']) == ('site-b', 'b.com')
+
+    def test_stats_use_the_scoped_website(self):
+        with (
+            patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get,
+            patch('umami.impl.auth_token', 'tok'),
+        ):
+            with umami.scoped(website_id='site-b'):
+                umami.website_stats(START, END)
+        assert mock_get.call_args.args[0] == 'https://example.com/api/websites/site-b/stats'
+
+    def test_threads_do_not_share_scopes(self):
+        seen = {}
+        inside = threading.Barrier(2)
+
+        def post(url, **kwargs):
+            payload = kwargs['json']['payload']
+            seen[payload['name']] = payload['website']
+            return make_sync_mock().return_value
+
+        def track(site):
+            with umami.scoped(website_id=site):
+                inside.wait(5)  # both scopes are open at once
+                umami.new_event(event_name=site)
+
+        with patch('umami.impl._http_post', post):
+            threads = [threading.Thread(target=track, args=(site,)) for site in ('a', 'b')]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert seen == {'a': 'a', 'b': 'b'}
+
+    async def test_concurrent_tasks_do_not_share_scopes(self):
+        client = make_async_client()
+
+        async def handle(site):
+            with umami.scoped(website_id=site, hostname=f'{site}.com'):
+                await asyncio.sleep(0)  # let the other requests open their scopes
+                await umami.new_event_async(event_name=site)
+
+        with patch_async_client(client):
+            await asyncio.gather(*(handle(f'site-{n}') for n in range(20)))
+
+        payloads = [c.kwargs['json']['payload'] for c in client.post.call_args_list]
+        assert len(payloads) == 20
+        assert all(p['website'] == p['name'] and p['hostname'] == f'{p["name"]}.com' for p in payloads)
+
+    def test_applies_to_clients(self):
+        client = umami.Client('https://tenant.example.com', website_id='w1', hostname='t.com')
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            with umami.scoped(website_id='site-b'):
+                client.new_event(event_name='e')
+        assert (sent_payload(mock_post)['website'], sent_payload(mock_post)['hostname']) == ('site-b', 't.com')
+
+    @pytest.mark.parametrize('kwargs', [{'website_id': ''}, {'hostname': '  '}, {'distinct_id': True}])
+    def test_invalid_values(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            with umami.scoped(**kwargs):
+                pass
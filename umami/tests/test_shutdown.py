@@ -0,0 +1,175 @@
+import logging
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from _mocks import make_sync_mock
+
+import umami
+
+# Sends events that stay buffered (long flush interval) and prints each request's event names as it is sent.
+CHILD_PRELUDE = textwrap.dedent(
+    """
+    import sys, time
+    from unittest.mock import MagicMock
+    import umami
+
+    def post(url, **kwargs):
+        body = kwargs['json']
+        bodies = body if isinstance(body, list) else [body]
+        print('sent', ' '.join(b['payload']['name'] for b in bodies), flush=True)
+        return MagicMock(status_code=200, content=b'{}', json=lambda: {})
+
+    umami.impl._http_post = post
+    umami.set_url_base('https://example.com')
+    umami.set_website_id('w')
+    umami.set_hostname('h')
+    umami.start_background_sender(batch_size=100, flush_interval=60)
+    umami.new_event(event_name='a')
+    umami.new_event(event_name='b')
+    """
+)
+
+
+def run_child(script, **kwargs):
+    return subprocess.Popen(
+        [sys.executable, '-c', CHILD_PRELUDE + textwrap.dedent(script)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(umami.__file__))),
+        stdout=subprocess.PIPE,
+        text=True,
+        **kwargs,
+    )
+
+
+class TestFlush:
+    def test_sends_the_partial_batch_now(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.start_background_sender(batch_size=100, flush_interval=60)
+            for n in range(3):
+                umami.new_event(event_name=f'e{n}')
+            assert umami.flush(timeout=5) == 0
+
+        assert [b['payload']['name'] for b in mock_post.call_args.kwargs['json']] == ['e0', 'e1', 'e2']
+
+    def test_drains_the_queue_in_parallel(self):
+        def slow_post(*args, **kwargs):
+            time.sleep(0.1)
+            return make_sync_mock().return_value
+
+        with patch('umami.impl._http_post', slow_post):
+            umami.start_background_sender()  # one event per request
+            for n in range(10):
+                umami.new_event(event_name=f'e{n}')
+            started = time.monotonic()
+            assert umami.flush(timeout=5) == 0
+            elapsed = time.monotonic() - started
+
+        assert elapsed < 0.6  # ten 0.1 s sends one after another would take a second
+
+    def test_returns_at_the_deadline_with_the_unsent_count(self):
+        release = threading.Event()
+
+        def stuck_post(*args, **kwargs):
+            release.wait(5)
+            return make_sync_mock().return_value
+
+        with patch('umami.impl._http_post', stuck_post):
+            umami.start_background_sender(batch_size=1)
+            for n in range(3):
+                umami.new_event(event_name=f'e{n}')
+            started = time.monotonic()
+            assert umami.flush(timeout=0.2) == 3
+            assert time.monotonic() - started < 1.0
+            release.set()
+            assert umami.flush(timeout=5) == 0
+
+    def test_sends_counters(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.increment('hits', count=2)
+            assert umami.flush() == 0
+        assert mock_post.call_args.kwargs['json'][0]['payload']['data'] == {'count': 2}
+
+    def test_nothing_buffered(self):
+        assert umami.flush() == 0
+
+    def test_invalid_timeout(self):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.flush(timeout=-1)
+
+
+class TestShutdown:
+    def test_sends_then_stops_everything(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.start_background_sender(batch_size=100, flush_interval=60)
+            umami.new_event(event_name='e')
+            umami.increment('hits')
+            assert umami.shutdown(timeout=5) == 0
+
+        assert mock_post.call_count == 2
+        assert umami.impl._background is None
+        assert umami.impl._counters is None
+        assert umami.impl._client is None
+
+    def test_reports_and_logs_dropped_events(self, caplog):
+        release = threading.Event()
+
+        def stuck_post(*args, **kwargs):
+            release.wait(5)
+            return make_sync_mock().return_value
+
+        try:
+            with patch('umami.impl._http_post', stuck_post), caplog.at_level(logging.WARNING, logger='umami'):
+                umami.start_background_sender()
+                umami.new_event(event_name='e1')
+                umami.new_event(event_name='e2')
+                started = time.monotonic()
+                assert umami.shutdown(timeout=0.2) == 2
+                assert time.monotonic() - started < 1.0
+        finally:
+            release.set()
+        assert 'dropped 2 event(s)' in caplog.text
+
+
+class TestExitHooks:
+    def test_buffered_events_are_sent_at_exit(self):
+        child = run_child('')
+        out, _ = child.communicate(timeout=30)
+        assert child.returncode == 0
+        assert out.splitlines() == ['sent a b']
+
+    def test_exit_flush_can_be_turned_off(self):
+        child = run_child('umami.set_exit_flush(timeout=None)\n')
+        out, _ = child.communicate(timeout=30)
+        assert out == ''
+
+    @pytest.mark.skipif(not hasattr(signal, 'SIGTERM') or os.name != 'posix', reason='needs POSIX signals')
+    def test_sigterm_flushes_then_terminates(self):
+        child = run_child(
+            """
+            umami.set_exit_flush(timeout=5, on_sigterm=True)
+            print('ready', flush=True)
+            time.sleep(30)
+            """
+        )
+        assert child.stdout.readline() == 'ready\n'
+        child.send_signal(signal.SIGTERM)
+        out, _ = child.communicate(timeout=30)
+        assert out.splitlines() == ['sent a b']
+        assert child.returncode == -signal.SIGTERM
+
+    def test_sigterm_handler_is_restored(self):
+        before = signal.getsignal(signal.SIGTERM)
+        umami.set_exit_flush(on_sigterm=True)
+        assert signal.getsignal(signal.SIGTERM) is umami.impl._flush_on_sigterm
+        umami.set_exit_flush(on_sigterm=False)
+        assert signal.getsignal(signal.SIGTERM) == before
+
+    def test_invalid_timeout(self):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_exit_flush(timeout='soon')  # type: ignore[arg-type]
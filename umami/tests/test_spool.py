@@ -0,0 +1,183 @@
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import make_sync_mock
+from umami.impl.spool import Spool, SpoolDrainer
+
+import umami
+
+
+def status_response(status_code):
+    """A real response with `status_code`, so raise_for_status() raises HTTPStatusError for 4xx/5xx."""
+    return httpx.Response(status_code, json={}, request=httpx.Request('POST', 'https://example.com/api/send'))
+
+
+def connect_error(*args, **kwargs):
+    raise httpx.ConnectError('connection refused')
+
+
+class TestSpool:
+    def test_rows_survive_reopening_the_file(self, tmp_path):
+        path = str(tmp_path / 'spool.db')
+        spool = Spool(path)
+        spool.add([{'n': 1}, {'n': 2}], 'UA')
+        spool.close()
+
+        spool = Spool(path)
+        assert len(spool) == 2
+        assert [(body, ua) for _, body, ua in spool.peek(10)] == [({'n': 1}, 'UA'), ({'n': 2}, 'UA')]
+        spool.close()
+
+    def test_remove(self, tmp_path):
+        spool = Spool(str(tmp_path / 'spool.db'))
+        spool.add([{'n': 1}, {'n': 2}], 'UA')
+        first_id = spool.peek(1)[0][0]
+        spool.remove([first_id])
+        assert len(spool) == 1
+        assert spool.peek(10)[0][1] == {'n': 2}
+        spool.close()
+
+    def test_overflow_is_dropped(self, tmp_path):
+        spool = Spool(str(tmp_path / 'spool.db'), max_events=2)
+        assert spool.add([{'n': 1}, {'n': 2}, {'n': 3}], 'UA') == 2
+        assert len(spool) == 2
+        assert spool.dropped == 1
+        spool.close()
+
+
+class TestSpoolingFailedSends:
+    @pytest.fixture(autouse=True)
+    def _spool(self, tmp_path):
+        umami.start_spool(str(tmp_path / 'spool.db'), check_interval=60)
+
+    def test_connection_error_is_spooled(self):
+        with patch('umami.impl._http_post', MagicMock(side_effect=connect_error)):
+            assert umami.new_event(event_name='e') == {}
+
+        ((_, body, ua),) = umami.impl._spool.peek(10)
+        assert body['payload']['name'] == 'e'
+        assert ua == umami.impl.event_user_agent
+
+    def test_server_error_and_429_are_spooled(self):
+        for status in (503, 429):
+            with patch('umami.impl._http_post', MagicMock(return_value=status_response(status))):
+                assert umami.new_page_view('Home', '/', ua='Custom-UA') == {}
+        assert [ua for _, _, ua in umami.impl._spool.peek(10)] == ['Custom-UA', 'Custom-UA']
+
+    def test_client_error_still_raises(self):
+        with patch('umami.impl._http_post', MagicMock(return_value=status_response(400))):
+            with pytest.raises(httpx.HTTPStatusError):
+                umami.new_event(event_name='e')
+        assert len(umami.impl._spool) == 0
+
+    def test_batch_is_spooled(self):
+        with patch('umami.impl._http_post', MagicMock(side_effect=connect_error)):
+            assert umami.new_events([{'event_name': 'a'}, {'event_name': 'b'}]) == {}
+        assert len(umami.impl._spool) == 2
+
+    def test_background_sender_spools(self):
+        umami.start_background_sender()
+        with patch('umami.impl._http_post', MagicMock(side_effect=connect_error)):
+            umami.new_event(event_name='e')
+            sender = umami.impl._background
+            umami.stop_background_sender(timeout=5)
+        assert len(umami.impl._spool) == 1
+        assert sender.failed == 0
+
+    async def test_async_send_is_spooled(self):
+        with patch('umami.impl._http_post_async', AsyncMock(side_effect=connect_error)):
+            assert await umami.new_event_async(event_name='e') == {}
+        assert len(umami.impl._spool) == 1
+
+    def test_credentials_are_not_stored(self):
+        with patch('umami.impl.auth_token', 'secret-token'):
+            with patch('umami.impl._http_post', MagicMock(side_effect=connect_error)):
+                umami.new_event(event_name='e')
+        with open(umami.impl._spool.path, 'rb') as f:
+            assert b'secret-token' not in f.read()
+
+
+class TestWithoutSpool:
+    def test_errors_raise(self):
+        with patch('umami.impl._http_post', MagicMock(side_effect=connect_error)):
+            with pytest.raises(httpx.ConnectError):
+                umami.new_event(event_name='e')
+
+    def test_stop_spool_is_safe_without_one(self):
+        assert umami.stop_spool() is True
+
+    @pytest.mark.parametrize(
+        'kwargs',
+        [{'path': ''}, {'max_events': 0}, {'batch_size': 0}, {'replay_rate': 0}, {'check_interval': -1}],
+    )
+    def test_invalid_settings(self, tmp_path, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.start_spool(**{'path': str(tmp_path / 'spool.db'), **kwargs})
+
+
+class TestSpoolDrainer:
+    def make_drainer(self, spool, send, healthy=True):
+        return SpoolDrainer(spool, send, lambda: healthy, replay_rate=10_000, batch_size=2, check_interval=0.01)
+
+    def test_replays_when_healthy(self, tmp_path):
+        spool = Spool(str(tmp_path / 'spool.db'))
+        spool.add([{'n': 1}, {'n': 2}, {'n': 3}], 'UA-1')
+        spool.add([{'n': 4}], 'UA-2')
+        done = threading.Event()
+        sent = []
+
+        def send(bodies, ua):
+            sent.append((bodies, ua))
+            if sum(len(b) for b, _ in sent) == 4:
+                done.set()
+
+        drainer = self.make_drainer(spool, send)
+        drainer.start()
+        assert done.wait(5)
+        assert drainer.stop(5)
+
+        assert sent[0] == ([{'n': 1}, {'n': 2}], 'UA-1')
+        assert len(spool) == 0
+        assert drainer.replayed == 4
+        spool.close()
+
+    def test_waits_while_unhealthy(self, tmp_path):
+        spool = Spool(str(tmp_path / 'spool.db'))
+        spool.add([{'n': 1}], 'UA')
+        send = MagicMock()
+
+        drainer = self.make_drainer(spool, send, healthy=False)
+        drainer.start()
+        threading.Event().wait(0.1)
+        assert drainer.stop(5)
+
+        send.assert_not_called()
+        assert len(spool) == 1
+        spool.close()
+
+    def test_failed_replay_keeps_rows(self, tmp_path):
+        spool = Spool(str(tmp_path / 'spool.db'))
+        spool.add([{'n': 1}], 'UA')
+        attempted = threading.Event()
+
+        def send(bodies, ua):
+            attempted.set()
+            raise httpx.ConnectError('still down')
+
+        drainer = self.make_drainer(spool, send)
+        drainer.start()
+        assert attempted.wait(5)
+        assert drainer.stop(5)
+
+        assert len(spool) == 1
+        spool.close()
+
+    def test_replay_rebuilds_headers(self):
+        body = {'type': 'event', 'payload': {'name': 'e'}}
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post, patch('umami.impl.auth_token', 'tok'):
+            umami.impl._replay_spooled([body], 'Custom-UA')
+
+        assert mock_post.call_args.args[0] == 'https://example.com/api/send'
+        assert mock_post.call_args.kwargs['headers'] == {'User-Agent': 'Custom-UA', 'Authorization': 'Bearer tok'}
@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 import pytest
-from _mocks import END, START, STATS_JSON, make_async_client, make_sync_mock
+from _mocks import END, START, STATS_JSON, make_async_client, make_sync_mock, patch_async_client
 
 import umami
 
@@ -20,12 +20,12 @@ class TestSendPayloadParity:
         ],
     )
     async def test_send_payload_parity(self, sync_fn, async_fn, kwargs):
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             getattr(umami, sync_fn)(**kwargs)
         sync_body = mock_post.call_args.kwargs['json']
 
         client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=client):
+        with patch_async_client(client):
             await getattr(umami, async_fn)(**kwargs)
         async_body = client.post.call_args.kwargs['json']
 
@@ -45,11 +45,11 @@ class TestSendReturnParity:
     )
     async def test_send_return_parity(self, sync_fn, async_fn, kwargs):
         payload = {'sent': True}
-        with patch('umami.impl.httpx.post', make_sync_mock(payload)):
+        with patch('umami.impl._http_post', make_sync_mock(payload)):
             sync_result = getattr(umami, sync_fn)(**kwargs)
 
         client = make_async_client(payload)
-        with patch('umami.impl.httpx.AsyncClient', return_value=client):
+        with patch_async_client(client):
             async_result = await getattr(umami, async_fn)(**kwargs)
 
         assert sync_result == async_result == payload
@@ -59,13 +59,13 @@ class TestQueryRequestParity:
     async def test_website_stats_parity(self):
         kwargs = dict(start_at=START, end_at=END, url='/p', host='h.com')
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.get', make_sync_mock(STATS_JSON)) as mock_get:
+            with patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get:
                 umami.website_stats(**kwargs)
             sync_url = mock_get.call_args.args[0]
             sync_params = mock_get.call_args.kwargs['params']
 
             client = make_async_client(STATS_JSON)
-            with patch('umami.impl.httpx.AsyncClient', return_value=client):
+            with patch_async_client(client):
                 await umami.website_stats_async(**kwargs)
             async_url = client.get.call_args.args[0]
             async_params = client.get.call_args.kwargs['params']
@@ -74,12 +74,12 @@ class TestQueryRequestParity:
 
     async def test_active_users_parity(self):
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.get', make_sync_mock({'visitors': 3})) as mock_get:
+            with patch('umami.impl._http_get', make_sync_mock({'visitors': 3})) as mock_get:
                 sync_result = umami.active_users()
             sync_url = mock_get.call_args.args[0]
 
             client = make_async_client({'visitors': 3})
-            with patch('umami.impl.httpx.AsyncClient', return_value=client):
+            with patch_async_client(client):
                 async_result = await umami.active_users_async()
             async_url = client.get.call_args.args[0]
         assert sync_url == async_url
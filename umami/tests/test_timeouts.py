@@ -0,0 +1,77 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import httpx2 as httpx
+import pytest
+from _mocks import STATS_JSON, make_async_client, make_sync_mock, patch_async_client, recording_transport
+
+import umami
+
+
+@pytest.fixture(autouse=True)
+def _restore_timeouts():
+    saved = umami.impl.timeouts
+    yield
+    umami.impl.timeouts = saved
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Route calls through a real client whose transport records each request (and its timeout extension)."""
+    return recording_transport(monkeypatch, lambda request: httpx.Response(200, json={'visitors': 1}))
+
+
+class TestSetTimeouts:
+    def test_only_given_values_change(self):
+        umami.set_timeouts(connect=0.1)
+        umami.set_timeouts(read=0.25)
+        assert umami.impl.timeouts == httpx.Timeout(connect=0.1, read=0.25, write=5.0, pool=5.0)
+
+    @pytest.mark.parametrize('kwargs', [{'connect': 0}, {'read': -1}, {'pool': 'fast'}, {'write': True}])
+    def test_invalid_values(self, kwargs):
+        with pytest.raises(umami.errors.ValidationError):
+            umami.set_timeouts(**kwargs)
+
+    def test_applied_to_every_request(self, recorded):
+        umami.set_timeouts(connect=0.1, read=0.2, write=0.3, pool=0.4)
+        umami.new_event(event_name='e')
+        assert [r.extensions['timeout'] for r in recorded] == [{'connect': 0.1, 'read': 0.2, 'write': 0.3, 'pool': 0.4}]
+
+
+class TestPerCallTimeout:
+    def test_caps_each_phase(self, recorded):
+        umami.set_timeouts(connect=0.1, read=5, write=5, pool=5)
+        umami.new_event(event_name='e', timeout=0.5)
+
+        (timeout,) = [r.extensions['timeout'] for r in recorded]
+        assert timeout['connect'] == 0.1
+        assert 0.4 < timeout['read'] <= 0.5
+
+    def test_passed_by_send_functions(self):
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
+            umami.new_page_view('Home', '/', timeout=0.05)
+            assert mock_post.call_args.kwargs['timeout'] == 0.05
+            umami.new_revenue_event(revenue=1.0, timeout=0.05)
+            assert mock_post.call_args.kwargs['timeout'] == 0.05
+            umami.new_events([{'event_name': 'a'}], timeout=0.05)
+            assert mock_post.call_args.kwargs['timeout'] == 0.05
+
+    def test_passed_by_query_functions(self):
+        with patch('umami.impl.auth_token', 'fake-token'):
+            with patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get:
+                umami.website_stats(datetime(2024, 1, 1), datetime(2024, 1, 2), timeout=2.0)
+                assert mock_get.call_args.kwargs['timeout'] == 2.0
+
+    async def test_async_functions_take_it_too(self):
+        client = make_async_client({'visitors': 1})
+        with patch('umami.impl.auth_token', 'fake-token'), patch_async_client(client):
+            await umami.active_users_async(timeout=0.3)
+        assert client.get.call_args.kwargs['timeout'] == 0.3
+
+    def test_no_retry_past_the_deadline(self, monkeypatch):
+        attempts = recording_transport(monkeypatch, lambda request: httpx.Response(503))
+        umami.set_retry_policy(max_attempts=5, backoff_base=10, backoff_max=10)
+        with patch('umami.impl.retry.random.uniform', return_value=1.0):
+            with pytest.raises(httpx.HTTPStatusError):
+                umami.new_event(event_name='e', timeout=0.5)
+        assert len(attempts) == 1
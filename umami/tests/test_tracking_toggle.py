@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 import pytest
-from _mocks import make_async_client, make_sync_mock
+from _mocks import make_async_client, make_sync_mock, patch_async_client
 
 import umami
 
@@ -15,14 +15,14 @@ class TestTrackingDisabled:
 
     def test_new_event_makes_no_request(self):
         umami.disable()
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             result = umami.new_event(event_name='e')
         assert result == {}
         mock_post.assert_not_called()
 
     def test_new_page_view_makes_no_request(self):
         umami.disable()
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             result = umami.new_page_view('Home', '/')
         assert result == {}
         mock_post.assert_not_called()
@@ -30,7 +30,7 @@ class TestTrackingDisabled:
     async def test_new_event_async_makes_no_request(self):
         umami.disable()
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             result = await umami.new_event_async(event_name='e')
         assert result == {}
         mock_client.post.assert_not_called()
@@ -38,7 +38,7 @@ class TestTrackingDisabled:
     async def test_new_page_view_async_makes_no_request(self):
         umami.disable()
         mock_client = make_async_client()
-        with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+        with patch_async_client(mock_client):
             result = await umami.new_page_view_async('Home', '/')
         assert result == {}
         mock_client.post.assert_not_called()
@@ -48,7 +48,7 @@ class TestTrackingDisabled:
         # Clear the conftest defaults so the missing hostname/website_id actually trips validation.
         umami.disable()
         with patch('umami.impl.default_website_id', None), patch('umami.impl.default_hostname', None):
-            with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+            with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
                 with pytest.raises(umami.errors.ValidationError):
                     umami.new_event(event_name='e')
         mock_post.assert_not_called()
@@ -16,14 +16,14 @@ class TestValidateEventData:
 
     def test_missing_hostname_raises_validation_error(self):
         with patch('umami.impl.default_hostname', None):
-            with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+            with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
                 with pytest.raises(ValidationError):
                     umami.new_event(event_name='e', hostname=None)
         mock_post.assert_not_called()
 
     def test_missing_website_id_raises_validation_error(self):
         with patch('umami.impl.default_website_id', None):
-            with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+            with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
                 with pytest.raises(ValidationError):
                     umami.new_event(event_name='e', website_id=None)
         mock_post.assert_not_called()
@@ -31,7 +31,7 @@ class TestValidateEventData:
     @pytest.mark.parametrize('name', ['', '   ', '\t'])
     def test_blank_or_whitespace_event_name_raises(self, name):
         # The whitespace-only cases regressed previously (the guard used `and`); now they raise.
-        with patch('umami.impl.httpx.post', make_sync_mock()) as mock_post:
+        with patch('umami.impl._http_post', make_sync_mock()) as mock_post:
             with pytest.raises(ValidationError):
                 umami.new_event(event_name=name)
         mock_post.assert_not_called()
@@ -1,7 +1,7 @@
 from unittest.mock import patch
 
 import pytest
-from _mocks import END, START, STATS_JSON, make_async_client, make_sync_mock
+from _mocks import END, START, STATS_JSON, make_async_client, make_sync_mock, patch_async_client
 
 import umami
 
@@ -15,7 +15,7 @@ class TestWebsiteStatsDateParams:
 
     def test_sync_sends_camelcase_date_params(self):
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.get', make_sync_mock(STATS_JSON)) as mock_get:
+            with patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get:
                 umami.website_stats(start_at=START, end_at=END)
         params = mock_get.call_args.kwargs['params']
         assert params['startAt'] == int(START.timestamp() * 1000)
@@ -27,7 +27,7 @@ class TestWebsiteStatsDateParams:
     async def test_async_sends_camelcase_date_params(self):
         mock_client = make_async_client(STATS_JSON)
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+            with patch_async_client(mock_client):
                 await umami.website_stats_async(start_at=START, end_at=END)
         params = mock_client.get.call_args.kwargs['params']
         assert params['startAt'] == int(START.timestamp() * 1000)
@@ -46,7 +46,7 @@ class TestWebsiteStatsFilterParams:
 
     def test_sync_maps_url_and_host_to_path_and_hostname(self):
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.get', make_sync_mock(STATS_JSON)) as mock_get:
+            with patch('umami.impl._http_get', make_sync_mock(STATS_JSON)) as mock_get:
                 umami.website_stats(start_at=START, end_at=END, url='/pricing', host='example.com')
         params = mock_get.call_args.kwargs['params']
         assert params['path'] == '/pricing'
@@ -58,7 +58,7 @@ class TestWebsiteStatsFilterParams:
     async def test_async_maps_url_and_host_to_path_and_hostname(self):
         mock_client = make_async_client(STATS_JSON)
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+            with patch_async_client(mock_client):
                 await umami.website_stats_async(start_at=START, end_at=END, url='/pricing', host='example.com')
         params = mock_client.get.call_args.kwargs['params']
         assert params['path'] == '/pricing'
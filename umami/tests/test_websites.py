@@ -1,6 +1,6 @@
 from unittest.mock import patch
 
-from _mocks import make_async_client, make_sync_mock
+from _mocks import make_async_client, make_sync_mock, patch_async_client
 
 import umami
 
@@ -27,7 +27,7 @@ class TestWebsites:
 
     def test_returns_parsed_websites(self):
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.get', make_sync_mock(_WEBSITES_JSON)) as mock_get:
+            with patch('umami.impl._http_get', make_sync_mock(_WEBSITES_JSON)) as mock_get:
                 result = umami.websites()
         assert len(result) == 1
         assert result[0].domain == 'example.com'
@@ -42,7 +42,7 @@ class TestWebsitesAsync:
     async def test_returns_parsed_websites(self):
         mock_client = make_async_client(_WEBSITES_JSON)
         with patch('umami.impl.auth_token', 'fake-token'):
-            with patch('umami.impl.httpx.AsyncClient', return_value=mock_client):
+            with patch_async_client(mock_client):
                 result = await umami.websites_async()
         assert len(result) == 1
         assert result[0].domain == 'example.com'
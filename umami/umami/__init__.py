@@ -7,10 +7,12 @@ transactions to a self-hosted or Umami Cloud instance, and query basic stats.
 It is useful for tracking business-logic events (such as a course purchase)
 that have no natural front-end HTML trigger.
 
-The API is a set of module-level functions called as umami.func(...); there is
-no client class. Configuration (URL base, website id, hostname, credentials,
-and the Cloud API key) is stored as module-global state and set via the set_*,
-login, enable, and disable functions.
+The API is a set of module-level functions called as umami.func(...).
+Configuration (URL base, website id, hostname, credentials, and the Cloud API
+key) is stored as module-global state and set via the set_*, login, enable,
+and disable functions. To use several configurations side by side (one per
+tenant, say), create umami.Client or umami.AsyncClient instances instead: each
+has the same methods with its own settings and connection pool.
 
 Two modes are supported:
 
@@ -38,25 +40,47 @@ Example:
     ```
 """
 
-from . import impl  # type: ignore
+# The SDK is imported on first use of one of its names (a PEP 562 module __getattr__, at the bottom), so
+# `import umami` doesn't load httpx2, pydantic or the SDK itself. A CLI or serverless handler that never
+# sends an event pays almost nothing for the import. These static imports are only for type checkers and
+# IDEs; tests/test_import_time.py guards the import cost.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from . import impl  # type: ignore
+    from . import models  # type: ignore noqa: F401, E402
+    from .impl import __version__, user_agent  # type: ignore noqa: F401, E402
+    from .impl import active_users, active_users_async  # type: ignore noqa: F401, E402
+    from .impl import heartbeat_async, heartbeat  # type: ignore noqa: F401, E402
+    from .impl import login_async, login, is_logged_in  # type: ignore noqa: F401, E402
+    from .impl import new_event_async, new_event  # type: ignore noqa: F401, E402
+    from .impl import new_events, new_events_async  # type: ignore noqa: F401, E402
+    from .impl import new_revenue_event, new_revenue_event_async  # type: ignore noqa: F401, E402
+    from .impl import new_page_view, new_page_view_async  # type: ignore noqa: F401, E402
+    from .impl import set_url_base, set_website_id, set_hostname, scoped  # type: ignore noqa: F401, E402
+    from .impl import set_cloud_api_key, clear_cloud_api_key  # type: ignore noqa: F401, E402
+    from .impl import verify_token_async, verify_token  # type: ignore noqa: F401, E402
+    from .impl import website_stats, website_stats_async  # type: ignore noqa: F401, E402
+    from .impl import websites_async, websites  # type: ignore noqa: F401, E402
+    from .impl import enable, disable  # type: ignore noqa: F401, E402
+    from .impl import configure, close, close_async  # type: ignore noqa: F401, E402
+    from .impl import start_background_sender, stop_background_sender, buffer_stats  # type: ignore noqa: F401, E402
+    from .impl import start_async_batcher, flush_async  # type: ignore noqa: F401, E402
+    from .impl import increment, start_counters, stop_counters, flush_counters, flush_counters_async  # type: ignore noqa: F401, E402
+    from .impl import flush, shutdown, set_exit_flush  # type: ignore noqa: F401, E402
+    from .impl import start_spool, stop_spool  # type: ignore noqa: F401, E402
+    from .impl import set_timeouts, set_retry_policy  # type: ignore noqa: F401, E402
+    from .impl import set_rate_limits, clear_rate_limits  # type: ignore noqa: F401, E402
+    from .impl import set_json_codec, set_compression  # type: ignore noqa: F401, E402
+    from .impl import set_circuit_breaker, clear_circuit_breaker  # type: ignore noqa: F401, E402
+    from .impl import set_dedup_window, clear_dedup_window  # type: ignore noqa: F401, E402
+    from .impl import set_sampling, clear_sampling  # type: ignore noqa: F401, E402
+    from .impl.client import Client, AsyncClient  # type: ignore noqa: F401, E402
+
+import importlib
+
 from . import errors  # type: ignore noqa: F401, E402,
-from . import models  # type: ignore noqa: F401, E402
-from .impl import active_users, active_users_async  # type: ignore noqa: F401, E402
-from .impl import heartbeat_async, heartbeat  # type: ignore noqa: F401, E402
-from .impl import login_async, login, is_logged_in  # type: ignore noqa: F401, E402
-from .impl import new_event_async, new_event  # type: ignore noqa: F401, E402
-from .impl import new_revenue_event, new_revenue_event_async  # type: ignore noqa: F401, E402
-from .impl import new_page_view, new_page_view_async  # type: ignore noqa: F401, E402
-from .impl import set_url_base, set_website_id, set_hostname  # type: ignore noqa: F401, E402
-from .impl import set_cloud_api_key, clear_cloud_api_key  # type: ignore noqa: F401, E402
-from .impl import verify_token_async, verify_token  # type: ignore noqa: F401, E402
-from .impl import website_stats, website_stats_async  # type: ignore noqa: F401, E402
-from .impl import websites_async, websites  # type: ignore noqa: F401, E402
-from .impl import enable, disable  # type: ignore noqa: F401, E402
 
 __author__ = 'Michael Kennedy <michael@talkpython.fm>'
-__version__ = impl.__version__
-user_agent = impl.user_agent
 
 # fmt: off
 # ruff: noqa
@@ -64,15 +88,50 @@ __all__ = [
     # Core modules
     'models',
     'errors',
+
+    # Clients with their own settings
+    'Client',
+    'AsyncClient',
     
     # Configuration/Setup
     'set_url_base',
     'set_website_id',
     'set_hostname',
+    'scoped',
     'set_cloud_api_key',
     'clear_cloud_api_key',
     'enable',
     'disable',
+    'configure',
+    'close',
+    'close_async',
+    'set_timeouts',
+    'set_retry_policy',
+    'set_rate_limits',
+    'clear_rate_limits',
+    'set_json_codec',
+    'set_compression',
+    'set_circuit_breaker',
+    'clear_circuit_breaker',
+    'set_dedup_window',
+    'clear_dedup_window',
+    'set_sampling',
+    'clear_sampling',
+    'start_background_sender',
+    'buffer_stats',
+    'stop_background_sender',
+    'start_async_batcher',
+    'flush_async',
+    'increment',
+    'start_counters',
+    'stop_counters',
+    'flush_counters',
+    'flush_counters_async',
+    'flush',
+    'shutdown',
+    'set_exit_flush',
+    'start_spool',
+    'stop_spool',
     
     # Authentication
     'login', 
@@ -90,6 +149,8 @@ __all__ = [
     # Main features - Events and Analytics
     'new_event',
     'new_event_async',
+    'new_events',
+    'new_events_async',
     'new_revenue_event',
     'new_revenue_event_async',
     'new_page_view',
@@ -100,3 +161,24 @@ __all__ = [
     'active_users_async',
 ]
 # fmt: on
+
+
+def __getattr__(name: str) -> object:
+    """Import what `name` needs on first access, then cache it as a plain module attribute."""
+    # import_module() rather than `from . import x`, which would look the
+    # submodule up on this package first and so recurse back in here.
+    if name in ('impl', 'models'):
+        value = importlib.import_module(f'{__name__}.{name}')
+    elif name in ('Client', 'AsyncClient'):
+        value = getattr(importlib.import_module(f'{__name__}.impl.client'), name)
+    elif name in ('__version__', 'user_agent') or name in __all__:
+        value = getattr(importlib.import_module(f'{__name__}.impl'), name)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__) | {'impl', '__version__', 'user_agent'})
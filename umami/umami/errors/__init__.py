@@ -30,3 +30,18 @@ class OperationNotAllowedError(ValidationError):
     """
 
     pass
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when an event is not sent because the circuit breaker is open.
+
+    After set_circuit_breaker(), repeated failures to reach Umami's ingestion
+    endpoint open the breaker. While it is open, send functions raise this
+    immediately instead of waiting on a server that is down or overloaded
+    (unless start_spool() is active, in which case the event is spooled and
+    the call returns normally). The breaker closes again once heartbeat()
+    succeeds and a trial send gets through.
+    """
+
+    pass
@@ -8,14 +8,41 @@ functions from here; import and call them as umami.func(...) rather than
 reaching into this module directly.
 """
 
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import math
+import os
+import signal
 import sys
+import threading
+import time
+import weakref
 from datetime import datetime
-from typing import Any, Dict, Optional, Union
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, TypeVar, Union
 
 import httpx2 as httpx
+import pydantic
 
 from umami import models, urls
-from umami.errors import OperationNotAllowedError, ValidationError
+from umami.errors import CircuitOpenError, OperationNotAllowedError, ValidationError
+from umami.impl.background import AsyncBatcher, BackgroundSender
+from umami.impl.breaker import CircuitBreaker
+from umami.impl.buffer import OVERFLOW_POLICIES
+from umami.impl.codec import JsonCodec, make_codec
+from umami.impl.compression import Compressor, make_compressor
+from umami.impl.config import CLOUD_DATA_BASE, CLOUD_SEND_BASE, Config, Scope
+from umami.impl.counters import CounterAggregator, Counts
+from umami.impl.dedup import KEY_FIELD, DedupWindow, new_key, strip_key
+from umami.impl.ratelimit import TokenBucket
+from umami.impl.relay import Address, RelayClient
+from umami.impl.retry import RetryBudget, RetryPolicy, is_retryable_status, may_have_been_processed
+from umami.impl.sampling import Sampler
+from umami.impl.spool import Spool, SpoolDrainer
 
 try:
     from importlib.metadata import version
@@ -37,8 +64,8 @@ api_key: Optional[str] = None
 cloud_region: Optional[str] = None  # None | 'us' | 'eu'
 
 # Official Umami Cloud hosts
-_CLOUD_DATA_BASE = 'https://api.umami.is/v1'  # data/management API (x-umami-api-key)
-_CLOUD_SEND_BASE = 'https://cloud.umami.is/api'  # public ingestion (/send, /batch)
+_CLOUD_DATA_BASE = CLOUD_DATA_BASE  # data/management API (x-umami-api-key)
+_CLOUD_SEND_BASE = CLOUD_SEND_BASE  # public ingestion (/send, /batch)
 # An actual browser UA is needed to get around the bot detection in Umami
 # You can also set DISABLE_BOT_CHECK=true in your Umami environment to disable the bot check entirely:
 # https://github.com/umami-software/umami/blob/7a3443cd06772f3cde37bdbb0bf38eabf4515561/pages/api/collect.js#L13
@@ -52,6 +79,69 @@ user_agent = (
     f'{sys.platform.capitalize()}'
 )
 
+T = TypeVar('T')
+
+log = logging.getLogger('umami')
+
+# Shared connection pool for the sync API (see configure() and close()). The client is created
+# lazily on first use, so importing the package or calling set_*() never opens a socket, and it is
+# reused by every sync call so consecutive events ride the same keep-alive TCP/TLS connection.
+pool_limits = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0)
+# Whether new pools negotiate HTTP/2 (see configure(http2=...)); needs the h2 package.
+use_http2 = False
+# Per-phase request timeouts (see set_timeouts()); a per-call timeout= caps them further.
+timeouts = httpx.Timeout(5.0)
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+# The async API gets one pooled AsyncClient per running event loop (an AsyncClient is bound to the
+# loop it was first used on). Each entry is (client, closer); see _get_async_client().
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]' = weakref.WeakKeyDictionary()
+# Applied to every HTTP call by the _http_* seams. No retries until set_retry_policy() is called.
+retry_policy = RetryPolicy(max_attempts=1)
+# Encodes request bodies and decodes responses (see set_json_codec()).
+json_codec: JsonCodec = JsonCodec()
+# Set by set_compression(): (Content-Encoding, compressor, min_size) for ingestion bodies; None sends them as-is.
+_compression: Optional[tuple[str, Compressor, int]] = None
+# Token buckets for ingestion and for all other traffic, set by set_rate_limits() (None means unlimited).
+_send_bucket: Optional[TokenBucket] = None
+_data_bucket: Optional[TokenBucket] = None
+_when_limited = 'wait'
+# Set while set_sampling() is in effect; decides which events are sent at all.
+_sampler: Optional[Sampler] = None
+# Set while start_background_sender() is in effect; the sync send functions then enqueue instead of posting.
+_background: Optional[BackgroundSender] = None
+# Started by the first buffered=True (or when_limited='buffer') sync send while _background is not running;
+# queues only such events, so other sends stay inline (see _buffered_sender()).
+_call_buffer: Optional[BackgroundSender] = None
+# Aggregates increment() counts and sends them periodically (see start_counters()).
+_counters: Optional[CounterAggregator] = None
+# Buffered *_async sends go to one AsyncBatcher per running event loop (see start_async_batcher()).
+_async_batchers: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncBatcher]' = weakref.WeakKeyDictionary()
+# Set while start_spool() is in effect; events Umami could not accept are written there and replayed later.
+_spool: Optional[Spool] = None
+_spool_drainer: Optional[SpoolDrainer] = None
+# Set while set_circuit_breaker() is in effect; guards /api/send and /api/batch traffic.
+_breaker: Optional[CircuitBreaker] = None
+# Set by configure(transport='relay'): events go to the local relay process instead of over HTTP.
+_relay: Optional[RelayClient] = None
+# Set by set_dedup_window(): events get idempotency keys, and keys already delivered are never sent again.
+_dedup: Optional[DedupWindow] = None
+# Seconds the atexit hook may spend sending buffered events (None: don't flush at exit); see set_exit_flush().
+_exit_flush_timeout: Optional[float] = 5.0
+# Whether set_exit_flush(on_sigterm=True) installed its SIGTERM handler, and the handler it replaced.
+_sigterm_hooked = False
+_previous_sigterm_handler: Any = None
+# The umami.Client (or AsyncClient) whose method is running in this context; None for the module-level functions.
+_active_client: contextvars.ContextVar[Any] = contextvars.ContextVar('umami_active_client', default=None)
+# Defaults set by scoped() for the current thread or task; None outside any scoped() block.
+_scope: contextvars.ContextVar[Optional[Scope]] = contextvars.ContextVar('umami_scope', default=None)
+# Snapshot of the set_*() settings above, rebuilt by _config() when one of them changes.
+_default_config: Optional[Config] = None
+# Every live Client and AsyncClient, so a forked child can drop their pools (see _after_fork_in_child()).
+_clients: 'weakref.WeakSet[Any]' = weakref.WeakSet()
+# Spools a forked child inherited: kept referenced so they are never closed in the child (see _after_fork_in_child()).
+_inherited_spools: list = []
+
 
 def normalize_distinct_id(distinct_id: Optional[Union[str, int]]) -> Optional[str]:
     """
@@ -100,6 +190,14 @@ def set_url_base(url: str) -> None:
         ValidationError: If url is empty or whitespace-only, or if it does not
             start with 'http://' or 'https://'.
     """
+    global url_base
+    url_base = _clean_url_base(url)
+
+
+def _clean_url_base(url: str) -> str:
+    """
+    Internal helper function, not need to use this.
+    """
     if not url or not url.strip():
         raise ValidationError('URL must not be empty.')
 
@@ -111,8 +209,7 @@ def set_url_base(url: str) -> None:
     if url.endswith('/'):
         url = url.rstrip('/')
 
-    global url_base
-    url_base = url.strip()
+    return url.strip()
 
 
 def set_website_id(website_id: str) -> None:
@@ -148,6 +245,99 @@ def set_hostname(hostname: str) -> None:
     default_hostname = hostname
 
 
+@contextlib.contextmanager
+def scoped(
+    website_id: Optional[str] = None,
+    hostname: Optional[str] = None,
+    distinct_id: Optional[Union[str, int]] = None,
+) -> Iterator[None]:
+    """
+    Use a website ID, hostname, or distinct_id as the default inside a `with` block.
+
+    set_website_id() and set_hostname() change one process-wide default, so
+    a server that tracks several sites can't switch between them per request
+    without races. scoped() sets defaults for the current context only: the
+    running thread, or the running asyncio task (and tasks it creates), so
+    concurrent requests each see their own values without any locking.
+    Calls inside the block that don't pass website_id, hostname or
+    distinct_id use the scoped values; explicit arguments still win, and
+    values not given here fall through to an enclosing scoped() block, then
+    to set_website_id() and set_hostname() (or a umami.Client's defaults).
+
+    The scoped website ID also applies to website_stats() and
+    active_users(). Events queued for the background sender keep the values
+    they were built with.
+
+    Args:
+        website_id: Default website ID inside the block.
+        hostname: Default hostname inside the block.
+        distinct_id: Default distinct_id (see new_event()) inside the block.
+
+    Raises:
+        ValidationError: If website_id or hostname is an empty string, or
+            distinct_id is not a string or integer.
+
+    Example:
+        ```python
+        import umami
+
+        async def handle(request):
+            with umami.scoped(website_id=request.site.umami_id, hostname=request.host, distinct_id=request.user.id):
+                await umami.new_event_async(event_name='checkout')  # goes to this request's site
+        ```
+    """
+    for name, value in (('website_id', website_id), ('hostname', hostname)):
+        if value is not None and (not isinstance(value, str) or not value.strip()):
+            raise ValidationError(f'{name} must be a non-empty string.')
+
+    outer = _scope.get()
+    scope = Scope(website_id, hostname, normalize_distinct_id(distinct_id))
+    if outer is not None:
+        scope = Scope(
+            scope.website_id or outer.website_id,
+            scope.hostname or outer.hostname,
+            scope.distinct_id or outer.distinct_id,
+        )
+    token = _scope.set(scope)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def _event_defaults(
+    website_id: Optional[str], hostname: Optional[str], distinct_id: Optional[Union[str, int]] = None
+) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    An event's website_id, hostname and normalized distinct_id: the arguments, else scoped(), else the defaults.
+
+    On the send path, so the common cases cost one context variable lookup.
+    """
+    scope = _scope.get()
+    if scope is not None:
+        website_id = website_id or scope.website_id
+        hostname = hostname or scope.hostname
+        normalized = scope.distinct_id if distinct_id is None else normalize_distinct_id(distinct_id)
+    else:
+        normalized = normalize_distinct_id(distinct_id)
+
+    if not (website_id and hostname):
+        config = _config()
+        website_id = website_id or config.website_id
+        hostname = hostname or config.hostname
+    return website_id, hostname, normalized
+
+
+def _website_id(website_id: Optional[str]) -> Optional[str]:
+    """The website ID for a stats call: the argument, else scoped(), else the default."""
+    if website_id:
+        return website_id
+    scope = _scope.get()
+    if scope is not None and scope.website_id:
+        return scope.website_id
+    return _config().website_id
+
+
 def set_cloud_api_key(key: str, region: Optional[str] = None) -> None:
     """
     Authenticate against Umami Cloud with an API key instead of login().
@@ -177,12 +367,19 @@ def set_cloud_api_key(key: str, region: Optional[str] = None) -> None:
         ```
     """
     global api_key, cloud_region
+    api_key = _clean_api_key(key, region)
+    cloud_region = region
+
+
+def _clean_api_key(key: str, region: Optional[str]) -> str:
+    """
+    Internal helper function, not need to use this.
+    """
     if not key or not key.strip():
         raise ValidationError('API key must not be empty.')
     if region is not None and region not in ('us', 'eu'):
         raise ValidationError("region must be 'us', 'eu', or None.")
-    api_key = key.strip()
-    cloud_region = region
+    return key.strip()
 
 
 def clear_cloud_api_key() -> None:
@@ -197,8 +394,68 @@ def clear_cloud_api_key() -> None:
     cloud_region = None
 
 
+def _config() -> Config:
+    """
+    The settings in effect: the running umami.Client's, or else a snapshot of the set_*() globals.
+
+    The snapshot is rebuilt only when one of the globals has changed, so the module-level functions
+    get pre-built URLs and headers while still seeing every set_*() (and login()) immediately.
+    """
+    global _default_config
+    client = _active_client.get()
+    if client is not None:
+        return client.config
+
+    config = _default_config
+    if (
+        config is None
+        or config.url_base != url_base
+        or config.auth_token != auth_token
+        or config.api_key != api_key
+        or config.cloud_region != cloud_region
+        or config.website_id != default_website_id
+        or config.hostname != default_hostname
+    ):
+        config = _make_config(url_base, auth_token, api_key, cloud_region, default_website_id, default_hostname)
+        _default_config = config
+    return config
+
+
+def _make_config(
+    url_base: Optional[str],
+    auth_token: Optional[str],
+    api_key: Optional[str],
+    cloud_region: Optional[str],
+    website_id: Optional[str],
+    hostname: Optional[str],
+) -> Config:
+    """
+    Internal helper function, not need to use this.
+    """
+    return Config(
+        url_base=url_base,
+        auth_token=auth_token,
+        api_key=api_key,
+        cloud_region=cloud_region,
+        website_id=website_id,
+        hostname=hostname,
+        event_user_agent=event_user_agent,
+        user_agent=user_agent,
+    )
+
+
+def _set_auth_token(token: Optional[str]) -> None:
+    """Store the token from login(): on the running Client, or in the module-level settings."""
+    global auth_token
+    client = _active_client.get()
+    if client is not None:
+        client._set_auth_token(token)
+    else:
+        auth_token = token
+
+
 def _is_cloud() -> bool:
-    return api_key is not None
+    return _config().is_cloud
 
 
 def _data_url(path_const: str, suffix: str = '') -> str:
@@ -206,38 +463,761 @@ def _data_url(path_const: str, suffix: str = '') -> str:
     Full URL for a data/auth endpoint in the active mode.
     `path_const` is a value from urls.py (e.g. urls.websites == '/api/websites').
     """
-    if _is_cloud():
-        region = f'/{cloud_region}' if cloud_region else ''
-        rel = path_const[4:] if path_const.startswith('/api') else path_const  # '/api/x' -> '/x'
-        return f'{_CLOUD_DATA_BASE}{region}{rel}{suffix}'  # .../v1[/region]/x
-    return f'{url_base}{path_const}{suffix}'  # unchanged self-hosted
+    return _config().data_url(path_const, suffix)
 
 
 def _send_url() -> str:
     """Full URL for the ingestion endpoint (/api/send) in the active mode."""
-    if _is_cloud():
-        return f'{_CLOUD_SEND_BASE}/send'  # https://cloud.umami.is/api/send
-    return f'{url_base}{urls.events}'  # unchanged self-hosted (or cloud-events via set_url_base)
+    return _config().send_url
+
+
+def _batch_url() -> str:
+    """Full URL for the bulk ingestion endpoint (/api/batch) in the active mode."""
+    return _config().batch_url
 
 
 def _data_headers() -> dict:
-    """Auth headers for data/management calls in the active mode."""
-    headers = {'User-Agent': user_agent}
-    if _is_cloud():
-        headers['x-umami-api-key'] = api_key  # type: ignore[assignment]
-    else:
-        headers['Authorization'] = f'Bearer {auth_token}'  # identical to today
-    return headers
+    """Auth headers for data/management calls in the active mode (shared; copy before changing)."""
+    return _config().data_headers
 
 
 def _send_headers(ua: str = event_user_agent) -> dict:
-    """Headers for ingestion calls. Self-hosted unchanged; Cloud send is unauthenticated."""
-    headers = {'User-Agent': ua}
-    if not _is_cloud():
-        headers['Authorization'] = f'Bearer {auth_token}'  # identical to today (may be 'Bearer None')
+    """Headers for ingestion calls (shared; copy before changing). Cloud send is unauthenticated."""
+    headers = _config().send_headers
+    if ua != headers['User-Agent']:
+        headers = {**headers, 'User-Agent': ua}
     return headers
 
 
+def configure(
+    *,
+    max_connections: Optional[int] = None,
+    max_keepalive_connections: Optional[int] = None,
+    keepalive_expiry: Optional[float] = None,
+    http2: Optional[bool] = None,
+    transport: Optional[str] = None,
+    socket: Optional[Address] = None,
+) -> None:
+    """
+    Configure the shared HTTP connection pool used by the SDK, or hand events to a local relay.
+
+    All sync calls share one process-wide httpx client with keep-alive, so
+    consecutive events reuse a warm TCP/TLS connection to Umami instead of
+    doing a new handshake each time. Only the arguments you pass are changed;
+    the rest keep their current values (httpx's defaults unless configured).
+    If a pool already exists it is released, and the next call creates a new
+    one with the updated limits. The async API uses the same limits for its
+    per-event-loop pools.
+
+    Args:
+        max_connections: Maximum number of concurrent connections (default 100).
+        max_keepalive_connections: Maximum number of idle connections kept
+            open for reuse (default 20).
+        keepalive_expiry: Seconds an idle connection is kept before it is
+            closed (default 5.0).
+        http2: Negotiate HTTP/2 with servers that support it (default False).
+            Concurrent calls then share one multiplexed connection per host
+            instead of opening one connection each, which helps async code
+            with many calls in flight, especially against Umami Cloud.
+            Servers without HTTP/2 keep using HTTP/1.1. Needs
+            `pip install umami-analytics[http2]`.
+        transport: 'relay' to send events through a relay process started
+            with `python -m umami.relay` (see umami.relay), or 'http' to
+            send them to Umami directly again (the default). With the
+            relay, new_event(), new_revenue_event(), new_page_view(),
+            new_events(), their async twins, and increment() totals are
+            each handed over with one non-blocking sendto() and return {}.
+            The relay does the HTTP, batching, retries and spooling, using
+            its own settings. If the relay is not running, events are
+            dropped and logged rather than raised. Query functions still
+            call Umami directly.
+        socket: The relay's address, required with transport='relay': a
+            Unix socket path (e.g. '/run/umami/relay.sock') or a
+            (host, port) tuple for UDP.
+
+    Raises:
+        ValidationError: If any limit is not a positive number, http2 is
+            not a bool, transport is not 'http' or 'relay', or socket is
+            missing or given without transport='relay'.
+        ImportError: If http2=True and the h2 package is not installed.
+
+    Example:
+        ```python
+        import umami
+
+        umami.configure(max_connections=10, max_keepalive_connections=10, keepalive_expiry=30)
+        umami.configure(http2=True)
+        umami.configure(transport='relay', socket='/run/umami/relay.sock')
+        ```
+    """
+    global pool_limits, use_http2, _async_clients, _relay
+    for name, value in (
+        ('max_connections', max_connections),
+        ('max_keepalive_connections', max_keepalive_connections),
+        ('keepalive_expiry', keepalive_expiry),
+    ):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+            raise ValidationError(f'{name} must be a positive number.')
+    if http2 is not None and not isinstance(http2, bool):
+        raise ValidationError('http2 must be True or False.')
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError as e:
+            raise ImportError('HTTP/2 needs the h2 package: pip install umami-analytics[http2]') from e
+    if transport not in (None, 'http', 'relay'):
+        raise ValidationError("transport must be 'http' or 'relay'.")
+    if transport == 'relay' and not _is_address(socket):
+        raise ValidationError("transport='relay' needs socket: a Unix socket path or a (host, port) tuple.")
+    if transport != 'relay' and socket is not None:
+        raise ValidationError("socket is only used with transport='relay'.")
+
+    if transport is not None:
+        relay = RelayClient(socket) if transport == 'relay' else None  # type: ignore[arg-type]
+        with _client_lock:
+            old, _relay = _relay, relay
+        if old is not None:
+            old.close()
+
+    pool_limits = httpx.Limits(
+        max_connections=max_connections if max_connections is not None else pool_limits.max_connections,
+        max_keepalive_connections=(
+            max_keepalive_connections
+            if max_keepalive_connections is not None
+            else pool_limits.max_keepalive_connections
+        ),
+        keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else pool_limits.keepalive_expiry,
+    )
+    if http2 is not None:
+        use_http2 = http2
+    close()
+    # Forget the per-loop async pools; each is still closed by its closer when dropped or when its loop shuts down.
+    with _client_lock:
+        _async_clients = weakref.WeakKeyDictionary()
+
+
+def _is_address(address: Any) -> bool:
+    """Whether `address` is a relay address: a non-empty path or a (host, port) tuple."""
+    if isinstance(address, str):
+        return bool(address)
+    return (
+        isinstance(address, tuple)
+        and len(address) == 2
+        and isinstance(address[0], str)
+        and isinstance(address[1], int)
+        and not isinstance(address[1], bool)
+    )
+
+
+def close() -> None:
+    """
+    Close the shared HTTP connection pool.
+
+    Releases any open keep-alive connections. It is safe to call more than
+    once, and the SDK keeps working afterward: the next call simply opens a
+    new pool. Call this at application shutdown (or register it with atexit)
+    for a clean teardown.
+
+    This closes the pool used by the sync functions. The async functions use
+    one pool per event loop, which is closed automatically when that loop
+    shuts down (as asyncio.run() does), or explicitly with close_async().
+    """
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+async def close_async() -> None:
+    """
+    Close the async HTTP connection pool for the running event loop.
+
+    The async functions share one pooled httpx.AsyncClient per event loop. It
+    is created on first use and closed automatically when the loop shuts down
+    through asyncio.run() (or any runner that calls loop.shutdown_asyncgens()).
+    Call this from an application shutdown hook when you manage the loop
+    yourself. It is safe to call more than once; the next async call opens a
+    new pool.
+
+    Example:
+        ```python
+        import umami
+
+        async def on_shutdown():
+            await umami.close_async()
+        ```
+    """
+    entry = _async_clients.get(asyncio.get_running_loop())
+    if entry is not None:
+        _, closer = entry
+        await closer.aclose()
+
+
+def set_timeouts(
+    *,
+    connect: Optional[float] = None,
+    read: Optional[float] = None,
+    write: Optional[float] = None,
+    pool: Optional[float] = None,
+) -> None:
+    """
+    Set how long the SDK waits on Umami at each phase of a request.
+
+    Applies to every sync and async call, including the background sender
+    and async batcher. Only the arguments you pass are changed; the rest keep
+    their current values (5 seconds each unless configured). For analytics
+    on a hot path, a budget of a few hundred milliseconds or less is
+    usually right. Any function can tighten these for a single call with its
+    timeout= argument.
+
+    Args:
+        connect: Seconds to wait for a connection to be established.
+        read: Seconds to wait for the server to send response data.
+        write: Seconds to wait while sending the request body.
+        pool: Seconds to wait for a free connection from the pool.
+
+    Raises:
+        ValidationError: If any value is not a positive number.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_timeouts(connect=0.1, read=0.25, write=0.1, pool=0.05)
+        umami.website_stats(start, end, timeout=2.0)  # a slower report query
+        ```
+    """
+    global timeouts
+    for name, value in (('connect', connect), ('read', read), ('write', write), ('pool', pool)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+            raise ValidationError(f'{name} must be a positive number.')
+
+    timeouts = httpx.Timeout(
+        connect=connect if connect is not None else timeouts.connect,
+        read=read if read is not None else timeouts.read,
+        write=write if write is not None else timeouts.write,
+        pool=pool if pool is not None else timeouts.pool,
+    )
+
+
+def set_retry_policy(
+    max_attempts: int = 3,
+    backoff_base: float = 0.5,
+    backoff_max: float = 30.0,
+    budget_ratio: float = 0.1,
+    budget_reserve: int = 10,
+) -> None:
+    """
+    Retry failed requests with exponential backoff and jitter.
+
+    By default the SDK does not retry: one failed request is final. After
+    this call, every function (sync and async, sends and queries alike)
+    retries a request that fails to connect, times out, or gets a 429 or
+    5xx response, up to max_attempts attempts in total. Other responses,
+    such as 400 or 401, are never retried. While set_dedup_window() is in
+    effect, events are only retried when the request never reached the
+    server (a refused connection or 429), never after a timeout or 5xx that
+    Umami may have stored.
+
+    Attempt n waits a random time between 0 and
+    min(backoff_max, backoff_base * 2 ** (n - 1)) seconds before retrying,
+    so clients that failed together don't retry together. When the server
+    sends a Retry-After header its delay is used instead, and if that is
+    longer than backoff_max the request is not retried at all.
+
+    Retries are limited by a process-wide budget so an outage can't turn
+    into a retry storm: each request earns budget_ratio of a retry, each
+    retry spends one, and at most budget_reserve retries are saved up. Once
+    the budget is spent, failures are final until requests earn it back.
+    Call set_retry_policy(max_attempts=1) to turn retries off again.
+
+    Args:
+        max_attempts: Total attempts per request, including the first.
+            Defaults to 3.
+        backoff_base: Maximum delay in seconds before the first retry;
+            doubles for each further retry. Defaults to 0.5.
+        backoff_max: Upper bound for any single delay in seconds, including
+            one requested with Retry-After. Defaults to 30.0.
+        budget_ratio: Retries earned per request. Defaults to 0.1 (at most
+            one retry per ten requests during an outage).
+        budget_reserve: Retries that can be saved up for isolated failures.
+            Defaults to 10.
+
+    Raises:
+        ValidationError: If max_attempts is not a positive integer, or any
+            other value is negative.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_retry_policy(max_attempts=4, backoff_base=0.25, backoff_max=5)
+        ```
+    """
+    global retry_policy
+    if isinstance(max_attempts, bool) or not isinstance(max_attempts, int) or max_attempts <= 0:
+        raise ValidationError('max_attempts must be a positive integer.')
+    for name, value in (
+        ('backoff_base', backoff_base),
+        ('backoff_max', backoff_max),
+        ('budget_ratio', budget_ratio),
+        ('budget_reserve', budget_reserve),
+    ):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValidationError(f'{name} must be a number >= 0.')
+
+    retry_policy = RetryPolicy(
+        max_attempts=max_attempts,
+        backoff_base=backoff_base,
+        backoff_max=backoff_max,
+        budget=RetryBudget(ratio=budget_ratio, reserve=budget_reserve),
+    )
+
+
+def set_json_codec(codec: Union[str, JsonCodec] = 'auto') -> None:
+    """
+    Choose the JSON library used for request bodies and API responses.
+
+    The SDK encodes every request body straight to bytes and decodes plain
+    JSON responses from bytes with the selected codec. (Responses returned as
+    models, such as websites() and website_stats(), are always parsed straight
+    from bytes by pydantic.) The standard library's json module is used by
+    default. orjson and msgspec are much faster, which shows up with batches;
+    install one with `pip install umami-analytics[orjson]` (or `[msgspec]`)
+    and select it here.
+
+    Args:
+        codec: 'stdlib', 'orjson', 'msgspec', or 'auto' (the fastest one
+            installed: orjson, then msgspec, then stdlib). You can also pass
+            your own object with encode(obj) -> bytes and
+            decode(bytes) -> object methods. Defaults to 'auto'.
+
+    Raises:
+        ValidationError: If codec is not a known name or a codec object.
+        ImportError: If 'orjson' or 'msgspec' is requested but not installed.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_json_codec('orjson')
+        ```
+    """
+    global json_codec
+    if isinstance(codec, str):
+        if codec not in ('auto', 'stdlib', 'orjson', 'msgspec'):
+            raise ValidationError("codec must be 'auto', 'stdlib', 'orjson', 'msgspec', or a codec object.")
+        json_codec = make_codec(codec)
+    elif callable(getattr(codec, 'encode', None)) and callable(getattr(codec, 'decode', None)):
+        json_codec = codec
+    else:
+        raise ValidationError("codec must be 'auto', 'stdlib', 'orjson', 'msgspec', or a codec object.")
+
+
+def set_compression(algorithm: Optional[str] = 'gzip', min_size: int = 1024, level: Optional[int] = None) -> None:
+    """
+    Compress large event bodies sent to Umami.
+
+    Batches and events with big custom_data compress very well, which saves
+    bandwidth between your servers and Umami. Once enabled, every /api/send
+    and /api/batch body of at least min_size bytes is compressed and sent with
+    a Content-Encoding header; smaller bodies, which gain little, and all
+    other calls are sent as before.
+
+    Umami itself does not decompress request bodies, so only turn this on
+    when the server in front of it (nginx, Caddy, a CDN, or a relay) accepts
+    compressed requests. Call set_compression(None) to turn it off.
+
+    Args:
+        algorithm: 'gzip', 'zstd', or None to disable compression. zstd is
+            faster and smaller; it needs Python 3.14+ or
+            `pip install umami-analytics[zstd]`. Defaults to 'gzip'.
+        min_size: Smallest encoded body, in bytes, that gets compressed.
+            Defaults to 1024.
+        level: Compression level. Defaults to 6 for gzip and 3 for zstd.
+
+    Raises:
+        ValidationError: If algorithm is not 'gzip', 'zstd', or None,
+            min_size is negative, or level is not an integer.
+        ImportError: If 'zstd' is requested but no zstd library is installed.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_compression('gzip', min_size=2048)
+        ```
+    """
+    global _compression
+    if algorithm is None:
+        _compression = None
+        return
+    if algorithm not in ('gzip', 'zstd'):
+        raise ValidationError("algorithm must be 'gzip', 'zstd', or None.")
+    if isinstance(min_size, bool) or not isinstance(min_size, int) or min_size < 0:
+        raise ValidationError('min_size must be an integer >= 0.')
+    if level is not None and (isinstance(level, bool) or not isinstance(level, int)):
+        raise ValidationError('level must be an integer.')
+
+    _compression = (algorithm, make_compressor(algorithm, level), min_size)
+
+
+def set_rate_limits(
+    *,
+    send_rate: Optional[float] = None,
+    send_burst: Optional[int] = None,
+    data_rate: Optional[float] = None,
+    data_burst: Optional[int] = None,
+    when_limited: str = 'wait',
+) -> None:
+    """
+    Limit how fast the SDK sends requests to Umami, so bursts don't get throttled with 429s.
+
+    Two token buckets are kept, each shared by every thread and event loop in
+    the process: one for ingestion (/api/send and /api/batch, used by the send
+    functions, the background sender and the async batcher) and one for all
+    other calls (the data, login, and heartbeat calls). A bucket allows its
+    rate of requests per second on average and bursts of up to its burst
+    size. Every attempt takes a token, retries included. Leave a rate as None
+    for no limit on that traffic.
+
+    Data calls always wait for a token. For inline (unbuffered) send calls,
+    when_limited chooses what happens when the ingestion bucket is empty:
+    'wait' blocks (or awaits) until a token is free; 'drop' skips the event
+    and returns an empty dict; 'buffer' queues it for the background sender
+    (sync) or the event loop's batcher (async), which then sends it as soon
+    as the limit allows. Without a running background sender, sync events
+    go to the same queue as buffered=True ones, so sends that find a token
+    stay inline. Queued events always wait their turn. A call with a
+    per-call timeout never waits past it: if its token would only free up
+    later, it fails at once with httpx.PoolTimeout, like any other send that
+    never reached the server (so it is retried or spooled the same way).
+
+    Calling this again replaces both limits; clear_rate_limits() removes them.
+
+    Args:
+        send_rate: Ingestion requests per second, or None for no limit.
+        send_burst: Ingestion requests allowed at once after a quiet period.
+            Defaults to send_rate rounded up.
+        data_rate: Requests per second for every other call, or None for no
+            limit.
+        data_burst: Burst size for other calls. Defaults to data_rate rounded
+            up.
+        when_limited: 'wait', 'drop', or 'buffer'. Defaults to 'wait'.
+
+    Raises:
+        ValidationError: If a rate is not a positive number, a burst is not a
+            positive integer, or when_limited is not one of the choices.
+
+    Example:
+        ```python
+        import umami
+
+        # Umami Cloud allows bursts, but batch jobs should stay under 50 requests/s.
+        umami.set_rate_limits(send_rate=50, data_rate=5, when_limited='buffer')
+        ```
+    """
+    global _send_bucket, _data_bucket, _when_limited
+    if when_limited not in ('wait', 'drop', 'buffer'):
+        raise ValidationError("when_limited must be 'wait', 'drop', or 'buffer'.")
+    buckets = []
+    for name, rate, burst in (('send', send_rate, send_burst), ('data', data_rate, data_burst)):
+        if rate is None:
+            buckets.append(None)
+            continue
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValidationError(f'{name}_rate must be a positive number.')
+        if burst is not None and (isinstance(burst, bool) or not isinstance(burst, int) or burst <= 0):
+            raise ValidationError(f'{name}_burst must be a positive integer.')
+        buckets.append(TokenBucket(rate, burst if burst is not None else math.ceil(rate)))
+
+    _send_bucket, _data_bucket = buckets
+    _when_limited = when_limited
+
+
+def clear_rate_limits() -> None:
+    """
+    Remove the limits set by set_rate_limits(); requests are sent as fast as they are made.
+    """
+    global _send_bucket, _data_bucket, _when_limited
+    _send_bucket, _data_bucket, _when_limited = None, None, 'wait'
+
+
+def _rate_limit_action() -> Optional[str]:
+    """'drop' or 'buffer' when an inline send should not wait for the empty ingestion bucket, else None."""
+    bucket = _send_bucket
+    if bucket is None or _when_limited == 'wait' or bucket.has_token():
+        return None
+    return _when_limited
+
+
+def _new_client() -> httpx.Client:
+    """
+    Internal helper function, not need to use this.
+    """
+    return httpx.Client(limits=pool_limits, http2=use_http2, follow_redirects=True)
+
+
+def _new_async_client() -> httpx.AsyncClient:
+    """
+    Internal helper function, not need to use this.
+    """
+    return httpx.AsyncClient(limits=pool_limits, http2=use_http2, follow_redirects=True)
+
+
+def _get_client() -> httpx.Client:
+    """The running umami.Client's pool, or the process-wide sync client, created on first use (thread-safe)."""
+    global _client
+    active = _active_client.get()
+    if active is not None:
+        return active._get_pool()
+
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _new_client()
+            client = _client
+    return client
+
+
+async def _close_with_loop(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> AsyncIterator[None]:
+    """
+    Keeps `client` open for the lifetime of `loop`.
+
+    Once started, the event loop tracks this async generator and finalizes it in
+    loop.shutdown_asyncgens(), which asyncio.run() calls on exit. That is the
+    hook we use to close the pool when the loop shuts down.
+    """
+    try:
+        yield
+    finally:
+        with _client_lock:
+            if _async_clients.get(loop, (None,))[0] is client:
+                del _async_clients[loop]
+        await client.aclose()
+
+
+async def _get_async_client() -> httpx.AsyncClient:
+    """The running umami.AsyncClient's pool, or the running event loop's pooled AsyncClient, created on first use."""
+    active = _active_client.get()
+    if active is not None:
+        return active._get_pool()
+
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = _new_async_client()
+        closer = _close_with_loop(loop, client)
+        with _client_lock:
+            _async_clients[loop] = entry = (client, closer)
+        await closer.__anext__()  # runs up to the yield; registers the closer with the loop
+    return entry[0]
+
+
+def _after_fork_in_child() -> None:
+    """
+    Make the SDK safe to use in a child process after os.fork() (registered with os.register_at_fork()).
+
+    Pre-fork servers such as gunicorn --preload fork workers from a parent that may already have used
+    the SDK. Sockets, threads, and locks don't survive a fork intact, so the child:
+
+    - forgets the parent's connection pools, including those of umami.Client instances, without closing
+      them (their sockets belong to the parent) and gets fresh locks everywhere one could have been held
+      by a thread that no longer exists;
+    - restarts the background sender and counter thread with the same settings but empty, because
+      the events and counts queued in the parent are the parent's to send, not the child's too;
+    - reopens the spool file on a new SQLite connection for its own failed sends, without a drainer:
+      replay stays with the process that called start_spool(), so no row is replayed twice.
+    """
+    global _client, _client_lock, _async_clients, _async_batchers
+    global _background, _call_buffer, _counters, _spool, _spool_drainer, _send_bucket, _data_bucket
+    _client_lock = threading.Lock()
+    _client = None
+    _async_clients = weakref.WeakKeyDictionary()
+    _async_batchers = weakref.WeakKeyDictionary()
+
+    retry_policy.budget._lock = threading.Lock()
+    if _send_bucket is not None:
+        _send_bucket = TokenBucket(_send_bucket.rate, _send_bucket.burst)
+    if _data_bucket is not None:
+        _data_bucket = TokenBucket(_data_bucket.rate, _data_bucket.burst)
+    if _dedup is not None:
+        _dedup._lock = threading.Lock()
+    if _breaker is not None:
+        _breaker.after_fork()
+    if _relay is not None:
+        _relay._lock = threading.Lock()
+    for umami_client in list(_clients):
+        umami_client._after_fork()
+
+    if _background is not None:
+        _background = _background.respawn()
+        _background.start()
+    if _call_buffer is not None:
+        _call_buffer = _call_buffer.respawn()
+        _call_buffer.start()
+    if _counters is not None:
+        _counters = _counters.respawn()
+        _counters.start()
+    if _spool is not None:
+        # Never close the parent's connection here: closing it could checkpoint or remove the WAL under the parent.
+        _inherited_spools.append(_spool)
+        _spool, _spool_drainer = Spool(_spool.path, max_events=_spool.max_events), None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _deadline(timeout: Optional[float]) -> Optional[float]:
+    """The time.monotonic() by which a call with a per-call `timeout` must be done (None if it has none)."""
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _attempt_timeout(deadline: Optional[float]) -> httpx.Timeout:
+    """The httpx timeouts for one attempt: the set_timeouts() values, each capped at what is left of `deadline`."""
+    if deadline is None:
+        return timeouts
+    remaining = max(deadline - time.monotonic(), 0.0)
+
+    def cap(value: Optional[float]) -> float:
+        return remaining if value is None else min(value, remaining)
+
+    return httpx.Timeout(
+        connect=cap(timeouts.connect), read=cap(timeouts.read), write=cap(timeouts.write), pool=cap(timeouts.pool)
+    )
+
+
+def _encode_body(url: str, kwargs: dict) -> None:
+    """
+    Replace a json= request argument with bytes from the active codec (the seams accept json= like httpx),
+    compressed if set_compression() is on, `url` is an ingestion endpoint, and the body is big enough.
+    """
+    if 'json' not in kwargs:
+        return
+    content = json_codec.encode(kwargs.pop('json'))
+    headers = {**(kwargs.get('headers') or {}), 'Content-Type': 'application/json'}
+
+    compression = _compression
+    if compression is not None and len(content) >= compression[2] and _is_ingestion(url):
+        encoding, compress, _ = compression
+        content = compress(content)
+        headers['Content-Encoding'] = encoding
+
+    kwargs['content'] = content
+    kwargs['headers'] = headers
+
+
+def _json(resp: httpx.Response) -> Any:
+    """The response body decoded by the active codec (use instead of resp.json())."""
+    return json_codec.decode(resp.content)
+
+
+def _parse(resp: httpx.Response, tp: type[T]) -> T:
+    """
+    Validate the response bytes straight into `tp` with pydantic's JSON parser, with no intermediate dict.
+
+    Models use their own model_validate_json(); other types, such as list[models.Website], a cached TypeAdapter.
+    """
+    if hasattr(tp, 'model_validate_json'):
+        return tp.model_validate_json(resp.content)  # type: ignore[attr-defined]
+    return _type_adapter(tp).validate_json(resp.content)
+
+
+@functools.lru_cache(maxsize=None)
+def _type_adapter(tp: Any) -> pydantic.TypeAdapter:
+    """One TypeAdapter per type: building one compiles a validator, so they are reused across calls."""
+    return pydantic.TypeAdapter(tp)
+
+
+def _is_ingestion(url: str) -> bool:
+    """Whether `url` is /api/send or /api/batch in the active mode."""
+    return url in (_send_url(), _batch_url())
+
+
+def _bucket_for(url: str) -> Optional[TokenBucket]:
+    """The rate-limit bucket a request to `url` draws from (None when that traffic is unlimited)."""
+    if _send_bucket is None and _data_bucket is None:
+        return None
+    return _send_bucket if _is_ingestion(url) else _data_bucket
+
+
+def _rate_limit_timeout() -> httpx.PoolTimeout:
+    """
+    The error a seam raises when a rate-limit token would only free up after the call's deadline.
+
+    A PoolTimeout, like waiting too long for a pooled connection: nothing reached the server, so callers
+    may retry, spool, or fall back exactly as they would for any other pre-connect failure.
+    """
+    return httpx.PoolTimeout('Timed out waiting for a rate-limit token (see set_rate_limits()).')
+
+
+def _http_get(url: str, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+    """GET through the shared pool, with rate limits, timeouts and retries. The seam every sync read goes through."""
+    deadline = _deadline(timeout)
+    bucket = _bucket_for(url)
+    _encode_body(url, kwargs)
+
+    def send() -> httpx.Response:
+        if bucket is not None and not bucket.acquire(deadline):
+            raise _rate_limit_timeout()
+        return _get_client().get(url, timeout=_attempt_timeout(deadline), **kwargs)
+
+    return retry_policy.run(send, deadline)
+
+
+def _http_post(
+    url: str, timeout: Optional[float] = None, retry_ambiguous: bool = True, **kwargs: Any
+) -> httpx.Response:
+    """
+    POST through the shared pool, with rate limits, timeouts and retries. The seam every sync write goes through.
+
+    retry_ambiguous=False retries only failures the server certainly never processed (see RetryPolicy.run()).
+    """
+    deadline = _deadline(timeout)
+    bucket = _bucket_for(url)
+    _encode_body(url, kwargs)
+
+    def send() -> httpx.Response:
+        if bucket is not None and not bucket.acquire(deadline):
+            raise _rate_limit_timeout()
+        return _get_client().post(url, timeout=_attempt_timeout(deadline), **kwargs)
+
+    return retry_policy.run(send, deadline, retry_ambiguous)
+
+
+async def _http_get_async(url: str, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+    """GET through the running loop's pool, with rate limits, timeouts and retries. The async read seam."""
+    deadline = _deadline(timeout)
+    bucket = _bucket_for(url)
+    _encode_body(url, kwargs)
+
+    async def send() -> httpx.Response:
+        if bucket is not None and not await bucket.acquire_async(deadline):
+            raise _rate_limit_timeout()
+        return await (await _get_async_client()).get(url, timeout=_attempt_timeout(deadline), **kwargs)
+
+    return await retry_policy.run_async(send, deadline)
+
+
+async def _http_post_async(
+    url: str, timeout: Optional[float] = None, retry_ambiguous: bool = True, **kwargs: Any
+) -> httpx.Response:
+    """POST through the running loop's pool, with rate limits, timeouts and retries. The async write seam."""
+    deadline = _deadline(timeout)
+    bucket = _bucket_for(url)
+    _encode_body(url, kwargs)
+
+    async def send() -> httpx.Response:
+        if bucket is not None and not await bucket.acquire_async(deadline):
+            raise _rate_limit_timeout()
+        return await (await _get_async_client()).post(url, timeout=_attempt_timeout(deadline), **kwargs)
+
+    return await retry_policy.run_async(send, deadline, retry_ambiguous)
+
+
 def is_logged_in() -> bool:
     """
     Whether a credential is currently set locally.
@@ -248,10 +1228,11 @@ def is_logged_in() -> bool:
         only reflects that a credential exists in this process, not that it is
         still valid on the server — use verify_token() to confirm validity.
     """
-    return auth_token is not None or api_key is not None
+    config = _config()
+    return config.auth_token is not None or config.api_key is not None
 
 
-async def login_async(username: str, password: str) -> models.LoginResponse:
+async def login_async(username: str, password: str, timeout: Optional[float] = None) -> models.LoginResponse:
     """
     Log into a self-hosted Umami instance and retrieve a temporary auth token.
 
@@ -268,6 +1249,10 @@ async def login_async(username: str, password: str) -> models.LoginResponse:
     Args:
         username: Your Umami username.
         password: Your Umami password.
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         A models.LoginResponse containing the auth token and the logged-in
@@ -289,7 +1274,6 @@ async def login_async(username: str, password: str) -> models.LoginResponse:
         login = await umami.login_async('admin', 'super-secret')
         ```
     """
-    global auth_token
     if _is_cloud():
         raise OperationNotAllowedError(
             'login() is not used in Cloud mode; your API key from set_cloud_api_key() is the '
@@ -304,16 +1288,15 @@ async def login_async(username: str, password: str) -> models.LoginResponse:
         'username': username,
         'password': password,
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=api_data, headers=headers, follow_redirects=True)
-        resp.raise_for_status()
+    resp = await _http_post_async(url, json=api_data, headers=headers, timeout=timeout)
+    resp.raise_for_status()
 
-    model = models.LoginResponse(**resp.json())
-    auth_token = model.token
+    model = _parse(resp, models.LoginResponse)
+    _set_auth_token(model.token)
     return model
 
 
-def login(username: str, password: str) -> models.LoginResponse:
+def login(username: str, password: str, timeout: Optional[float] = None) -> models.LoginResponse:
     """
     Log into a self-hosted Umami instance and retrieve a temporary auth token.
 
@@ -329,6 +1312,10 @@ def login(username: str, password: str) -> models.LoginResponse:
     Args:
         username: Your Umami username.
         password: Your Umami password.
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         A models.LoginResponse containing the auth token and the logged-in
@@ -350,8 +1337,6 @@ def login(username: str, password: str) -> models.LoginResponse:
         login = umami.login('admin', 'super-secret')
         ```
     """
-    global auth_token
-
     if _is_cloud():
         raise OperationNotAllowedError(
             'login() is not used in Cloud mode; your API key from set_cloud_api_key() is the '
@@ -366,15 +1351,15 @@ def login(username: str, password: str) -> models.LoginResponse:
         'username': username,
         'password': password,
     }
-    resp = httpx.post(url, json=api_data, headers=headers, follow_redirects=True)
+    resp = _http_post(url, json=api_data, headers=headers, timeout=timeout)
     resp.raise_for_status()
 
-    model = models.LoginResponse(**resp.json())
-    auth_token = model.token
+    model = _parse(resp, models.LoginResponse)
+    _set_auth_token(model.token)
     return model
 
 
-async def websites_async() -> list[models.Website]:
+async def websites_async(timeout: Optional[float] = None) -> list[models.Website]:
     """
     All the websites that are registered in your Umami instance.
 
@@ -382,6 +1367,12 @@ async def websites_async() -> list[models.Website]:
     (Umami Cloud) first. In self-hosted mode you must also have called
     set_url_base().
 
+    Args:
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
+
     Returns:
         A list of models.Website models, unwrapped from the paged API response.
 
@@ -407,15 +1398,14 @@ async def websites_async() -> list[models.Website]:
     url = _data_url(urls.websites)
     headers = _data_headers()
 
-    async with httpx.AsyncClient() as client:  # type: ignore
-        resp = await client.get(url, headers=headers, follow_redirects=True)
-        resp.raise_for_status()
+    resp = await _http_get_async(url, headers=headers, timeout=timeout)
+    resp.raise_for_status()
 
-    model = models.WebsitesResponse(**resp.json())
+    model = _parse(resp, models.WebsitesResponse)
     return model.websites
 
 
-def websites() -> list[models.Website]:
+def websites(timeout: Optional[float] = None) -> list[models.Website]:
     """
     All the websites that are registered in your Umami instance.
 
@@ -423,6 +1413,12 @@ def websites() -> list[models.Website]:
     (Umami Cloud) first. In self-hosted mode you must also have called
     set_url_base().
 
+    Args:
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
+
     Returns:
         A list of models.Website models, unwrapped from the paged API response.
 
@@ -447,11 +1443,10 @@ def websites() -> list[models.Website]:
 
     url = _data_url(urls.websites)
     headers = _data_headers()
-    resp = httpx.get(url, headers=headers, follow_redirects=True)
+    resp = _http_get(url, headers=headers, timeout=timeout)
     resp.raise_for_status()
 
-    data = resp.json()
-    model = models.WebsitesResponse(**data)
+    model = _parse(resp, models.WebsitesResponse)
     return model.websites
 
 
@@ -459,34 +1454,1403 @@ def enable() -> None:
     """
     Enable event and page view tracking.
 
-    When enabled, the send functions new_event(), new_revenue_event(), and
-    new_page_view() send data to Umami normally. This is the default state.
+    When enabled, the send functions new_event(), new_revenue_event(), and
+    new_page_view() send data to Umami normally. This is the default state.
+
+    Only the send functions are affected; query and authentication functions
+    (such as login(), websites(), website_stats(), active_users(),
+    verify_token(), and heartbeat()) always run regardless of this setting.
+    Call disable() to turn tracking off.
+    """
+    global tracking_enabled
+    tracking_enabled = True
+
+
+def disable() -> None:
+    """
+    Disable event and page view tracking.
+
+    When disabled, the send functions new_event(), new_revenue_event(), and
+    new_page_view() still validate their arguments but then return without
+    making any HTTP request to Umami. This is useful for development and
+    testing environments.
+
+    Only the send functions are affected; query and authentication functions
+    (such as login(), websites(), website_stats(), active_users(),
+    verify_token(), and heartbeat()) always run regardless of this setting.
+    Call enable() to turn tracking back on (the default).
+    """
+    global tracking_enabled
+    tracking_enabled = False
+
+
+def set_sampling(
+    event_rates: Optional[Dict[str, float]] = None,
+    url_rates: Optional[Dict[str, float]] = None,
+    default_rate: float = 1.0,
+) -> None:
+    """
+    Send only a fraction of high-volume events.
+
+    Each event is kept with the probability given by its rate: the entry for
+    its event_name in event_rates, else the entry for the longest prefix in
+    url_rates that its url starts with, else default_rate. Page views have
+    no event name, so only url_rates and default_rate apply to them. This
+    covers new_event(), new_revenue_event(), new_page_view(), new_events(),
+    and their async twins; dropped events return an empty dict and cost no
+    network traffic.
+
+    Events with a distinct_id are sampled by that id, so a user is either
+    kept or dropped for every event at the same rate and their journey stays
+    whole. Other events are sampled at random. Each kept event with a rate
+    below 1 carries the rate in its custom data as 'sample_rate', so counts
+    can be re-weighted (divide by the rate) when you analyze them.
+
+    Calling this again replaces the previous rules; clear_sampling() sends
+    everything again.
+
+    Args:
+        event_rates: OPTIONAL: Rates keyed by exact event name.
+        url_rates: OPTIONAL: Rates keyed by URL path prefix, e.g. '/api/'.
+        default_rate: Rate for events no rule matches. Defaults to 1.0
+            (send everything).
+
+    Raises:
+        ValidationError: If a rate is not a number between 0 and 1, or a key
+            is not a non-empty string.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_sampling(event_rates={'search': 0.1}, url_rates={'/api/': 0.01})
+        umami.new_page_view('Users API', '/api/users')  # sent about 1 time in 100
+        ```
+    """
+    global _sampler
+    rules = [('default_rate', default_rate)]
+    for name, table in (('event_rates', event_rates), ('url_rates', url_rates)):
+        for key, rate in (table or {}).items():
+            if not isinstance(key, str) or not key:
+                raise ValidationError(f'{name} keys must be non-empty strings.')
+            rules.append((f'{name}[{key!r}]', rate))
+    for name, rate in rules:
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate <= 1:
+            raise ValidationError(f'{name} must be a number between 0 and 1.')
+
+    _sampler = Sampler(event_rates, url_rates, default_rate)
+
+
+def clear_sampling() -> None:
+    """
+    Remove the sampling rules set by set_sampling() and send every event again.
+    """
+    global _sampler
+    _sampler = None
+
+
+def _sample_rate(event_name: Optional[str], url: str, distinct_id: Optional[str]) -> Optional[float]:
+    """The rate an event is kept at (1.0 without sampling), or None if sampling drops it."""
+    sampler = _sampler
+    if sampler is None:
+        return 1.0
+    return sampler.sample(event_name, url, distinct_id)
+
+
+def start_background_sender(
+    max_queue_size: int = 10_000,
+    batch_size: int = 1,
+    flush_interval: float = 1.0,
+    max_buffer_bytes: Optional[int] = None,
+    overflow: str = 'drop_newest',
+    block_timeout: float = 1.0,
+) -> None:
+    """
+    Send events from a background thread instead of the calling thread.
+
+    While the background sender is running, new_event(), new_revenue_event(),
+    new_page_view(), and new_events() still validate their arguments and build
+    the payload on the calling thread, but then queue it and return an empty
+    dict immediately. A daemon worker thread posts queued events to Umami over
+    the shared connection pool, so request latency in your web views no longer
+    depends on Umami.
+
+    With batch_size greater than 1, the worker gathers queued events and sends
+    them together in one /api/batch request. It flushes as soon as it has
+    batch_size events, or flush_interval seconds after the first event of the
+    batch arrived, whichever comes first. A batch holding a single event is
+    sent to /api/send as usual.
+
+    Delivery is fire-and-forget: send errors are logged to the 'umami' logger
+    rather than raised. The async send functions are not affected. Calling
+    this while a sender is already running does nothing.
+
+    The queue holds at most max_queue_size events and, with
+    max_buffer_bytes, at most that many bytes of serialized event JSON, so
+    its memory use stays bounded during an outage even when custom_data
+    sizes vary widely. When an event doesn't fit, `overflow` decides what
+    happens:
+
+    - 'drop_newest' (the default) drops the new event; the caller never waits.
+    - 'drop_oldest' drops the oldest queued events to make room, keeping the
+      most recent ones.
+    - 'block' makes the caller wait up to block_timeout seconds for room,
+      then drops the new event. Sending then slows down with Umami.
+    - 'spill' writes the new event to the start_spool() file, from which it
+      is replayed once Umami is healthy. Without an active spool (or with a
+      full one) the event is dropped.
+
+    buffer_stats() reports how full the queue is and counts every dropped
+    event by reason.
+
+    Args:
+        max_queue_size: Maximum number of events waiting to be sent.
+            Defaults to 10,000.
+        batch_size: Maximum number of events per request. Defaults to 1 (one
+            request per event).
+        flush_interval: Maximum seconds an event waits for its batch to fill
+            before the batch is sent anyway. Only used when batch_size > 1.
+            Defaults to 1.0.
+        max_buffer_bytes: Maximum total size, in bytes of serialized JSON, of
+            the events waiting to be sent, or None for no byte limit.
+            Measuring costs one JSON encoding per event on the calling
+            thread. Defaults to None.
+        overflow: What to do with an event that doesn't fit: 'drop_newest',
+            'drop_oldest', 'block' or 'spill'. Defaults to 'drop_newest'.
+        block_timeout: Maximum seconds a caller waits for room with
+            overflow='block'. Defaults to 1.0.
+
+    Raises:
+        ValidationError: If max_queue_size, batch_size or max_buffer_bytes is
+            not a positive integer, flush_interval or block_timeout is
+            negative, or overflow is not one of the policies above.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_url_base('https://umami.example.com')
+        umami.start_background_sender(batch_size=100, flush_interval=2.0)
+        umami.new_event(event_name='signup')  # returns {} without waiting on Umami
+
+        # At most 16 MB queued; during an outage, keep the newest events.
+        umami.start_background_sender(max_buffer_bytes=16 * 1024 * 1024, overflow='drop_oldest')
+        ```
+    """
+    global _background
+    _validate_batching(max_queue_size, batch_size, flush_interval)
+    if max_buffer_bytes is not None and (
+        isinstance(max_buffer_bytes, bool) or not isinstance(max_buffer_bytes, int) or max_buffer_bytes <= 0
+    ):
+        raise ValidationError('max_buffer_bytes must be None or a positive integer.')
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValidationError(f'overflow must be one of {", ".join(OVERFLOW_POLICIES)}.')
+    if isinstance(block_timeout, bool) or not isinstance(block_timeout, (int, float)) or block_timeout < 0:
+        raise ValidationError('block_timeout must be a number >= 0.')
+
+    with _client_lock:
+        if _background is not None and _background.is_alive():
+            return
+        _background = BackgroundSender(
+            _deliver,
+            max_queue_size=max_queue_size,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            max_bytes=max_buffer_bytes,
+            overflow=overflow,
+            block_timeout=block_timeout,
+            sizeof=_body_size if max_buffer_bytes is not None else None,
+            spill=_spill_to_spool,
+        )
+        _background.start()
+
+
+def stop_background_sender(timeout: Optional[float] = 5.0) -> bool:
+    """
+    Stop the background sender and go back to sending on the calling thread.
+
+    Events already queued are sent before the worker exits, including those
+    queued with buffered=True while no background sender was running. New
+    events sent after this call are posted synchronously again. Safe to call
+    when no background sender is running.
+
+    Args:
+        timeout: Maximum seconds to wait for queued events to be sent. None
+            waits until the queue is empty. Defaults to 5.0.
+
+    Returns:
+        True if every queued event was handled before the timeout, False if
+        the worker was still busy when the timeout expired.
+    """
+    global _background, _call_buffer
+    with _client_lock:
+        senders = [sender for sender in (_background, _call_buffer) if sender is not None]
+        _background = _call_buffer = None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    stopped = True
+    for sender in senders:
+        stopped = sender.stop(None if deadline is None else max(deadline - time.monotonic(), 0.0)) and stopped
+    return stopped
+
+
+def buffer_stats() -> Optional[dict]:
+    """
+    Report how full the background sender's queue is and what it has lost.
+
+    Returns:
+        None if the background sender is not running. Otherwise a dict with:
+        'queued' and 'queued_bytes' (events waiting to be sent and their
+        serialized size, which is 0 without max_buffer_bytes), 'sent' and
+        'failed' (events the worker has sent, or failed to send), 'spilled'
+        (events written to the spool by overflow='spill'), and 'dropped' and
+        'dropped_bytes' (events lost to the overflow policy, and their size).
+        'dropped' maps each reason to a count: 'full' (no room, with
+        'drop_newest'), 'evicted' (pushed out with 'drop_oldest'),
+        'block_timeout' (no room in time with 'block'), 'spill_failed' (the
+        spool was missing or full) and 'too_large' (an event bigger than
+        max_buffer_bytes on its own).
+
+    Example:
+        ```python
+        import umami
+
+        stats = umami.buffer_stats()
+        if stats and stats['dropped']:
+            log.warning('analytics events dropped: %s', stats['dropped'])
+        ```
+    """
+    sender = _background
+    if sender is None:
+        return None
+    buffer = sender.buffer
+    return {
+        'queued': buffer.qsize(),
+        'queued_bytes': buffer.nbytes,
+        'sent': sender.sent,
+        'failed': sender.failed,
+        'spilled': buffer.spilled,
+        'dropped': sender.dropped_by_reason,
+        'dropped_bytes': buffer.dropped_bytes,
+    }
+
+
+def _body_size(body: dict) -> int:
+    """Serialized size of an event body, for the background sender's max_buffer_bytes."""
+    return len(json_codec.encode(body))
+
+
+def _spill_to_spool(item: tuple[dict, dict]) -> bool:
+    """overflow='spill': write a queued event that doesn't fit to the spool. Returns False if it wasn't stored."""
+    spool = _spool
+    if spool is None:
+        return False
+    body, headers = item
+    return spool.add([body], headers.get('User-Agent', event_user_agent)) == 1
+
+
+async def start_async_batcher(batch_size: int = 100, flush_interval: float = 1.0, max_queue_size: int = 10_000) -> None:
+    """
+    Start the batcher that sends buffered async events for the running event loop.
+
+    Calling new_event_async(), new_revenue_event_async(),
+    new_page_view_async(), or new_events_async() with buffered=True queues the
+    event and returns immediately. A task on your application's own event
+    loop (no extra thread) gathers buffered events and sends them over the
+    loop's pooled connection in one /api/batch request, as soon as it has
+    batch_size events or flush_interval seconds after the first one arrived.
+
+    Calling this is optional: the first buffered event starts a batcher with
+    the default settings. Call it from a startup hook to choose other
+    settings; it does nothing if this loop already has a batcher. Pair it with
+    flush_async() in a shutdown hook. When the loop shuts down through
+    asyncio.run(), events still buffered are sent before the task exits.
+
+    Delivery is fire-and-forget: send errors are logged to the 'umami' logger
+    rather than raised, and if the queue is full new events are dropped.
+
+    Args:
+        batch_size: Maximum number of events per request. Defaults to 100.
+        flush_interval: Maximum seconds an event waits for its batch to fill
+            before the batch is sent anyway. Defaults to 1.0.
+        max_queue_size: Maximum number of events waiting to be sent. Events
+            beyond this are dropped. Defaults to 10,000.
+
+    Raises:
+        ValidationError: If batch_size or max_queue_size is not a positive
+            integer, or flush_interval is negative.
+
+    Example:
+        ```python
+        import umami
+
+        await umami.start_async_batcher(batch_size=200, flush_interval=2.0)
+        await umami.new_event_async(event_name='api-call', buffered=True)
+        ...
+        await umami.flush_async()  # in your shutdown hook
+        ```
+    """
+    _validate_batching(max_queue_size, batch_size, flush_interval)
+    _get_async_batcher(max_queue_size=max_queue_size, batch_size=batch_size, flush_interval=flush_interval)
+
+
+async def flush_async() -> None:
+    """
+    Send every buffered async event on the running event loop now and wait.
+
+    The batcher's partial batch is sent without waiting for flush_interval,
+    and this returns once every event queued with buffered=True so far has
+    been sent. Use it in an application shutdown hook, before the loop stops,
+    so buffered events are not lost. Returns at once if nothing is buffered.
+    Send errors are logged, not raised.
+    """
+    batcher = _async_batchers.get(asyncio.get_running_loop())
+    if batcher is not None:
+        await batcher.flush()
+
+
+def _get_async_batcher(**settings: Any) -> AsyncBatcher:
+    """The running loop's batcher, created on first use (with `settings`, else the defaults)."""
+    loop = asyncio.get_running_loop()
+    batcher = _async_batchers.get(loop)
+    if batcher is None:
+        loop_ref = weakref.ref(loop)  # the batcher must not keep its own registry key alive
+        batcher = AsyncBatcher(_deliver_async, on_exit=lambda: _async_batchers.pop(loop_ref(), None), **settings)
+        _async_batchers[loop] = batcher
+    return batcher
+
+
+def _validate_batching(max_queue_size: int, batch_size: int, flush_interval: float) -> None:
+    """
+    Internal helper function, not need to use this.
+    """
+    for name, value in (('max_queue_size', max_queue_size), ('batch_size', batch_size)):
+        if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+            raise ValidationError(f'{name} must be a positive integer.')
+    if isinstance(flush_interval, bool) or not isinstance(flush_interval, (int, float)) or flush_interval < 0:
+        raise ValidationError('flush_interval must be a number >= 0.')
+
+
+def _relay_send(bodies: list[dict], headers: dict) -> bool:
+    """Hand events to the relay if configure(transport='relay') is on. Returns True if the relay took them over."""
+    relay = _relay
+    if relay is None:
+        return False
+    ua = headers.get('User-Agent', event_user_agent)
+    for body in bodies:
+        relay.send(json_codec.encode({'ua': ua, 'event': body}))
+    return True
+
+
+def _enqueue(bodies: list[dict], headers: dict, buffered: bool) -> bool:
+    """
+    Hand events to the relay (if configured) or the background sender if it is running (or, when `buffered`
+    asks for it, to the _buffered_sender() queue), or apply the set_rate_limits() when_limited policy if the
+    send rate limit is exhausted.
+
+    Returns True if the events were handed off, queued or dropped, False if the caller should send them inline.
+    A umami.Client always sends inline: these process-wide paths deliver with the module-level settings.
+    """
+    if _active_client.get() is not None:
+        return False
+    if _relay_send(bodies, headers):
+        return True
+    if not buffered and _background is None:
+        action = _rate_limit_action()
+        if action == 'drop':
+            return True
+        buffered = action == 'buffer'
+
+    sender = _background
+    if sender is None and buffered:
+        sender = _buffered_sender()
+    if sender is None:
+        return False
+
+    for body in bodies:
+        sender.submit(body, headers)
+    return True
+
+
+def _buffered_sender() -> BackgroundSender:
+    """
+    The queue for sync events sent with buffered=True, or held back by when_limited='buffer', while
+    start_background_sender() is not in effect.
+
+    A BackgroundSender with the default settings, started on first use. Unlike start_background_sender(), it
+    does not make the sync send functions queue: only events that ask for buffering go through it.
+    """
+    global _call_buffer
+    with _client_lock:
+        if _call_buffer is None or not _call_buffer.is_alive():
+            _call_buffer = BackgroundSender(_deliver, spill=_spill_to_spool)
+            _call_buffer.start()
+        return _call_buffer
+
+
+def _enqueue_async(bodies: list[dict], headers: dict, buffered: bool) -> bool:
+    """
+    Async counterpart of _enqueue(): queue events on the running loop's batcher when `buffered` asks for it
+    (or the when_limited policy does), or to the relay if configured. Returns True if the events were
+    handed off, queued or dropped.
+    """
+    if _active_client.get() is not None:
+        return False
+    if _relay_send(bodies, headers):
+        return True
+    if not buffered:
+        action = _rate_limit_action()
+        if action == 'drop':
+            return True
+        if action != 'buffer':
+            return False
+
+    batcher = _get_async_batcher()
+    for body in bodies:
+        batcher.submit(body, headers)
+    return True
+
+
+def start_counters(flush_interval: float = 10.0, max_keys: int = 10_000) -> None:
+    """
+    Start sending the counts collected by increment().
+
+    A daemon thread sends one event per distinct counter every flush_interval
+    seconds, with the number of increment() calls it saw (or the sum of their
+    `count` arguments) in custom_data['count'], then starts counting from
+    zero again. All counters due at once go out together in /api/batch
+    requests, through the circuit breaker and spool like any other event.
+    Send errors are logged to the 'umami' logger rather than raised.
+
+    increment() starts the counters with the default settings if they are
+    not running, so you only need this to change them. Calling it while the
+    counters are running does nothing.
+
+    Args:
+        flush_interval: Seconds between sends. Defaults to 10.0.
+        max_keys: Most distinct counters pending at once. Increments of new
+            counters beyond this are dropped until the next send. Defaults
+            to 10,000.
+
+    Raises:
+        ValidationError: If flush_interval is not a positive number or
+            max_keys is not a positive integer.
+
+    Example:
+        ```python
+        import umami
+
+        umami.start_counters(flush_interval=30)
+        ```
+    """
+    global _counters
+    if isinstance(flush_interval, bool) or not isinstance(flush_interval, (int, float)) or flush_interval <= 0:
+        raise ValidationError('flush_interval must be a number > 0.')
+    if isinstance(max_keys, bool) or not isinstance(max_keys, int) or max_keys <= 0:
+        raise ValidationError('max_keys must be a positive integer.')
+
+    with _client_lock:
+        if _counters is not None and _counters.is_alive():
+            return
+        _counters = CounterAggregator(
+            _send_counts, _send_counts_async, flush_interval=flush_interval, max_keys=max_keys
+        )
+        _counters.start()
+
+
+def stop_counters(timeout: Optional[float] = 5.0) -> bool:
+    """
+    Send the pending counts and stop the counter thread.
+
+    A later increment() starts it again. Safe to call when the counters are
+    not running.
+
+    Args:
+        timeout: Maximum seconds to wait for the final send. None waits until
+            it is done. Defaults to 5.0.
+
+    Returns:
+        True if the pending counts were handled before the timeout.
+    """
+    global _counters
+    with _client_lock:
+        counters, _counters = _counters, None
+    if counters is None:
+        return True
+    return counters.stop(timeout)
+
+
+def increment(
+    event_name: str,
+    custom_data: Optional[Dict[str, Any]] = None,
+    url: str = '/',
+    count: int = 1,
+    hostname: Optional[str] = None,
+    website_id: Optional[str] = None,
+) -> None:
+    """
+    Count an occurrence of an event without sending it right away.
+
+    Calls with the same event_name, custom_data, url, hostname and
+    website_id are added up in memory, and every flush interval one event
+    per distinct combination is sent with the total in
+    custom_data['count'] (see start_counters()). For a hot counter such as
+    'api-call', thousands of calls become a single request. The calling
+    thread never waits on the network, so it is safe to call from async
+    code too.
+
+    Counts still pending when the process exits are lost unless
+    flush_counters() or stop_counters() runs first. Sampling
+    (set_sampling()) does not apply to counters.
+
+    Args:
+        event_name: The name of the counter event (e.g. 'api-call').
+        custom_data: Data that identifies the counter; calls with different
+            custom_data are counted separately. Must be JSON-serializable.
+            Defaults to an empty dict.
+        url: The URL associated with the event. Defaults to '/'.
+        count: How much to add. Defaults to 1.
+        hostname: Optional hostname; overrides the set_hostname() value.
+        website_id: Optional Umami website ID; overrides the
+            set_website_id() value.
+
+    Raises:
+        OperationNotAllowedError: If neither set_url_base() nor
+            set_cloud_api_key() has been called.
+        ValidationError: If hostname or website_id is not set, count is not
+            a positive integer, or custom_data has a 'count' key.
+        TypeError: If custom_data is not JSON-serializable.
+
+    Example:
+        ```python
+        import umami
+
+        umami.increment('api-call', custom_data={'endpoint': '/search'})
+        ```
+    """
+    validate_state(url=True, user=False)
+    website_id, hostname, _ = _event_defaults(website_id, hostname)
+    custom_data = custom_data or {}
+    validate_event_data(event_name, hostname, website_id)
+    if isinstance(count, bool) or not isinstance(count, int) or count <= 0:
+        raise ValidationError('count must be a positive integer.')
+    if 'count' in custom_data:
+        raise ValidationError("custom_data can't have a 'count' key; increment() sets it.")
+
+    if not tracking_enabled:
+        return
+
+    key = (event_name, url, hostname, website_id, json.dumps(custom_data, sort_keys=True, separators=(',', ':')))
+    counters = _counters
+    if counters is None:
+        start_counters()
+        counters = _counters
+    counters.add(key, custom_data, count)  # type: ignore[union-attr]
+
+
+def flush_counters() -> None:
+    """
+    Send the counts collected by increment() now, on the calling thread.
+
+    Useful before shutdown or at the end of a batch job. The counter thread
+    keeps running. Send errors are logged to the 'umami' logger rather than
+    raised. Does nothing when there are no pending counts.
+    """
+    counters = _counters
+    if counters is not None:
+        counters.flush()
+
+
+async def flush_counters_async() -> None:
+    """
+    Send the counts collected by increment() now, over the running loop's pool.
+
+    Async twin of flush_counters().
+    """
+    counters = _counters
+    if counters is not None:
+        await counters.flush_async()
+
+
+def _counter_batches(counts: Counts, batch_size: int = 100) -> Iterable[list[dict]]:
+    """The /api/send bodies for pending counts, batch_size at a time."""
+    bodies = []
+    for (event_name, url, hostname, website_id, _), (custom_data, n) in counts.items():
+        body = _event_body(event_name, hostname, url, website_id, custom_data={**custom_data, 'count': n}, sample=False)
+        bodies.append(body)
+        if len(bodies) == batch_size:
+            yield bodies
+            bodies = []
+    if bodies:
+        yield bodies
+
+
+def _send_counts(counts: Counts) -> None:
+    """Send pending counts (runs on the counter thread, or the caller of flush_counters())."""
+    for bodies in _counter_batches(counts):
+        headers = _send_headers()
+        if not _relay_send(bodies, headers):
+            _deliver(bodies, headers, batch=True)
+
+
+async def _send_counts_async(counts: Counts) -> None:
+    """Async twin of _send_counts()."""
+    for bodies in _counter_batches(counts):
+        headers = _send_headers()
+        if not _relay_send(bodies, headers):
+            await _deliver_async(bodies, headers, batch=True)
+
+
+def flush(timeout: float = 5.0) -> int:
+    """
+    Send every event buffered in this process now, waiting at most `timeout` seconds.
+
+    Events queued on the background sender and counts collected by
+    increment() are sent in parallel: the counter totals on one thread, and
+    the queue by the background worker plus up to four helper threads. This
+    returns as soon as everything is sent, or when the timeout expires,
+    whichever comes first, so it can never hang a shutdown. Events still
+    unsent then keep sending in the background. Send failures are logged,
+    not raised (and spooled if start_spool() is active).
+
+    Events buffered on an async batcher belong to their event loop; use
+    flush_async() for them.
+
+    Args:
+        timeout: Maximum seconds to wait. Defaults to 5.0.
+
+    Returns:
+        The number of events that were still unsent when this returned
+        (0 means everything buffered was handled).
+
+    Raises:
+        ValidationError: If timeout is not a number >= 0.
+
+    Example:
+        ```python
+        import umami
+
+        unsent = umami.flush(timeout=2.0)
+        ```
+    """
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout < 0:
+        raise ValidationError('timeout must be a number >= 0.')
+
+    deadline = time.monotonic() + timeout
+    counters = _counters
+    counter_thread = None
+    if counters is not None:
+        counter_thread = threading.Thread(target=counters.flush, name='umami-flush-counters', daemon=True)
+        counter_thread.start()
+
+    unsent = 0
+    for sender in (_background, _call_buffer):
+        if sender is not None:
+            unsent += sender.flush(max(deadline - time.monotonic(), 0.0))
+
+    if counter_thread is not None:
+        counter_thread.join(max(deadline - time.monotonic(), 0))
+        if counter_thread.is_alive():
+            unsent += counters.in_flight  # type: ignore[union-attr]
+    return unsent
+
+
+def shutdown(timeout: float = 5.0) -> int:
+    """
+    Send what is buffered, within `timeout` seconds, then stop the SDK's background work.
+
+    Runs flush(timeout), then stops the background sender, the counter
+    thread, the spool and the circuit breaker, and closes the connection
+    pool, without waiting past the deadline. Events that were not sent in
+    time are lost (except spooled ones, which stay on disk) and are reported
+    in the return value and in a warning on the 'umami' logger.
+
+    The SDK calls this at interpreter exit (see set_exit_flush()), so you
+    only need it for an explicit shutdown, such as a worker's exit hook.
+    Safe to call more than once; sending events afterward starts a fresh
+    background sender or connection pool as needed.
+
+    Args:
+        timeout: Maximum seconds to spend. Defaults to 5.0.
+
+    Returns:
+        The number of buffered events that were dropped because they could
+        not be sent in time.
+
+    Raises:
+        ValidationError: If timeout is not a number >= 0.
+    """
+    start = time.monotonic()
+    dropped = flush(timeout)
+    deadline = start + timeout
+
+    def remaining() -> float:
+        return max(deadline - time.monotonic(), 0.0)
+
+    stop_counters(remaining())
+    stop_background_sender(remaining())
+    stop_spool(remaining())
+    clear_circuit_breaker()
+    close()
+    if dropped:
+        log.warning('umami: shutdown dropped %d event(s) that could not be sent within %s seconds.', dropped, timeout)
+    return dropped
+
+
+def set_exit_flush(timeout: Optional[float] = 5.0, on_sigterm: bool = False) -> None:
+    """
+    Choose how long the SDK may spend sending buffered events when the process exits.
+
+    By default, if the background sender or increment() counters hold
+    events at interpreter exit, an atexit hook calls shutdown(5.0), so a
+    normal exit (including sys.exit() and gunicorn's worker shutdown) sends
+    them instead of losing them, and never waits more than 5 seconds.
+
+    Python does not run atexit hooks when it is killed by SIGTERM, which is
+    how container platforms stop processes on deploys and scale-in. With
+    on_sigterm=True the SDK also handles SIGTERM: it runs shutdown(timeout),
+    then hands the signal to the handler that was installed before (or
+    applies the default action, ending the process). Call this from the main
+    thread, after any SIGTERM handler of your own framework is installed.
+
+    Args:
+        timeout: Maximum seconds to spend at exit, or None to not send
+            buffered events at exit at all. Defaults to 5.0.
+        on_sigterm: Also flush on SIGTERM. Defaults to False; passing False
+            removes a handler installed earlier.
+
+    Raises:
+        ValidationError: If timeout is not None or a number >= 0.
+        ValueError: If on_sigterm changes the handler from a thread other
+            than the main thread (a restriction of the signal module).
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_exit_flush(timeout=3.0, on_sigterm=True)
+        ```
+    """
+    global _exit_flush_timeout, _sigterm_hooked, _previous_sigterm_handler
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout < 0):
+        raise ValidationError('timeout must be None or a number >= 0.')
+
+    if on_sigterm and not _sigterm_hooked:
+        _previous_sigterm_handler = signal.signal(signal.SIGTERM, _flush_on_sigterm)
+        _sigterm_hooked = True
+    elif not on_sigterm and _sigterm_hooked:
+        # None means a handler not installed from Python; the default is the closest we can restore.
+        signal.signal(signal.SIGTERM, _previous_sigterm_handler or signal.SIG_DFL)
+        _sigterm_hooked, _previous_sigterm_handler = False, None
+    _exit_flush_timeout = timeout
+
+
+def _has_buffered_work() -> bool:
+    return _background is not None or _call_buffer is not None or _counters is not None
+
+
+def _flush_at_exit() -> None:
+    """The atexit hook: shutdown() within the set_exit_flush() timeout, if anything is buffered."""
+    timeout = _exit_flush_timeout
+    if timeout is not None and _has_buffered_work():
+        shutdown(timeout)
+
+
+def _flush_on_sigterm(signum: int, frame: Any) -> None:
+    """SIGTERM handler installed by set_exit_flush(on_sigterm=True)."""
+    timeout = _exit_flush_timeout
+    if timeout is not None and _has_buffered_work():
+        # On its own thread: the signal may have interrupted this thread while it held an SDK lock.
+        worker = threading.Thread(target=shutdown, args=(timeout,), name='umami-sigterm-flush', daemon=True)
+        worker.start()
+        worker.join(timeout + 1.0)
+
+    previous = _previous_sigterm_handler
+    if callable(previous):
+        previous(signum, frame)
+    elif previous != signal.SIG_IGN:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+atexit.register(_flush_at_exit)
+
+
+def start_spool(
+    path: str,
+    max_events: int = 100_000,
+    replay_rate: float = 100.0,
+    batch_size: int = 100,
+    check_interval: float = 10.0,
+) -> None:
+    """
+    Keep events that could not be delivered in a file on disk and send them once Umami is back.
+
+    While the spool is active, an event whose send fails because Umami is
+    unreachable or overloaded (a connection error or timeout, a 5xx response,
+    or 429 Too Many Requests) is written to a SQLite file at `path` instead of
+    being lost, and the send function returns an empty dict rather than
+    raising. This covers inline sends, the background sender, and buffered
+    async sends. Other errors, such as a 4xx for a bad website id, still
+    raise as before.
+
+    A daemon thread calls heartbeat() every check_interval seconds while the
+    spool holds events. Once the server answers, it waits a random part of
+    check_interval (so many processes recovering from one outage don't all
+    reconnect together) and then replays the spool oldest-first, at most
+    replay_rate events per second. Events left in the file when the process
+    exits are replayed by the next process that opens the same path.
+
+    Only the event body and its User-Agent are stored; credentials are never
+    written to disk. Processes forked after this call (such as pre-fork
+    server workers) share the file: each child writes its failed sends to
+    it on a connection of its own, and this process's drainer replays them.
+    Separate processes that each call start_spool() should use separate
+    paths, since each runs its own drainer and two drainers on one file may
+    replay the same event twice. Calling this while a spool is already
+    active does nothing.
+
+    Args:
+        path: Path of the SQLite spool file. Created if it does not exist.
+        max_events: Maximum number of events kept in the file. Events beyond
+            this are dropped. Defaults to 100,000.
+        replay_rate: Maximum events per second sent while replaying.
+            Defaults to 100.0.
+        batch_size: Maximum number of events per replay request. Defaults
+            to 100.
+        check_interval: Seconds between health checks while the spool holds
+            events. Defaults to 10.0.
+
+    Raises:
+        ValidationError: If path is empty, max_events or batch_size is not a
+            positive integer, or replay_rate or check_interval is not a
+            positive number.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_url_base('https://umami.example.com')
+        umami.start_spool('/var/lib/myapp/umami-spool.db')
+        umami.new_event(event_name='signup')  # spooled if Umami is down, sent later
+        ```
+    """
+    global _spool, _spool_drainer
+    if not path:
+        raise ValidationError('path cannot be empty.')
+    for name, value in (('max_events', max_events), ('batch_size', batch_size)):
+        if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+            raise ValidationError(f'{name} must be a positive integer.')
+    for name, number in (('replay_rate', replay_rate), ('check_interval', check_interval)):
+        if isinstance(number, bool) or not isinstance(number, (int, float)) or number <= 0:
+            raise ValidationError(f'{name} must be a number > 0.')
+
+    with _client_lock:
+        if _spool is not None:
+            return
+        _spool = Spool(path, max_events=max_events)
+        _spool_drainer = SpoolDrainer(
+            _spool,
+            _replay_spooled,
+            heartbeat,
+            replay_rate=replay_rate,
+            batch_size=batch_size,
+            check_interval=check_interval,
+        )
+        _spool_drainer.start()
+
+
+def stop_spool(timeout: Optional[float] = 5.0) -> bool:
+    """
+    Stop spooling failed events and stop replaying the spool file.
+
+    Events still in the file stay there and are replayed the next time
+    start_spool() opens the same path. Sends that fail after this call raise
+    again. Safe to call when no spool is active.
+
+    Args:
+        timeout: Maximum seconds to wait for a replay in progress to stop.
+            None waits until it does. Defaults to 5.0.
+
+    Returns:
+        True if the replay thread stopped before the timeout, False otherwise.
+    """
+    global _spool, _spool_drainer
+    with _client_lock:
+        spool, drainer = _spool, _spool_drainer
+        _spool, _spool_drainer = None, None
+    if spool is None:
+        return True
+    stopped = drainer.stop(timeout) if drainer is not None else True
+    spool.close()
+    return stopped
+
+
+def set_circuit_breaker(
+    failure_threshold: int = 5,
+    reset_timeout: float = 30.0,
+    on_state_change: Optional[Callable[[str, str], None]] = None,
+) -> None:
+    """
+    Stop sending events to Umami for a while after it keeps failing.
+
+    Without a breaker, every event sent while Umami is down or slow waits for
+    its request to fail, and that latency adds up across all your workers.
+    With one, failure_threshold consecutive ingestion failures (connection
+    errors, timeouts, 429 or 5xx responses, after any retries) open the
+    breaker. While it is open, new_event(), new_revenue_event(),
+    new_page_view(), new_events() and their async twins raise
+    CircuitOpenError immediately, or spool the event if start_spool() is
+    active. Buffered events are affected the same way: the background
+    sender and async batcher log them as failed (or spool them) without
+    waiting on the network.
+
+    reset_timeout seconds after opening, a background thread calls
+    heartbeat(). Once it succeeds the breaker goes half-open and lets one
+    trial send through: success closes the breaker, failure opens it again.
+    A trial that is cancelled, or still running after reset_timeout
+    seconds, makes way for the next send. While heartbeat() keeps failing
+    it is retried every reset_timeout seconds. Query functions are never
+    blocked by the breaker.
+
+    Calling this again replaces the breaker (starting closed); call
+    clear_circuit_breaker() to remove it.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker.
+            Defaults to 5.
+        reset_timeout: Seconds to stay open before probing with heartbeat().
+            Defaults to 30.0.
+        on_state_change: Optional callback called as
+            on_state_change(old_state, new_state) on every transition, with
+            states 'closed', 'open', and 'half_open'. It runs on whichever
+            thread caused the change, so keep it quick; exceptions it raises
+            are logged and ignored.
+
+    Raises:
+        ValidationError: If failure_threshold is not a positive integer or
+            reset_timeout is not a positive number.
+
+    Example:
+        ```python
+        import logging
+        import umami
+
+        def report(old: str, new: str):
+            logging.warning('Umami circuit breaker: %s -> %s', old, new)
+
+        umami.set_circuit_breaker(failure_threshold=3, reset_timeout=10, on_state_change=report)
+        ```
+    """
+    global _breaker
+    if isinstance(failure_threshold, bool) or not isinstance(failure_threshold, int) or failure_threshold <= 0:
+        raise ValidationError('failure_threshold must be a positive integer.')
+    if isinstance(reset_timeout, bool) or not isinstance(reset_timeout, (int, float)) or reset_timeout <= 0:
+        raise ValidationError('reset_timeout must be a number > 0.')
+
+    breaker = CircuitBreaker(failure_threshold, reset_timeout, probe=heartbeat, on_state_change=on_state_change)
+    with _client_lock:
+        old, _breaker = _breaker, breaker
+    if old is not None:
+        old.close()
+
+
+def clear_circuit_breaker() -> None:
+    """
+    Remove the circuit breaker set by set_circuit_breaker().
+
+    Events are sent normally again, even if the breaker was open. Safe to
+    call when no breaker is set.
+    """
+    global _breaker
+    with _client_lock:
+        old, _breaker = _breaker, None
+    if old is not None:
+        old.close()
+
+
+def set_dedup_window(max_keys: int = 10_000, ttl: float = 3600.0) -> None:
+    """
+    Don't send an event to Umami again once it may have been stored.
+
+    Once set, every event gets a random idempotency key when it is created,
+    which stays with it through the background sender, the async batcher,
+    retries, and the spool (start_spool()). The SDK remembers the keys of
+    events Umami has accepted, and an event whose key it remembers is
+    skipped instead of sent again. This matters most for
+    new_revenue_event(), where a duplicate inflates revenue: for example,
+    spool rows that were sent but not yet removed when the process stopped
+    replaying them are not counted twice.
+
+    Umami does not deduplicate on the key itself, so a send that fails after
+    the server may have stored it (a read timeout, a dropped connection, or
+    a 5xx response) is neither retried (see set_retry_policy()) nor spooled
+    while a window is set, and its key is remembered as if it had been
+    accepted. Such events are sent at most once and may be lost; the error
+    is raised (or logged, for buffered events) as usual. Failures that never
+    reached the server, such as a refused connection or 429, are still
+    retried and spooled.
+
+    The window holds the keys of the last max_keys accepted events for ttl
+    seconds each, so lookups are O(1) and memory stays bounded. Keys are
+    kept per process, in memory.
+
+    The key is not part of the event Umami stores. Single events are sent
+    with an Idempotency-Key header, which a proxy or relay in front of Umami
+    can use to drop duplicates the SDK cannot see, such as the same event
+    sent again by another process.
+
+    Calling this again replaces the window (forgetting remembered keys);
+    call clear_dedup_window() to turn it off.
+
+    Args:
+        max_keys: Most keys to remember; the oldest are forgotten first.
+            Defaults to 10,000 (about 3 MB).
+        ttl: Seconds each key is remembered. Defaults to 3600.
+
+    Raises:
+        ValidationError: If max_keys is not a positive integer or ttl is not
+            a positive number.
+
+    Example:
+        ```python
+        import umami
+
+        umami.set_retry_policy(max_attempts=3)
+        umami.set_dedup_window(max_keys=50_000, ttl=600)
+        ```
+    """
+    global _dedup
+    if isinstance(max_keys, bool) or not isinstance(max_keys, int) or max_keys <= 0:
+        raise ValidationError('max_keys must be a positive integer.')
+    if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0:
+        raise ValidationError('ttl must be a number > 0.')
+
+    _dedup = DedupWindow(max_keys, ttl)
+
+
+def clear_dedup_window() -> None:
+    """
+    Turn off idempotency keys and forget the keys set_dedup_window() remembered.
+
+    Events created from now on have no key; queued or spooled events that
+    already have one are still sent without it. Safe to call when no window
+    is set.
+    """
+    global _dedup
+    _dedup = None
+
+
+def _is_outage(error: Exception) -> bool:
+    """Whether `error` means Umami couldn't take the request right now (as opposed to rejecting it)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return is_retryable_status(error.response.status_code)
+    return isinstance(error, (httpx.TransportError, CircuitOpenError))
+
+
+def _breaker_allow(breaker: Optional[CircuitBreaker]) -> None:
+    """
+    Internal helper function, not need to use this.
+    """
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError('Umami is unavailable (circuit breaker is open); the event was not sent.')
+
+
+def _breaker_release(breaker: Optional[CircuitBreaker]) -> None:
+    """Release the half-open trial (if this send held it) when the send ended without an outcome."""
+    if breaker is not None:
+        breaker.release_trial()
+
+
+def _breaker_record(breaker: Optional[CircuitBreaker], error: Optional[Exception]) -> None:
+    """Report a send's outcome. Any response from the server other than 429/5xx counts as success."""
+    if breaker is None or isinstance(error, CircuitOpenError):
+        return
+    if error is not None and _is_outage(error):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _spool_failed(bodies: list[dict], headers: dict, error: Exception) -> bool:
+    """
+    Write events to the spool if one is active and `error` means the server couldn't take them right now.
+
+    Returns True if the events were spooled (or dropped because the spool is full), False if the caller should raise.
+    """
+    spool = _spool
+    if spool is None or not _is_outage(error):
+        return False
+
+    window = _dedup
+    if window is not None:
+        bodies = window.unsent(bodies)  # events the server may have stored already are not kept for a replay
+        if not bodies:
+            return False
+    spool.add(bodies, headers.get('User-Agent', event_user_agent))
+    return True
+
+
+def _replay_spooled(bodies: list[dict], user_agent: str) -> None:
+    """Send spooled events (runs on the drainer thread); auth headers are rebuilt from the current settings."""
+    _post_events(bodies, _send_headers(ua=user_agent))
+
+
+def _key_header(event_data: dict, headers: dict) -> tuple[dict, dict]:
+    """Move a lone event's idempotency key (if it has one) from its body to an Idempotency-Key header."""
+    key = event_data.get(KEY_FIELD)
+    if key is None:
+        return event_data, headers
+    return strip_key(event_data), {**headers, 'Idempotency-Key': key}
+
+
+def _post_event(event_data: dict, headers: dict, timeout: Optional[float] = None, retry_ambiguous: bool = True) -> dict:
+    """POST one /api/send body and return the parsed response (runs on the caller or the background thread)."""
+    event_data, headers = _key_header(event_data, headers)
+    resp = _http_post(_send_url(), json=event_data, headers=headers, timeout=timeout, retry_ambiguous=retry_ambiguous)
+    resp.raise_for_status()
+
+    return _json(resp)
+
+
+def _post_batch(
+    bodies: list[dict], headers: dict, timeout: Optional[float] = None, retry_ambiguous: bool = True
+) -> dict:
+    """POST several /api/send bodies as one /api/batch request and return the parsed response."""
+    wire = [strip_key(body) for body in bodies]
+    resp = _http_post(_batch_url(), json=wire, headers=headers, timeout=timeout, retry_ambiguous=retry_ambiguous)
+    resp.raise_for_status()
+
+    return _json(resp)
+
+
+def _post_events(bodies: list[dict], headers: dict, batch: bool = False, timeout: Optional[float] = None) -> dict:
+    """
+    POST events: a lone event goes to /api/send (unless `batch`), anything more to /api/batch.
+
+    With a dedup window set, events it has already seen delivered are skipped ({} if that leaves none),
+    and the rest are added to it once the server accepts them, or once a failure leaves it unclear
+    whether the server stored them. Such failures are not retried either: see _maybe_delivered().
+    """
+    window = _dedup
+    if window is not None:
+        bodies = window.unsent(bodies)
+        if not bodies:
+            return {}
+
+    try:
+        if len(bodies) == 1 and not batch:
+            result = _post_event(bodies[0], headers, timeout, retry_ambiguous=window is None)
+        else:
+            result = _post_batch(bodies, headers, timeout, retry_ambiguous=window is None)
+    except Exception as e:
+        if window is not None and _maybe_delivered(e):
+            window.add(bodies)
+        raise
+
+    if window is not None:
+        window.add(bodies)
+    return result
+
+
+async def _post_events_async(
+    bodies: list[dict], headers: dict, batch: bool = False, timeout: Optional[float] = None
+) -> dict:
+    """Async twin of _post_events()."""
+    window = _dedup
+    if window is not None:
+        bodies = window.unsent(bodies)
+        if not bodies:
+            return {}
+
+    try:
+        if len(bodies) == 1 and not batch:
+            event_data, send_headers = _key_header(bodies[0], headers)
+            resp = await _http_post_async(
+                _send_url(), json=event_data, headers=send_headers, timeout=timeout, retry_ambiguous=window is None
+            )
+        else:
+            wire = [strip_key(body) for body in bodies]
+            resp = await _http_post_async(
+                _batch_url(), json=wire, headers=headers, timeout=timeout, retry_ambiguous=window is None
+            )
+        resp.raise_for_status()
+    except Exception as e:
+        if window is not None and _maybe_delivered(e):
+            window.add(bodies)
+        raise
+
+    if window is not None:
+        window.add(bodies)
+    return _json(resp)
+
+
+def _maybe_delivered(error: Exception) -> bool:
+    """
+    Whether a failed send may have been stored by the server anyway (a read timeout, a dropped connection, a 5xx).
+
+    Under a dedup window such events count as delivered: sending them again, by a retry or a spool replay,
+    could count them twice, which is what the window is there to prevent.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return may_have_been_processed(error.response, None)
+    if isinstance(error, httpx.TransportError):
+        return may_have_been_processed(None, error)
+    return False
+
+
+def _deliver(bodies: list[dict], headers: dict, batch: bool = False, timeout: Optional[float] = None) -> dict:
+    """
+    Send events through the circuit breaker (if one is set), diverting them to the spool (if one is active)
+    when Umami is unreachable or overloaded.
+
+    Used by the sync send functions and the background sender. Returns {} for spooled events. A umami.Client's
+    events skip both: the breaker and the spool belong to the module-level settings.
+    """
+    if _active_client.get() is not None:
+        return _post_events(bodies, headers, batch, timeout)
+    breaker = _breaker
+    try:
+        _breaker_allow(breaker)
+        result = _post_events(bodies, headers, batch, timeout)
+    except Exception as e:
+        _breaker_record(breaker, e)
+        if not _spool_failed(bodies, headers, e):
+            raise
+        return {}
+    except BaseException:
+        _breaker_release(breaker)  # cancelled mid-send: no verdict, but don't hold a half-open trial forever
+        raise
+
+    _breaker_record(breaker, None)
+    return result
+
+
+async def _deliver_async(
+    bodies: list[dict], headers: dict, batch: bool = False, timeout: Optional[float] = None
+) -> dict:
+    """Async twin of _deliver(), used by the async send functions and the async batcher."""
+    if _active_client.get() is not None:
+        return await _post_events_async(bodies, headers, batch, timeout)
+    breaker = _breaker
+    try:
+        _breaker_allow(breaker)
+        result = await _post_events_async(bodies, headers, batch, timeout)
+    except Exception as e:
+        _breaker_record(breaker, e)
+        if not _spool_failed(bodies, headers, e):
+            raise
+        return {}
+    except BaseException:
+        _breaker_release(breaker)  # cancelled mid-send: no verdict, but don't hold a half-open trial forever
+        raise
+
+    _breaker_record(breaker, None)
+    return result
+
+
+def _keyed(body: dict) -> dict:
+    """Give a freshly built event body its idempotency key while a dedup window is set."""
+    if _dedup is not None:
+        body[KEY_FIELD] = new_key()
+    return body
+
+
+def _event_body(
+    event_name: str,
+    hostname: Optional[str] = None,
+    url: str = '/',
+    website_id: Optional[str] = None,
+    title: Optional[str] = None,
+    custom_data: Optional[Dict[str, Any]] = None,
+    referrer: str = '',
+    language: str = 'en-US',
+    screen: str = '1920x1080',
+    ip_address: Optional[str] = None,
+    distinct_id: Optional[Union[str, int]] = None,
+    sample: bool = True,
+) -> Optional[dict]:
+    """
+    Internal use only. Validates new_event() arguments and builds its /api/send body (None if sampled out).
+
+    `sample=False` skips set_sampling(), for events such as counter totals that must not be thinned.
+    """
+    validate_state(url=True, user=False)
+    website_id, hostname, normalized_distinct_id = _event_defaults(website_id, hostname, distinct_id)
+    title = title or event_name
+    custom_data = custom_data or {}
+
+    validate_event_data(event_name, hostname, website_id)
+
+    sample_rate = _sample_rate(event_name, url, normalized_distinct_id) if sample else 1.0
+    if sample_rate is None:
+        return None
+    if sample_rate < 1.0:
+        custom_data = {**custom_data, 'sample_rate': sample_rate}
+
+    payload = {
+        'hostname': hostname,
+        'language': language,
+        'referrer': referrer,
+        'screen': screen,
+        'title': title,
+        'url': url,
+        'website': website_id,
+        'name': event_name,
+        'data': custom_data,
+    }
+
+    if ip_address and ip_address.strip():
+        payload['ip'] = ip_address
+
+    if normalized_distinct_id:
+        payload['id'] = normalized_distinct_id
+
+    return _keyed({'payload': payload, 'type': 'event'})
+
+
+def _page_view_body(
+    page_title: str,
+    url: str,
+    hostname: Optional[str] = None,
+    website_id: Optional[str] = None,
+    referrer: str = '',
+    language: str = 'en-US',
+    screen: str = '1920x1080',
+    ip_address: Optional[str] = None,
+    distinct_id: Optional[Union[str, int]] = None,
+) -> Optional[dict]:
+    """
+    Internal use only. Validates new_page_view() arguments and builds its /api/send body (None if sampled out).
+    """
+    validate_state(url=True, user=False)
+    website_id, hostname, normalized_distinct_id = _event_defaults(website_id, hostname, distinct_id)
+
+    validate_event_data(event_name='NOT NEEDED', hostname=hostname, website_id=website_id)
 
-    Only the send functions are affected; query and authentication functions
-    (such as login(), websites(), website_stats(), active_users(),
-    verify_token(), and heartbeat()) always run regardless of this setting.
-    Call disable() to turn tracking off.
-    """
-    global tracking_enabled
-    tracking_enabled = True
+    sample_rate = _sample_rate(None, url, normalized_distinct_id)
+    if sample_rate is None:
+        return None
 
+    payload = {
+        'hostname': hostname,
+        'language': language,
+        'referrer': referrer,
+        'screen': screen,
+        'title': page_title,
+        'url': url,
+        'website': website_id,
+    }
 
-def disable() -> None:
-    """
-    Disable event and page view tracking.
+    if sample_rate < 1.0:
+        payload['data'] = {'sample_rate': sample_rate}
 
-    When disabled, the send functions new_event(), new_revenue_event(), and
-    new_page_view() still validate their arguments but then return without
-    making any HTTP request to Umami. This is useful for development and
-    testing environments.
+    if ip_address and ip_address.strip():
+        payload['ip'] = ip_address
 
-    Only the send functions are affected; query and authentication functions
-    (such as login(), websites(), website_stats(), active_users(),
-    verify_token(), and heartbeat()) always run regardless of this setting.
-    Call enable() to turn tracking back on (the default).
-    """
-    global tracking_enabled
-    tracking_enabled = False
+    if normalized_distinct_id:
+        payload['id'] = normalized_distinct_id
+
+    return _keyed({'payload': payload, 'type': 'event'})
 
 
 async def new_event_async(
@@ -501,6 +2865,8 @@ async def new_event_async(
     screen: str = '1920x1080',
     ip_address: Optional[str] = None,
     distinct_id: Optional[Union[str, int]] = None,
+    buffered: bool = False,
+    timeout: Optional[float] = None,
 ) -> dict:
     """
     Create a new custom event in Umami for the given website_id and hostname
@@ -533,6 +2899,14 @@ async def new_event_async(
         distinct_id: Optional Umami distinct ID for the user, as a string or
             integer, sent to the API as the payload field 'id'. Blank or
             whitespace-only values are ignored (no id is sent).
+        buffered: If True, queue the event on this event loop's batcher and
+            return an empty dict immediately; the batcher sends it together
+            with other buffered events in one /api/batch request. See
+            start_async_batcher() and flush_async().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
 
     Returns:
         The JSON response from the Umami API as a dict, or an empty dict if
@@ -561,47 +2935,29 @@ async def new_event_async(
         )
         ```
     """
-    validate_state(url=True, user=False)
-    website_id = website_id or default_website_id
-    hostname = hostname or default_hostname
-    title = title or event_name
-    custom_data = custom_data or {}
-    normalized_distinct_id = normalize_distinct_id(distinct_id)
-
-    validate_event_data(event_name, hostname, website_id)
+    event_data = _event_body(
+        event_name,
+        hostname=hostname,
+        url=url,
+        website_id=website_id,
+        title=title,
+        custom_data=custom_data,
+        referrer=referrer,
+        language=language,
+        screen=screen,
+        ip_address=ip_address,
+        distinct_id=distinct_id,
+    )
 
-    # Early return if tracking is disabled
-    if not tracking_enabled:
+    # Early return if tracking is disabled or the event was sampled out
+    if event_data is None or not tracking_enabled:
         return {}
 
-    api_url = _send_url()
     headers = _send_headers()
+    if _enqueue_async([event_data], headers, buffered):
+        return {}
 
-    payload = {
-        'hostname': hostname,
-        'language': language,
-        'referrer': referrer,
-        'screen': screen,
-        'title': title,
-        'url': url,
-        'website': website_id,
-        'name': event_name,
-        'data': custom_data,
-    }
-
-    if ip_address and ip_address.strip():
-        payload['ip'] = ip_address
-
-    if normalized_distinct_id:
-        payload['id'] = normalized_distinct_id
-
-    event_data = {'payload': payload, 'type': 'event'}
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(api_url, json=event_data, headers=headers, follow_redirects=True)
-        resp.raise_for_status()
-
-    return resp.json()
+    return await _deliver_async([event_data], headers, timeout=timeout)
 
 
 def new_event(
@@ -616,6 +2972,8 @@ def new_event(
     screen: str = '1920x1080',
     ip_address: Optional[str] = None,
     distinct_id: Optional[Union[str, int]] = None,
+    buffered: bool = False,
+    timeout: Optional[float] = None,
 ) -> dict:
     """
     Create a new custom event in Umami for the given website_id and hostname
@@ -648,10 +3006,20 @@ def new_event(
         distinct_id: Optional Umami distinct ID for the user, as a string or
             integer, sent to the API as the payload field 'id'. Blank or
             whitespace-only values are ignored (no id is sent).
+        buffered: If True, queue the event for the background sender and
+            return an empty dict immediately. Without a running background
+            sender, a queue with its default settings sends the event; only
+            calls that pass buffered=True use it, so other calls still send
+            inline. See start_background_sender().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
 
     Returns:
         The JSON response from the Umami API as a dict, or an empty dict if
-        tracking is disabled.
+        tracking is disabled or the event was queued for the background sender
+        (see start_background_sender()).
 
     Raises:
         OperationNotAllowedError: If neither set_url_base() nor
@@ -676,46 +3044,198 @@ def new_event(
         )
         ```
     """
-    validate_state(url=True, user=False)
-    website_id = website_id or default_website_id
-    hostname = hostname or default_hostname
-    title = title or event_name
-    custom_data = custom_data or {}
-    normalized_distinct_id = normalize_distinct_id(distinct_id)
+    event_data = _event_body(
+        event_name,
+        hostname=hostname,
+        url=url,
+        website_id=website_id,
+        title=title,
+        custom_data=custom_data,
+        referrer=referrer,
+        language=language,
+        screen=screen,
+        ip_address=ip_address,
+        distinct_id=distinct_id,
+    )
 
-    validate_event_data(event_name, hostname, website_id)
+    # Early return if tracking is disabled or the event was sampled out
+    if event_data is None or not tracking_enabled:
+        return {}
+
+    headers = _send_headers()
+    if _enqueue([event_data], headers, buffered):
+        return {}
+
+    return _deliver([event_data], headers, timeout=timeout)
+
+
+async def new_events_async(
+    events: Iterable[Dict[str, Any]], buffered: bool = False, timeout: Optional[float] = None
+) -> dict:
+    """
+    Send many custom events to Umami in a single /api/batch request.
+
+    Each item is a dict of new_event_async() keyword arguments (event_name is
+    required; hostname and website_id fall back to the set_hostname() and
+    set_website_id() defaults). Every item is validated exactly as
+    new_event_async() would validate it before anything is sent, so one bad
+    item means nothing is sent. Use this to cut the request count when you
+    record many events at once.
+
+    If tracking has been turned off with disable(), or events is empty, the
+    inputs are still validated but no HTTP request is made and an empty dict
+    is returned.
+
+    Args:
+        events: An iterable of dicts, each holding the keyword arguments for
+            one new_event_async() call.
+        buffered: If True, queue the events on this event loop's batcher and
+            return an empty dict immediately; the batcher sends them together
+            with other buffered events in /api/batch requests. See
+            start_async_batcher() and flush_async().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
+
+    Returns:
+        The JSON response from the Umami batch API as a dict (with 'size',
+        'processed', and 'errors' counts), or an empty dict if nothing was
+        sent.
+
+    Raises:
+        OperationNotAllowedError: If neither set_url_base() nor
+            set_cloud_api_key() has been called.
+        ValidationError: If an item is not a dict, or fails the same checks
+            as new_event_async().
+        httpx.HTTPStatusError: If Umami returns a non-2xx response (only when
+            tracking is enabled).
+
+    Example:
+        ```python
+        import umami
+
+        await umami.new_events_async([
+            {'event_name': 'signup', 'url': '/join'},
+            {'event_name': 'download', 'url': '/files', 'custom_data': {'file': 'guide.pdf'}},
+        ])
+        ```
+    """
+    bodies = _event_bodies(events)
 
     # Early return if tracking is disabled
-    if not tracking_enabled:
+    if not bodies or not tracking_enabled:
         return {}
 
-    api_url = _send_url()
     headers = _send_headers()
+    if _enqueue_async(bodies, headers, buffered):
+        return {}
 
-    payload = {
-        'hostname': hostname,
-        'language': language,
-        'referrer': referrer,
-        'screen': screen,
-        'title': title,
-        'url': url,
-        'website': website_id,
-        'name': event_name,
-        'data': custom_data,
-    }
+    return await _deliver_async(bodies, headers, batch=True, timeout=timeout)
 
-    if ip_address and ip_address.strip():
-        payload['ip'] = ip_address
 
-    if normalized_distinct_id:
-        payload['id'] = normalized_distinct_id
+def new_events(events: Iterable[Dict[str, Any]], buffered: bool = False, timeout: Optional[float] = None) -> dict:
+    """
+    Send many custom events to Umami in a single /api/batch request.
 
-    event_data = {'payload': payload, 'type': 'event'}
+    Each item is a dict of new_event() keyword arguments (event_name is
+    required; hostname and website_id fall back to the set_hostname() and
+    set_website_id() defaults). Every item is validated exactly as new_event()
+    would validate it before anything is sent, so one bad item means nothing
+    is sent. Use this to cut the request count when you record many events at
+    once.
+
+    If tracking has been turned off with disable(), or events is empty, the
+    inputs are still validated but no HTTP request is made and an empty dict
+    is returned. While the background sender is running (see
+    start_background_sender()), the events are queued instead and an empty
+    dict is returned.
+
+    Args:
+        events: An iterable of dicts, each holding the keyword arguments for
+            one new_event() call.
+        buffered: If True, queue the events for the background sender and
+            return an empty dict immediately. Without a running background
+            sender, a queue with its default settings sends them; only calls
+            that pass buffered=True use it, so other calls still send inline.
+            See start_background_sender().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
+
+    Returns:
+        The JSON response from the Umami batch API as a dict (with 'size',
+        'processed', and 'errors' counts), or an empty dict if nothing was
+        sent.
+
+    Raises:
+        OperationNotAllowedError: If neither set_url_base() nor
+            set_cloud_api_key() has been called.
+        ValidationError: If an item is not a dict, holds a key that is not
+            a new_event() argument (buffered and timeout apply to the whole
+            call, not to one item), or fails the same checks as new_event().
+        httpx.HTTPStatusError: If Umami returns a non-2xx response (only when
+            tracking is enabled).
+
+    Example:
+        ```python
+        import umami
+
+        umami.new_events([
+            {'event_name': 'signup', 'url': '/join'},
+            {'event_name': 'download', 'url': '/files', 'custom_data': {'file': 'guide.pdf'}},
+        ])
+        ```
+    """
+    bodies = _event_bodies(events)
+
+    # Early return if tracking is disabled
+    if not bodies or not tracking_enabled:
+        return {}
+
+    headers = _send_headers()
+    if _enqueue(bodies, headers, buffered):
+        return {}
+
+    return _deliver(bodies, headers, batch=True, timeout=timeout)
+
+
+# The new_event() arguments a new_events() item may hold; buffered and timeout apply to the whole call.
+_EVENT_FIELDS = frozenset(
+    (
+        'event_name',
+        'hostname',
+        'url',
+        'website_id',
+        'title',
+        'custom_data',
+        'referrer',
+        'language',
+        'screen',
+        'ip_address',
+        'distinct_id',
+    )
+)
 
-    resp = httpx.post(api_url, json=event_data, headers=headers, follow_redirects=True)
-    resp.raise_for_status()
 
-    return resp.json()
+def _event_bodies(events: Iterable[Dict[str, Any]]) -> list[dict]:
+    """
+    Internal use only. Validates every new_events() item and builds its /api/send body, leaving out sampled-out events.
+    """
+    bodies = []
+    for event in events:
+        if not isinstance(event, dict):
+            raise ValidationError('Each event must be a dict of new_event() arguments.')
+        unknown = event.keys() - _EVENT_FIELDS
+        if unknown:
+            raise ValidationError(f'Unknown new_event() arguments in an event: {", ".join(sorted(map(str, unknown)))}.')
+        if 'event_name' not in event:
+            raise ValidationError('The event_name is required.')
+        body = _event_body(**event)
+        if body is not None:
+            bodies.append(body)
+    return bodies
 
 
 async def new_revenue_event_async(
@@ -732,6 +3252,8 @@ async def new_revenue_event_async(
     screen: str = '1920x1080',
     ip_address: Optional[str] = None,
     distinct_id: Optional[Union[str, int]] = None,
+    buffered: bool = False,
+    timeout: Optional[float] = None,
 ) -> dict:
     """
     Create a new revenue event in Umami. This is a convenience wrapper around
@@ -768,6 +3290,14 @@ async def new_revenue_event_async(
         distinct_id: Optional Umami distinct ID for the user, as a string or
             integer, sent to the API as the payload field 'id'. Blank or
             whitespace-only values are ignored (no id is sent).
+        buffered: If True, queue the event on this event loop's batcher and
+            return an empty dict immediately; the batcher sends it together
+            with other buffered events in one /api/batch request. See
+            start_async_batcher() and flush_async().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
 
     Returns:
         The parsed JSON response from the Umami API as a dict, or an empty dict
@@ -819,6 +3349,8 @@ async def new_revenue_event_async(
         screen=screen,
         ip_address=ip_address,
         distinct_id=distinct_id,
+        buffered=buffered,
+        timeout=timeout,
     )
 
 
@@ -836,6 +3368,8 @@ def new_revenue_event(
     screen: str = '1920x1080',
     ip_address: Optional[str] = None,
     distinct_id: Optional[Union[str, int]] = None,
+    buffered: bool = False,
+    timeout: Optional[float] = None,
 ) -> dict:
     """
     Create a new revenue event in Umami. This is a convenience wrapper around
@@ -872,10 +3406,20 @@ def new_revenue_event(
         distinct_id: Optional Umami distinct ID for the user, as a string or
             integer, sent to the API as the payload field 'id'. Blank or
             whitespace-only values are ignored (no id is sent).
+        buffered: If True, queue the event for the background sender and
+            return an empty dict immediately. Without a running background
+            sender, a queue with its default settings sends the event; only
+            calls that pass buffered=True use it, so other calls still send
+            inline. See start_background_sender().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
 
     Returns:
         The parsed JSON response from the Umami API as a dict, or an empty dict
-        if tracking is disabled.
+        if tracking is disabled or the event was queued for the background
+        sender (see start_background_sender()).
 
     Raises:
         ValidationError: If revenue is not a number, revenue is negative,
@@ -923,6 +3467,8 @@ def new_revenue_event(
         screen=screen,
         ip_address=ip_address,
         distinct_id=distinct_id,
+        buffered=buffered,
+        timeout=timeout,
     )
 
 
@@ -937,6 +3483,8 @@ async def new_page_view_async(
     ua: str = event_user_agent,
     ip_address: Optional[str] = None,
     distinct_id: Optional[Union[str, int]] = None,
+    buffered: bool = False,
+    timeout: Optional[float] = None,
 ) -> dict:
     """
     Create a new page view event in Umami for the given website_id and hostname
@@ -969,6 +3517,14 @@ async def new_page_view_async(
         distinct_id: Optional Umami distinct ID for the user, as a string or
             integer, sent to the API as the payload field 'id'. Blank or
             whitespace-only values are ignored (no id is sent).
+        buffered: If True, queue the event on this event loop's batcher and
+            return an empty dict immediately; the batcher sends it together
+            with other buffered events in one /api/batch request. See
+            start_async_batcher() and flush_async().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
 
     Returns:
         The JSON response from the Umami API as a dict, or an empty dict if
@@ -993,43 +3549,27 @@ async def new_page_view_async(
         await umami.new_page_view_async(page_title='Home', url='/')
         ```
     """
-    validate_state(url=True, user=False)
-    website_id = website_id or default_website_id
-    hostname = hostname or default_hostname
-    normalized_distinct_id = normalize_distinct_id(distinct_id)
-
-    validate_event_data(event_name='NOT NEEDED', hostname=hostname, website_id=website_id)
+    event_data = _page_view_body(
+        page_title,
+        url,
+        hostname=hostname,
+        website_id=website_id,
+        referrer=referrer,
+        language=language,
+        screen=screen,
+        ip_address=ip_address,
+        distinct_id=distinct_id,
+    )
 
-    # Early return if tracking is disabled
-    if not tracking_enabled:
+    # Early return if tracking is disabled or the event was sampled out
+    if event_data is None or not tracking_enabled:
         return {}
 
-    api_url = _send_url()
     headers = _send_headers(ua=ua)
+    if _enqueue_async([event_data], headers, buffered):
+        return {}
 
-    payload = {
-        'hostname': hostname,
-        'language': language,
-        'referrer': referrer,
-        'screen': screen,
-        'title': page_title,
-        'url': url,
-        'website': website_id,
-    }
-
-    if ip_address and ip_address.strip():
-        payload['ip'] = ip_address
-
-    if normalized_distinct_id:
-        payload['id'] = normalized_distinct_id
-
-    event_data = {'payload': payload, 'type': 'event'}
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(api_url, json=event_data, headers=headers, follow_redirects=True)
-        resp.raise_for_status()
-
-    return resp.json()
+    return await _deliver_async([event_data], headers, timeout=timeout)
 
 
 def new_page_view(
@@ -1043,6 +3583,8 @@ def new_page_view(
     ua: str = event_user_agent,
     ip_address: Optional[str] = None,
     distinct_id: Optional[Union[str, int]] = None,
+    buffered: bool = False,
+    timeout: Optional[float] = None,
 ) -> dict:
     """
     Create a new page view event in Umami for the given website_id and hostname
@@ -1075,10 +3617,20 @@ def new_page_view(
         distinct_id: Optional Umami distinct ID for the user, as a string or
             integer, sent to the API as the payload field 'id'. Blank or
             whitespace-only values are ignored (no id is sent).
+        buffered: If True, queue the event for the background sender and
+            return an empty dict immediately. Without a running background
+            sender, a queue with its default settings sends the event; only
+            calls that pass buffered=True use it, so other calls still send
+            inline. See start_background_sender().
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values). Not used for buffered events.
 
     Returns:
         The JSON response from the Umami API as a dict, or an empty dict if
-        tracking is disabled.
+        tracking is disabled or the event was queued for the background sender
+        (see start_background_sender()).
 
     Raises:
         OperationNotAllowedError: If neither set_url_base() nor
@@ -1099,42 +3651,27 @@ def new_page_view(
         umami.new_page_view(page_title='Home', url='/')
         ```
     """
-    validate_state(url=True, user=False)
-    website_id = website_id or default_website_id
-    hostname = hostname or default_hostname
-    normalized_distinct_id = normalize_distinct_id(distinct_id)
-
-    validate_event_data(event_name='NOT NEEDED', hostname=hostname, website_id=website_id)
+    event_data = _page_view_body(
+        page_title,
+        url,
+        hostname=hostname,
+        website_id=website_id,
+        referrer=referrer,
+        language=language,
+        screen=screen,
+        ip_address=ip_address,
+        distinct_id=distinct_id,
+    )
 
-    # Early return if tracking is disabled
-    if not tracking_enabled:
+    # Early return if tracking is disabled or the event was sampled out
+    if event_data is None or not tracking_enabled:
         return {}
 
-    api_url = _send_url()
     headers = _send_headers(ua=ua)
+    if _enqueue([event_data], headers, buffered):
+        return {}
 
-    payload = {
-        'hostname': hostname,
-        'language': language,
-        'referrer': referrer,
-        'screen': screen,
-        'title': page_title,
-        'url': url,
-        'website': website_id,
-    }
-
-    if ip_address and ip_address.strip():
-        payload['ip'] = ip_address
-
-    if normalized_distinct_id:
-        payload['id'] = normalized_distinct_id
-
-    event_data = {'payload': payload, 'type': 'event'}
-
-    resp = httpx.post(api_url, json=event_data, headers=headers, follow_redirects=True)
-    resp.raise_for_status()
-
-    return resp.json()
+    return _deliver([event_data], headers, timeout=timeout)
 
 
 def validate_event_data(event_name: str, hostname: Optional[str], website_id: Optional[str]):
@@ -1149,7 +3686,7 @@ def validate_event_data(event_name: str, hostname: Optional[str], website_id: Op
         raise ValidationError('The event_name is required.')
 
 
-async def verify_token_async(check_server: bool = True) -> bool:
+async def verify_token_async(check_server: bool = True, timeout: Optional[float] = None) -> bool:
     """
     Verify that the currently stored credential is still valid.
 
@@ -1167,6 +3704,10 @@ async def verify_token_async(check_server: bool = True) -> bool:
             credential is valid — self-hosted posts to /api/auth/verify, while
             Cloud mode fetches /api/me. If False, perform only a local check
             (equivalent to is_logged_in()) with no network request.
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         True if the credential is valid (or, when check_server is False, simply
@@ -1182,28 +3723,23 @@ async def verify_token_async(check_server: bool = True) -> bool:
 
         if _is_cloud():
             url = _data_url(urls.me)
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url, headers=_data_headers(), follow_redirects=True)
-                resp.raise_for_status()
-            body = resp.json()
+            resp = await _http_get_async(url, headers=_data_headers(), timeout=timeout)
+            resp.raise_for_status()
+            body = _json(resp)
             # /api/me nests username under 'user'; the 'username' check is a defensive fallback.
             return 'user' in body or 'username' in body
 
-        url = f'{url_base}{urls.verify}'
-        headers = {
-            'User-Agent': event_user_agent,
-            'Authorization': f'Bearer {auth_token}',
-        }
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, headers=headers, follow_redirects=True)
-            resp.raise_for_status()
+        url = _data_url(urls.verify)
+        headers = _send_headers()
+        resp = await _http_post_async(url, headers=headers, timeout=timeout)
+        resp.raise_for_status()
 
-        return 'username' in resp.json()
+        return 'username' in _json(resp)
     except Exception:
         return False
 
 
-def verify_token(check_server: bool = True) -> bool:
+def verify_token(check_server: bool = True, timeout: Optional[float] = None) -> bool:
     """
     Verify that the currently stored credential is still valid.
 
@@ -1221,6 +3757,10 @@ def verify_token(check_server: bool = True) -> bool:
             credential is valid — self-hosted posts to /api/auth/verify, while
             Cloud mode fetches /api/me. If False, perform only a local check
             (equivalent to is_logged_in()) with no network request.
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         True if the credential is valid (or, when check_server is False, simply
@@ -1236,26 +3776,23 @@ def verify_token(check_server: bool = True) -> bool:
 
         if _is_cloud():
             url = _data_url(urls.me)
-            resp = httpx.get(url, headers=_data_headers(), follow_redirects=True)
+            resp = _http_get(url, headers=_data_headers(), timeout=timeout)
             resp.raise_for_status()
-            body = resp.json()
+            body = _json(resp)
             # /api/me nests username under 'user'; the 'username' check is a defensive fallback.
             return 'user' in body or 'username' in body
 
-        url = f'{url_base}{urls.verify}'
-        headers = {
-            'User-Agent': event_user_agent,
-            'Authorization': f'Bearer {auth_token}',
-        }
-        resp = httpx.post(url, headers=headers, follow_redirects=True)
+        url = _data_url(urls.verify)
+        headers = _send_headers()
+        resp = _http_post(url, headers=headers, timeout=timeout)
         resp.raise_for_status()
 
-        return 'username' in resp.json()
+        return 'username' in _json(resp)
     except Exception:
         return False
 
 
-async def heartbeat_async() -> bool:
+async def heartbeat_async(timeout: Optional[float] = None) -> bool:
     """
     Check whether the configured Umami server is reachable and healthy.
 
@@ -1269,6 +3806,12 @@ async def heartbeat_async() -> bool:
     raises: any failure (missing configuration, connection error, or a non-2xx
     response) is caught and reported as False.
 
+    Args:
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
+
     Returns:
         True if the server is reachable and responded successfully; False on
         any error, including when no url_base or Cloud API key has been
@@ -1291,25 +3834,23 @@ async def heartbeat_async() -> bool:
         if _is_cloud():
             # Cloud has no /api/heartbeat; use the authenticated /me endpoint as a liveness check.
             url = _data_url(urls.me)
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url, headers=_data_headers(), follow_redirects=True)
-                resp.raise_for_status()
+            resp = await _http_get_async(url, headers=_data_headers(), timeout=timeout)
+            resp.raise_for_status()
             return True
 
-        url = f'{url_base}{urls.heartbeat}'
+        url = _data_url(urls.heartbeat)
         headers = {
             'User-Agent': user_agent,
         }
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, headers=headers, follow_redirects=True)
-            resp.raise_for_status()
+        resp = await _http_get_async(url, headers=headers, timeout=timeout)
+        resp.raise_for_status()
 
         return True
     except Exception:
         return False
 
 
-def heartbeat() -> bool:
+def heartbeat(timeout: Optional[float] = None) -> bool:
     """
     Check whether the configured Umami server is reachable and healthy.
 
@@ -1323,6 +3864,12 @@ def heartbeat() -> bool:
     raises: any failure (missing configuration, connection error, or a non-2xx
     response) is caught and reported as False.
 
+    Args:
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
+
     Returns:
         True if the server is reachable and responded successfully; False on
         any error, including when no url_base or Cloud API key has been
@@ -1345,15 +3892,15 @@ def heartbeat() -> bool:
         if _is_cloud():
             # Cloud has no /api/heartbeat; use the authenticated /me endpoint as a liveness check.
             url = _data_url(urls.me)
-            resp = httpx.get(url, headers=_data_headers(), follow_redirects=True)
+            resp = _http_get(url, headers=_data_headers(), timeout=timeout)
             resp.raise_for_status()
             return True
 
-        url = f'{url_base}{urls.heartbeat}'
+        url = _data_url(urls.heartbeat)
         headers = {
             'User-Agent': user_agent,
         }
-        resp = httpx.get(url, headers=headers, follow_redirects=True)
+        resp = _http_get(url, headers=headers, timeout=timeout)
         resp.raise_for_status()
 
         return True
@@ -1371,7 +3918,7 @@ def validate_login(email: str, password: str) -> None:
         raise ValidationError('Password cannot be empty')
 
 
-async def active_users_async(website_id: Optional[str] = None) -> int:
+async def active_users_async(website_id: Optional[str] = None, timeout: Optional[float] = None) -> int:
     """
     Retrieves the number of currently-active visitors for a specific website.
 
@@ -1381,6 +3928,10 @@ async def active_users_async(website_id: Optional[str] = None) -> int:
     Args:
         website_id: OPTIONAL: The value of your website_id in Umami (overrides
             the set_website_id() value).
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         The count of visitors currently active on the website.
@@ -1393,20 +3944,19 @@ async def active_users_async(website_id: Optional[str] = None) -> int:
     """
     validate_state(url=True, user=True)
 
-    website_id = website_id or default_website_id
+    website_id = _website_id(website_id)
 
     url = _data_url(urls.websites, f'/{website_id}/active')
     headers = _data_headers()
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers, follow_redirects=True)
-        resp.raise_for_status()
+    resp = await _http_get_async(url, headers=headers, timeout=timeout)
+    resp.raise_for_status()
 
-    data = resp.json()
+    data = _json(resp)
     return int(data.get('visitors', data.get('x', 0)))
 
 
-def active_users(website_id: Optional[str] = None) -> int:
+def active_users(website_id: Optional[str] = None, timeout: Optional[float] = None) -> int:
     """
     Retrieves the number of currently-active visitors for a specific website.
 
@@ -1416,6 +3966,10 @@ def active_users(website_id: Optional[str] = None) -> int:
     Args:
         website_id: OPTIONAL: The value of your website_id in Umami (overrides
             the set_website_id() value).
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         The count of visitors currently active on the website.
@@ -1428,15 +3982,15 @@ def active_users(website_id: Optional[str] = None) -> int:
     """
     validate_state(url=True, user=True)
 
-    website_id = website_id or default_website_id
+    website_id = _website_id(website_id)
 
     url = _data_url(urls.websites, f'/{website_id}/active')
     headers = _data_headers()
 
-    resp = httpx.get(url, headers=headers, follow_redirects=True)
+    resp = _http_get(url, headers=headers, timeout=timeout)
     resp.raise_for_status()
 
-    data = resp.json()
+    data = _json(resp)
     return int(data.get('visitors', data.get('x', 0)))
 
 
@@ -1456,6 +4010,7 @@ async def website_stats_async(
     country: Optional[str] = None,
     region: Optional[str] = None,
     city: Optional[str] = None,
+    timeout: Optional[float] = None,
 ) -> models.WebsiteStats:
     """
     Retrieves the statistics for a specific website over a date range.
@@ -1481,6 +4036,10 @@ async def website_stats_async(
         country: OPTIONAL: Filter by country.
         region: OPTIONAL: Filter by region/state/province.
         city: OPTIONAL: Filter by city.
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         A models.WebsiteStats with the aggregated pageviews, visitors, visits,
@@ -1508,7 +4067,7 @@ async def website_stats_async(
     """
     validate_state(url=True, user=True)
 
-    website_id = website_id or default_website_id
+    website_id = _website_id(website_id)
 
     api_url = _data_url(urls.websites, f'/{website_id}/stats')
 
@@ -1533,11 +4092,10 @@ async def website_stats_async(
     }
     params.update({k: v for k, v in optional_params.items() if v is not None})
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(api_url, headers=headers, params=params, follow_redirects=True)
-        resp.raise_for_status()
+    resp = await _http_get_async(api_url, headers=headers, params=params, timeout=timeout)
+    resp.raise_for_status()
 
-    return models.WebsiteStats(**resp.json())
+    return _parse(resp, models.WebsiteStats)
 
 
 def website_stats(
@@ -1556,6 +4114,7 @@ def website_stats(
     country: Optional[str] = None,
     region: Optional[str] = None,
     city: Optional[str] = None,
+    timeout: Optional[float] = None,
 ) -> models.WebsiteStats:
     """
     Retrieves the statistics for a specific website over a date range.
@@ -1581,6 +4140,10 @@ def website_stats(
         country: OPTIONAL: Filter by country.
         region: OPTIONAL: Filter by region/state/province.
         city: OPTIONAL: Filter by city.
+        timeout: Maximum seconds this call may wait on Umami, across all
+            attempts when retries are on (see set_retry_policy()).
+            Overrides set_timeouts() for this call. Defaults to None (use
+            the set_timeouts() values).
 
     Returns:
         A models.WebsiteStats with the aggregated pageviews, visitors, visits,
@@ -1608,7 +4171,7 @@ def website_stats(
     """
     validate_state(url=True, user=True)
 
-    website_id = website_id or default_website_id
+    website_id = _website_id(website_id)
 
     api_url = _data_url(urls.websites, f'/{website_id}/stats')
 
@@ -1633,18 +4196,19 @@ def website_stats(
     }
     params.update({k: v for k, v in optional_params.items() if v is not None})
 
-    resp = httpx.get(api_url, headers=headers, params=params, follow_redirects=True)
+    resp = _http_get(api_url, headers=headers, params=params, timeout=timeout)
     resp.raise_for_status()
 
-    return models.WebsiteStats(**resp.json())
+    return _parse(resp, models.WebsiteStats)
 
 
 def validate_state(url: bool = False, user: bool = False):
     """
     Internal helper function, not need to use this.
     """
-    if url and not url_base and not _is_cloud():
+    config = _config()
+    if url and not config.url_base and not config.is_cloud:
         raise OperationNotAllowedError('Set a URL base with set_url_base() or call set_cloud_api_key().')
 
-    if user and not auth_token and not _is_cloud():
+    if user and not config.auth_token and not config.is_cloud:
         raise OperationNotAllowedError('Call login() or set_cloud_api_key() before proceeding.')
@@ -0,0 +1,360 @@
+"""
+Fire-and-forget delivery of events off the caller's path.
+
+Internal module. BackgroundSender serves the sync API: while it runs (see
+umami.start_background_sender()), the sync send functions build and validate
+their payload as usual, enqueue it here, and return immediately; one daemon
+worker thread performs the HTTP calls. AsyncBatcher is its asyncio-native
+counterpart for buffered *_async sends: a task on the application's own event
+loop that gathers events into /api/batch requests, with no extra thread.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from umami.impl.buffer import EventBuffer
+
+log = logging.getLogger('umami')
+
+# A queued request: (json body, headers), exactly what the sync send path would have posted.
+Item = tuple[dict, dict]
+
+_STOP = object()  # sentinel that tells the worker to exit once everything before it is sent
+_FLUSH = object()  # sentinel that tells the async batcher to send its partial batch now
+
+
+def _group_by_headers(batch: list[Item]) -> list[tuple[dict, list[dict]]]:
+    """
+    Split a batch into one request per distinct set of headers, in queue order.
+
+    A page view may carry its own User-Agent, and /api/batch applies a single
+    request's headers to every event in it, so those can't be merged.
+    """
+    groups: dict[tuple, tuple[dict, list[dict]]] = {}
+    for body, headers in batch:
+        groups.setdefault(tuple(sorted(headers.items())), (headers, []))[1].append(body)
+    return list(groups.values())
+
+
+class BackgroundSender:
+    """
+    A bounded queue of event requests drained by one daemon worker thread.
+
+    Internal. `send` is called on the worker thread with (bodies, headers): a
+    list of one or more /api/send bodies that share the same request headers.
+    With batch_size=1 every list has one body. With a larger batch_size the
+    worker gathers events until it has batch_size of them or flush_interval
+    seconds have passed since the first one, whichever comes first.
+
+    Any exception raised by `send` is logged and counted in `failed`, never
+    propagated to the caller that queued the event. The queue is an
+    EventBuffer holding at most max_queue_size events and, if max_bytes is
+    set, at most max_bytes of them by `sizeof` (their serialized size). When
+    it is full, the overflow policy decides (see EventBuffer); by default new
+    events are dropped. Lost events are counted in `dropped`, by reason in
+    `dropped_by_reason`, so a slow or unavailable Umami server can never grow
+    the caller's process without bound.
+
+    flush() sends the partial batch at once and lends the worker helper
+    threads until the queue is empty, for shutdown. `unsent` is the number
+    of queued events not yet sent (or failed).
+    """
+
+    def __init__(
+        self,
+        send: Callable[[list[dict], dict], Any],
+        max_queue_size: int = 10_000,
+        batch_size: int = 1,
+        flush_interval: float = 1.0,
+        max_bytes: Optional[int] = None,
+        overflow: str = 'drop_newest',
+        block_timeout: float = 1.0,
+        sizeof: Optional[Callable[[dict], int]] = None,
+        spill: Optional[Callable[[Item], bool]] = None,
+    ):
+        self._send = send
+        self._sizeof = sizeof
+        self._spill = spill
+        self._queue = EventBuffer(max_queue_size, max_bytes, overflow, block_timeout, spill)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._all_sent = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name='umami-background-sender', daemon=True)
+        self.sent = 0
+        self.failed = 0
+        self.unsent = 0
+
+    @property
+    def dropped(self) -> int:
+        return sum(self._queue.dropped.values())
+
+    @property
+    def dropped_by_reason(self) -> dict[str, int]:
+        return dict(self._queue.dropped)
+
+    @property
+    def buffer(self) -> EventBuffer:
+        return self._queue
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def respawn(self) -> 'BackgroundSender':
+        """A new, unstarted sender with the same settings and an empty queue (for a forked child)."""
+        buffer = self._queue
+        return BackgroundSender(
+            self._send,
+            buffer.max_items,
+            self._batch_size,
+            self._flush_interval,
+            buffer.max_bytes,
+            buffer.overflow,
+            buffer.block_timeout,
+            self._sizeof,
+            self._spill,
+        )
+
+    def submit(self, body: dict, headers: dict) -> bool:
+        """
+        Queue one request. Returns False if the overflow policy dropped or spilled it instead.
+
+        Never blocks, except under the 'block' policy while the queue is full.
+        """
+        size = self._sizeof(body) if self._sizeof is not None else 0
+        with self._lock:
+            self.unsent += 1  # before the worker can see it, so unsent never undercounts
+        queued, evicted = self._queue.put((body, headers), size)
+        lost = evicted + (not queued)
+        if lost:
+            with self._all_sent:
+                self.unsent -= lost
+                if not self.unsent:
+                    self._all_sent.notify_all()
+        return queued
+
+    def flush(self, timeout: Optional[float] = None, workers: int = 4) -> int:
+        """
+        Send everything queued so far now, with up to `workers` extra threads helping the worker.
+
+        Waits up to `timeout` seconds (forever if None). Returns how many
+        queued events were still unsent when it returned; helper threads
+        still sending then are daemons and never delay process exit.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._queue.put_control(_FLUSH)  # stop the worker waiting for its partial batch to fill
+        helpers = min(workers, -(-self._queue.qsize() // self._batch_size))
+        for n in range(helpers):
+            threading.Thread(target=self._help, name=f'umami-flush-{n}', daemon=True).start()
+
+        with self._all_sent:
+            while self.unsent:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._all_sent.wait(remaining)
+            return self.unsent
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop the worker after it sends everything already queued.
+
+        Waits up to `timeout` seconds (forever if None). Returns True if the
+        worker finished in time; False means events may still be in flight.
+        """
+        self._queue.put_control(_STOP)
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if item is _FLUSH:
+                continue
+
+            batch, stopping = self._fill_batch(item)
+            self._deliver(batch)
+            if stopping:
+                return
+
+    def _fill_batch(self, first: Item) -> tuple[list[Item], bool]:
+        """Gather up to batch_size items, waiting at most flush_interval after `first`."""
+        batch = [first]
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            if item is _FLUSH:
+                break
+            batch.append(item)
+
+        return batch, False
+
+    def _help(self) -> None:
+        """Run by flush() helper threads: send queued batches until the queue is empty or a sentinel is reached."""
+        while True:
+            batch: list[Item] = []
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP or item is _FLUSH:
+                    self._queue.put_control(item)  # leave sentinels for the worker, and stop helping
+                    self._deliver(batch)
+                    return
+                batch.append(item)
+            if not batch:
+                return
+            self._deliver(batch)
+
+    def _deliver(self, batch: list[Item]) -> None:
+        for headers, bodies in _group_by_headers(batch):
+            # noinspection PyBroadException
+            try:
+                self._send(bodies, headers)
+                ok = True
+            except Exception:
+                ok = False
+                log.warning('umami: background send of %d event(s) failed.', len(bodies), exc_info=True)
+            with self._all_sent:
+                if ok:
+                    self.sent += len(bodies)
+                else:
+                    self.failed += len(bodies)
+                self.unsent -= len(bodies)
+                if not self.unsent:
+                    self._all_sent.notify_all()
+
+
+class AsyncBatcher:
+    """
+    A bounded asyncio queue of event requests drained by a task on one event loop.
+
+    Internal. `send` is awaited with (bodies, headers) exactly as
+    BackgroundSender calls its `send`. The task gathers events until it has
+    batch_size of them or flush_interval seconds have passed since the first
+    one. submit() never waits: it queues the event (starting the task if
+    needed) and returns, dropping the event and counting it in `dropped` if
+    the queue is full. flush() sends the partial batch at once and waits until
+    everything queued so far has been handed to `send`.
+
+    When the loop cancels the task at shutdown (asyncio.run() does this), the
+    task sends whatever is still buffered before it exits.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[list[dict], dict], Awaitable[Any]],
+        max_queue_size: int = 10_000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        on_exit: Optional[Callable[[], Any]] = None,
+    ):
+        self._send = send
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._on_exit = on_exit
+        self._task: Optional[asyncio.Task] = None
+        self._pending: list[Item] = []  # taken off the queue but not yet delivered
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, body: dict, headers: dict) -> bool:
+        """Queue one request without waiting. Returns False (and counts it) if the queue is full."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name='umami-async-batcher')
+        try:
+            self._queue.put_nowait((body, headers))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def flush(self) -> None:
+        """Send the partial batch now and wait until every event queued so far is sent (or has failed)."""
+        if self._task is None or self._task.done():
+            return
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except asyncio.QueueFull:
+            pass  # a full queue fills the current batch anyway
+        await self._queue.join()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _FLUSH:
+                    self._queue.task_done()
+                    continue
+                self._pending = [item]
+                await self._fill_batch()
+                await self._deliver_pending()
+        except asyncio.CancelledError:
+            # The loop is shutting down: send what is still buffered, then let the cancellation finish.
+            # A batch that was being sent when the task was cancelled is not sent again.
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _FLUSH:
+                    self._queue.task_done()
+                else:
+                    self._pending.append(item)
+            await self._deliver_pending()
+            raise
+        finally:
+            if self._on_exit is not None:
+                self._on_exit()
+
+    async def _fill_batch(self) -> None:
+        """Gather up to batch_size items into _pending, waiting at most flush_interval after the first."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        while len(self._pending) < self._batch_size:
+            remaining = deadline - loop.time()
+            try:
+                if remaining > 0:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                return
+            if item is _FLUSH:
+                self._queue.task_done()
+                return
+            self._pending.append(item)
+
+    async def _deliver_pending(self) -> None:
+        """Deliver _pending, taking it over first so a cancellation mid-send can't deliver it again."""
+        batch, self._pending = self._pending, []
+        try:
+            await self._deliver(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _deliver(self, batch: list[Item]) -> None:
+        for headers, bodies in _group_by_headers(batch):
+            # noinspection PyBroadException
+            try:
+                await self._send(bodies, headers)
+                self.sent += len(bodies)
+            except Exception:
+                self.failed += len(bodies)
+                log.warning('umami: buffered send of %d event(s) failed.', len(bodies), exc_info=True)
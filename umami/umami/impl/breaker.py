@@ -0,0 +1,158 @@
+"""
+Circuit breaker for traffic to Umami's ingestion endpoints.
+
+Internal module. The public switches are umami.set_circuit_breaker() and
+umami.clear_circuit_breaker(). The breaker wraps every /api/send and
+/api/batch request, whether sent inline, from the background sender, or
+from the async batcher; query functions are not affected.
+
+    closed     Requests flow. failure_threshold consecutive failures open it.
+    open       Requests fail fast. After reset_timeout seconds a timer thread
+               calls the probe (heartbeat()); when it succeeds the breaker
+               goes half-open, otherwise the probe is tried again later.
+    half_open  One trial request is let through. Success closes the breaker;
+               failure opens it again. A trial that ends without a verdict
+               (the send was cancelled) is released, and one that has not
+               finished after reset_timeout seconds no longer blocks the next.
+
+The probe runs on its own thread, so no caller ever waits on it.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+log = logging.getLogger('umami')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Internal. See the module docstring for the state machine.
+
+    `probe` returns True when the server looks healthy again; with no probe
+    the breaker goes half-open as soon as reset_timeout has passed.
+    `on_state_change` is called with (old_state, new_state) after every
+    transition, outside the breaker's lock; exceptions it raises are logged.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        probe: Optional[Callable[[], bool]] = None,
+        on_state_change: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._probe = probe
+        self._on_state_change = on_state_change
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now. In half-open state only one trial request is allowed."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN:
+                now = time.monotonic()
+                if not self._trial_in_flight or now - self._trial_started >= self.reset_timeout:
+                    self._trial_in_flight = True
+                    self._trial_started = now
+                    return True
+            return False
+
+    def release_trial(self) -> None:
+        """Give up the half-open trial without a verdict, e.g. because its send was cancelled."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            change = self._set_state(CLOSED)
+        self._notify(change)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            change = None
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                change = self._set_state(OPEN)
+                self._schedule_probe()
+        self._notify(change)
+
+    def after_fork(self) -> None:
+        """
+        Make the breaker usable in a forked child: new lock, and a new probe timer if open.
+
+        The child keeps the parent's state, since it talks to the same server.
+        """
+        self._lock = threading.Lock()
+        self._trial_in_flight = False
+        self._timer = None
+        if self._state == OPEN:
+            self._schedule_probe()
+
+    def close(self) -> None:
+        """Cancel any pending probe; the breaker does nothing further."""
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+
+    def _set_state(self, state: str) -> Optional[tuple[str, str]]:
+        """Change state (lock held). Returns (old, new) if it changed, for _notify()."""
+        old, self._state = self._state, state
+        self._trial_in_flight = False
+        return (old, state) if old != state else None
+
+    def _schedule_probe(self) -> None:
+        if self._closed:
+            return
+        self._timer = threading.Timer(self.reset_timeout, self._run_probe)
+        self._timer.name = 'umami-circuit-probe'
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run_probe(self) -> None:
+        healthy = True
+        if self._probe is not None:
+            # noinspection PyBroadException
+            try:
+                healthy = bool(self._probe())
+            except Exception:
+                healthy = False
+
+        with self._lock:
+            if self._state != OPEN:
+                return
+            if not healthy:
+                self._schedule_probe()
+                return
+            change = self._set_state(HALF_OPEN)
+        self._notify(change)
+
+    def _notify(self, change: Optional[tuple[str, str]]) -> None:
+        if change is None or self._on_state_change is None:
+            return
+        # noinspection PyBroadException
+        try:
+            self._on_state_change(*change)
+        except Exception:
+            log.warning('umami: circuit breaker state callback failed.', exc_info=True)
@@ -0,0 +1,193 @@
+"""
+The in-memory buffer between the sync send functions and the background worker.
+
+Internal module. The public switches are the max_buffer_bytes, overflow and
+block_timeout arguments of umami.start_background_sender(). EventBuffer is a
+FIFO bounded by event count and, optionally, by the total size of the
+events' serialized JSON, so memory stays predictable during an outage even
+when event sizes vary widely. What happens to an event that doesn't fit is
+the overflow policy; every event that is lost is counted by reason.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+log = logging.getLogger('umami')
+
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block', 'spill')
+
+# Reasons an event is dropped, the keys of EventBuffer.dropped.
+FULL = 'full'  # drop_newest: no room for the new event
+EVICTED = 'evicted'  # drop_oldest: pushed out by a newer event
+BLOCK_TIMEOUT = 'block_timeout'  # block: no room before block_timeout
+TOO_LARGE = 'too_large'  # bigger than max_bytes on its own
+SPILL_FAILED = 'spill_failed'  # spill: no spool to write to, or the spool is full
+
+
+class EventBuffer:
+    """
+    A thread-safe FIFO bounded by item count and, optionally, total bytes.
+
+    Internal. put() takes an item and its serialized size and applies the
+    overflow policy when it doesn't fit:
+
+    - 'drop_newest' drops the new item.
+    - 'drop_oldest' drops the oldest items until the new one fits.
+    - 'block' waits up to block_timeout seconds for the consumer to make
+      room, then drops the new item.
+    - 'spill' hands the new item to `spill` (which writes it to disk and
+      returns True, or False if it could not).
+
+    An item larger than max_bytes on its own never fits; it is spilled under
+    'spill' and dropped otherwise. Lost items are counted by reason in
+    `dropped` (see the reason constants in this module) and their bytes in
+    `dropped_bytes`; spilled ones in `spilled`. The first loss of an
+    overflow episode is logged; the episode ends once the consumer has
+    drained the buffer to half its bounds, so a consumer that is slow but
+    still draining does not log a warning for every slot it frees.
+
+    Control items (put_control()) such as the worker's sentinels ignore the
+    bounds, are never dropped, and don't count toward qsize().
+    """
+
+    def __init__(
+        self,
+        max_items: int,
+        max_bytes: Optional[int] = None,
+        overflow: str = 'drop_newest',
+        block_timeout: float = 1.0,
+        spill: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._spill = spill
+        self._items: deque = deque()  # (item, size); size is None for control items
+        self._count = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._overflowing = False
+        self.dropped: dict[str, int] = {}
+        self.dropped_bytes = 0
+        self.spilled = 0
+
+    def qsize(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Total serialized size of the items in the buffer."""
+        return self._bytes
+
+    def put(self, item: Any, size: int = 0) -> tuple[bool, int]:
+        """
+        Add an item of `size` bytes, applying the overflow policy if it doesn't fit.
+
+        Returns (queued, evicted): whether the item is now in the buffer, and
+        how many older items were dropped to make room for it.
+        """
+        evicted = 0
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                reason: Optional[str] = TOO_LARGE
+            elif self._fits(size):
+                reason = None
+            elif self.overflow == 'drop_oldest':
+                while not self._fits(size):
+                    self._evict_oldest()
+                    evicted += 1
+                reason = None
+            elif self.overflow == 'block':
+                deadline = time.monotonic() + self.block_timeout
+                while not self._fits(size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._not_full.wait(remaining)
+                reason = None if self._fits(size) else BLOCK_TIMEOUT
+            else:
+                reason = FULL
+
+            if reason is None:
+                self._items.append((item, size))
+                self._count += 1
+                self._bytes += size
+                self._not_empty.notify()
+                return True, evicted
+
+        if self.overflow == 'spill' and self._spill is not None and self._spill(item):
+            with self._lock:
+                self.spilled += 1
+            return False, 0
+        with self._lock:
+            self._record_drop(reason if reason == TOO_LARGE or self.overflow != 'spill' else SPILL_FAILED, size)
+        return False, 0
+
+    def put_control(self, item: Any) -> None:
+        """Add a control item; it is always accepted."""
+        with self._lock:
+            self._items.append((item, None))
+            self._not_empty.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Remove and return the oldest item, waiting up to `timeout` seconds (forever if None) for one."""
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return self._pop()
+
+    def get_nowait(self) -> Any:
+        with self._lock:
+            if not self._items:
+                raise queue.Empty
+            return self._pop()
+
+    def _fits(self, size: int) -> bool:
+        if self._count >= self.max_items:
+            return False
+        return self.max_bytes is None or self._bytes + size <= self.max_bytes
+
+    def _pop(self) -> Any:
+        item, size = self._items.popleft()
+        if size is not None:
+            self._count -= 1
+            self._bytes -= size
+            self._not_full.notify()
+            if self._overflowing and self._below_low_water():
+                self._overflowing = False
+        return item
+
+    def _below_low_water(self) -> bool:
+        """Whether the buffer has drained to half its bounds, which ends an overflow episode."""
+        if self._count > self.max_items // 2:
+            return False
+        return self.max_bytes is None or self._bytes <= self.max_bytes // 2
+
+    def _evict_oldest(self) -> None:
+        for index, (_, size) in enumerate(self._items):
+            if size is not None:
+                del self._items[index]
+                self._count -= 1
+                self._bytes -= size
+                self._record_drop(EVICTED, size)
+                return
+
+    def _record_drop(self, reason: str, size: int) -> None:
+        """Count a lost item (the lock is held)."""
+        self.dropped[reason] = self.dropped.get(reason, 0) + 1
+        self.dropped_bytes += size
+        if not self._overflowing:
+            self._overflowing = True
+            log.warning(
+                'umami: dropping events from the background send buffer (%s; it holds %d events, %d bytes).',
+                reason,
+                self._count,
+                self._bytes,
+            )
@@ -0,0 +1,247 @@
+"""
+umami.Client and umami.AsyncClient: the SDK's functions bound to settings of their own.
+
+The module-level functions share one process-wide configuration, set with
+set_url_base(), login(), set_cloud_api_key(), set_website_id() and
+set_hostname(). A client instead holds an immutable Config snapshot, with its
+URLs and headers built once, and its own connection pool, so any number of
+them can be used side by side, from any threads or tasks, without touching
+the globals or each other. Each method runs the module-level function of the
+same name with the client's settings and pool in effect for that call.
+"""
+
+import abc
+import dataclasses
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Optional
+
+import httpx2 as httpx
+
+from umami import impl
+from umami.errors import ValidationError
+from umami.impl.config import Config
+
+__all__ = ['Client', 'AsyncClient']
+
+
+class _BaseClient(abc.ABC):
+    """Settings handling shared by Client and AsyncClient."""
+
+    __slots__ = ('_config', '_pool', '_lock', '__weakref__')
+
+    def __init__(
+        self,
+        url_base: Optional[str] = None,
+        *,
+        auth_token: Optional[str] = None,
+        api_key: Optional[str] = None,
+        cloud_region: Optional[str] = None,
+        website_id: Optional[str] = None,
+        hostname: Optional[str] = None,
+    ):
+        if (url_base is None) == (api_key is None):
+            raise ValidationError('Give exactly one of url_base (self-hosted) or api_key (Umami Cloud).')
+        if url_base is not None:
+            url_base = impl._clean_url_base(url_base)
+            if cloud_region is not None:
+                raise ValidationError('cloud_region only applies with api_key (Umami Cloud).')
+        else:
+            api_key = impl._clean_api_key(api_key, cloud_region)  # type: ignore[arg-type]
+            if auth_token is not None:
+                raise ValidationError('auth_token only applies with url_base (self-hosted); Cloud uses api_key.')
+
+        self._config: Config = impl._make_config(url_base, auth_token, api_key, cloud_region, website_id, hostname)
+        self._pool: Any = None
+        self._lock = threading.Lock()
+        impl._clients.add(self)
+
+    @property
+    def config(self) -> Config:
+        """The client's current settings (immutable; login() swaps in a new snapshot with the token)."""
+        return self._config
+
+    def is_logged_in(self) -> bool:
+        """Whether this client holds a credential: a login token (self-hosted) or an API key (Cloud)."""
+        return self._config.auth_token is not None or self._config.api_key is not None
+
+    def _set_auth_token(self, token: Optional[str]) -> None:
+        self._config = dataclasses.replace(self._config, auth_token=token)
+
+    def _after_fork(self) -> None:
+        """In a forked child: forget the parent's pool (without closing its sockets) and lock."""
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Any:
+        pool = self._pool
+        if pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._new_pool()
+                pool = self._pool
+        return pool
+
+    @abc.abstractmethod
+    def _new_pool(self) -> Any:
+        """A new connection pool for this client: an httpx.Client or httpx.AsyncClient."""
+
+    def __repr__(self) -> str:
+        config = self._config
+        where = f'cloud_region={config.cloud_region!r}' if config.is_cloud else f'url_base={config.url_base!r}'
+        return f'{type(self).__name__}({where}, website_id={config.website_id!r})'
+
+
+def _with_self(function: Callable) -> inspect.Signature:
+    """The signature of `function` as a method, for help() and IDEs."""
+    signature = inspect.signature(function)
+    this = inspect.Parameter('self', inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    return signature.replace(parameters=[this, *signature.parameters.values()])
+
+
+def _sync_method(function: Callable) -> Callable:
+    @functools.wraps(function)
+    def method(self: 'Client', *args: Any, **kwargs: Any) -> Any:
+        token = impl._active_client.set(self)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            impl._active_client.reset(token)
+
+    method.__signature__ = _with_self(function)  # type: ignore[attr-defined]
+    return method
+
+
+def _async_method(function: Callable) -> Callable:
+    @functools.wraps(function)
+    async def method(self: 'AsyncClient', *args: Any, **kwargs: Any) -> Any:
+        token = impl._active_client.set(self)
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            impl._active_client.reset(token)
+
+    method.__signature__ = _with_self(function)  # type: ignore[attr-defined]
+    return method
+
+
+class Client(_BaseClient):
+    """
+    A synchronous Umami client with its own settings and connection pool.
+
+    Give either url_base (self-hosted, then call login() or pass auth_token)
+    or api_key (Umami Cloud). The settings are an immutable snapshot with
+    the request URLs and headers built once; the methods mirror the
+    module-level functions (new_event(), new_page_view(), website_stats(),
+    ...) with the same arguments, but use this client's settings and pool
+    instead of the process-wide ones. A multi-tenant service can keep one
+    warm client per tenant and share each across threads.
+
+    Process-wide policies still apply to every client: configure() pool
+    limits, set_timeouts(), set_retry_policy(), set_rate_limits(),
+    set_sampling(), set_json_codec(), set_compression(), set_dedup_window()
+    and enable()/disable(). Events are always sent on the calling thread:
+    the background sender, relay, spool and circuit breaker serve the
+    module-level configuration only, so `buffered` has no effect here.
+
+    Args:
+        url_base: Base URL of a self-hosted Umami instance, without '/api'.
+        auth_token: A login token from an earlier login(), for self-hosted.
+        api_key: An Umami Cloud API key, instead of url_base.
+        cloud_region: Optional 'us' or 'eu' for Umami Cloud.
+        website_id: Default website for events and stats.
+        hostname: Default hostname for events and page views.
+
+    Raises:
+        ValidationError: If not exactly one of url_base and api_key is given,
+            either is invalid, or cloud_region or auth_token is given for the
+            other mode.
+
+    Example:
+        ```python
+        import umami
+
+        with umami.Client('https://umami.example.com', website_id=site_id, hostname='example.com') as client:
+            client.login(username, password)
+            client.new_event(event_name='signup', url='/welcome')
+        ```
+    """
+
+    __slots__ = ()
+
+    login = _sync_method(impl.login)
+    verify_token = _sync_method(impl.verify_token)
+    heartbeat = _sync_method(impl.heartbeat)
+    websites = _sync_method(impl.websites)
+    website_stats = _sync_method(impl.website_stats)
+    active_users = _sync_method(impl.active_users)
+    new_event = _sync_method(impl.new_event)
+    new_events = _sync_method(impl.new_events)
+    new_revenue_event = _sync_method(impl.new_revenue_event)
+    new_page_view = _sync_method(impl.new_page_view)
+
+    def _new_pool(self) -> httpx.Client:
+        return impl._new_client()
+
+    def close(self) -> None:
+        """Close the client's connection pool. The client reopens one if it is used again."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class AsyncClient(_BaseClient):
+    """
+    The asyncio counterpart of umami.Client: its own settings and pooled httpx.AsyncClient.
+
+    The methods are coroutines named after the sync functions (await
+    client.new_event(...) runs umami.new_event_async() with this client's
+    settings and pool). Use an AsyncClient from one event loop, like any
+    httpx.AsyncClient, and close it with aclose() or `async with`. See
+    umami.Client for the arguments and which process-wide settings apply.
+
+    Example:
+        ```python
+        import umami
+
+        async with umami.AsyncClient(api_key=key, website_id=site_id, hostname='example.com') as client:
+            await client.new_event(event_name='signup', url='/welcome')
+        ```
+    """
+
+    __slots__ = ()
+
+    login = _async_method(impl.login_async)
+    verify_token = _async_method(impl.verify_token_async)
+    heartbeat = _async_method(impl.heartbeat_async)
+    websites = _async_method(impl.websites_async)
+    website_stats = _async_method(impl.website_stats_async)
+    active_users = _async_method(impl.active_users_async)
+    new_event = _async_method(impl.new_event_async)
+    new_events = _async_method(impl.new_events_async)
+    new_revenue_event = _async_method(impl.new_revenue_event_async)
+    new_page_view = _async_method(impl.new_page_view_async)
+
+    def _new_pool(self) -> httpx.AsyncClient:
+        return impl._new_async_client()
+
+    async def aclose(self) -> None:
+        """Close the client's connection pool. The client reopens one if it is used again."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.aclose()
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
@@ -0,0 +1,72 @@
+"""
+Pluggable JSON encoding for request bodies and decoding for responses.
+
+Internal module. The public switch is umami.set_json_codec(). Request
+bodies are encoded straight to bytes by the active codec in the _http_*
+seams, and responses are decoded from the raw response bytes, so httpx's
+own (stdlib) JSON handling is bypassed entirely. The stdlib codec is the
+default; orjson and msgspec are used only when installed and selected.
+"""
+
+import json
+from typing import Any
+
+
+class JsonCodec:
+    """
+    The standard-library codec, and the interface every codec implements.
+
+    Internal. encode() returns compact UTF-8 JSON bytes; decode() accepts
+    bytes (or str) and returns plain Python objects.
+    """
+
+    name = 'stdlib'
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+
+        self.encode = orjson.dumps  # type: ignore[method-assign]
+        self.decode = orjson.loads  # type: ignore[method-assign]
+
+
+class MsgspecCodec(JsonCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+
+        self.encode = msgspec.json.Encoder().encode  # type: ignore[method-assign]
+        self.decode = msgspec.json.Decoder().decode  # type: ignore[method-assign]
+
+
+_BACKENDS = {'stdlib': JsonCodec, 'orjson': OrjsonCodec, 'msgspec': MsgspecCodec}
+
+
+def make_codec(name: str) -> JsonCodec:
+    """
+    The codec called `name`. 'auto' picks the fastest one installed (orjson, then msgspec, then stdlib).
+
+    Raises ImportError, with an install hint, if a named third-party backend is not installed.
+    """
+    if name == 'auto':
+        for backend in (OrjsonCodec, MsgspecCodec):
+            try:
+                return backend()
+            except ImportError:
+                continue
+        return JsonCodec()
+
+    try:
+        return _BACKENDS[name]()
+    except ImportError as e:
+        raise ImportError(f'The {name} JSON codec needs the {name} package: pip install umami-analytics[{name}]') from e
@@ -0,0 +1,38 @@
+"""
+Request-body compression for the ingestion endpoints.
+
+Internal module. The public switch is umami.set_compression(). gzip comes
+from the standard library. zstd uses compression.zstd on Python 3.14+ and
+the zstandard package before that; it is only loaded when selected.
+"""
+
+import gzip
+from typing import Callable, Optional
+
+Compressor = Callable[[bytes], bytes]
+
+
+def make_compressor(algorithm: str, level: Optional[int] = None) -> Compressor:
+    """
+    A function that compresses a request body with `algorithm` ('gzip' or 'zstd') at `level`.
+
+    Raises ImportError, with an install hint, if zstd is requested and no zstd library is available.
+    """
+    if algorithm == 'gzip':
+        gzip_level = 6 if level is None else level
+        # mtime=0 keeps the output deterministic (no timestamp in the header).
+        return lambda data: gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+    zstd_level = 3 if level is None else level
+    try:
+        from compression import zstd  # type: ignore[import-not-found]  # Python 3.14+
+
+        return lambda data: zstd.compress(data, level=zstd_level)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError('zstd compression needs the zstandard package: pip install umami-analytics[zstd]') from e
+
+    return zstandard.ZstdCompressor(level=zstd_level).compress
@@ -0,0 +1,93 @@
+"""
+Immutable connection settings with their URLs and headers pre-built.
+
+Internal module. A Config is one complete set of "where and as whom": the
+self-hosted URL base and login token, or the Umami Cloud API key and region,
+plus the default website and hostname. The endpoint URLs and request headers
+that follow from them are built once, when the Config is created, instead of
+on every call. The module-level functions use a Config snapshot of the
+set_*() globals, rebuilt only when one of them changes; each umami.Client
+holds its own. A Scope holds the per-context defaults set by umami.scoped().
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+from umami import urls
+
+CLOUD_DATA_BASE = 'https://api.umami.is/v1'  # data/management API (x-umami-api-key)
+CLOUD_SEND_BASE = 'https://cloud.umami.is/api'  # public ingestion (/send, /batch)
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Config:
+    """
+    One set of connection settings. Immutable: use dataclasses.replace() to derive a changed copy.
+
+    Internal. The headers are shared dicts; treat them as read-only and copy
+    ({**headers, ...}) to add to them.
+    """
+
+    url_base: Optional[str] = None
+    auth_token: Optional[str] = None
+    api_key: Optional[str] = None
+    cloud_region: Optional[str] = None  # None | 'us' | 'eu'
+    website_id: Optional[str] = None
+    hostname: Optional[str] = None
+    event_user_agent: str
+    user_agent: str
+
+    # Derived from the settings above in __post_init__().
+    send_url: str = field(init=False)
+    batch_url: str = field(init=False)
+    send_headers: dict = field(init=False)
+    data_headers: dict = field(init=False)
+    _data_base: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        cloud = self.is_cloud
+        region = f'/{self.cloud_region}' if self.cloud_region else ''
+        send_headers = {'User-Agent': self.event_user_agent}
+        data_headers = {'User-Agent': self.user_agent}
+        if cloud:
+            data_headers['x-umami-api-key'] = self.api_key  # type: ignore[assignment]
+        else:
+            # Self-hosted ingestion is authenticated too (the header may say 'Bearer None' before login()).
+            send_headers['Authorization'] = data_headers['Authorization'] = f'Bearer {self.auth_token}'
+
+        derived = {
+            'send_url': f'{CLOUD_SEND_BASE}/send' if cloud else f'{self.url_base}{urls.events}',
+            'batch_url': f'{CLOUD_SEND_BASE}/batch' if cloud else f'{self.url_base}{urls.batch}',
+            'send_headers': send_headers,
+            'data_headers': data_headers,
+            '_data_base': f'{CLOUD_DATA_BASE}{region}' if cloud else f'{self.url_base}',
+        }
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
+
+    @property
+    def is_cloud(self) -> bool:
+        return self.api_key is not None
+
+    def data_url(self, path_const: str, suffix: str = '') -> str:
+        """
+        Full URL for a data/auth endpoint.
+        `path_const` is a value from urls.py (e.g. urls.websites == '/api/websites').
+        """
+        if self.is_cloud and path_const.startswith('/api'):
+            path_const = path_const[4:]  # '/api/x' -> '/x' under .../v1[/region]
+        return f'{self._data_base}{path_const}{suffix}'
+
+
+@dataclass(frozen=True, slots=True)
+class Scope:
+    """
+    The defaults set by umami.scoped() for the current context.
+
+    Internal. A None field falls through to the enclosing scope, then to the
+    configured default. distinct_id is already normalized.
+    """
+
+    website_id: Optional[str] = None
+    hostname: Optional[str] = None
+    distinct_id: Optional[str] = None
@@ -0,0 +1,132 @@
+"""
+In-process aggregation of counter events.
+
+Internal module. The public switches are umami.increment(),
+umami.start_counters(), umami.flush_counters() and umami.stop_counters().
+increment() only adds to a count in memory; a daemon thread sends one event
+per distinct counter every flush_interval seconds, with the total in its
+custom_data, so a hot counter costs one request per interval instead of one
+per call.
+"""
+
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+log = logging.getLogger('umami')
+
+# What makes two increment() calls the same counter:
+# (event_name, url, hostname, website_id, custom_data as canonical JSON).
+Key = tuple[str, str, str, str, str]
+# Pending counts: key -> (custom_data, count).
+Counts = dict[Key, tuple[dict, int]]
+
+
+class CounterAggregator:
+    """
+    Counts per key, handed to `send` by a daemon thread every flush_interval seconds.
+
+    Internal. flush_async() sends with `send_async` on the caller's event
+    loop instead. Thread-safe; add() only holds the lock for a dict update. At
+    most max_keys distinct counters are pending at once: increments of a new
+    key beyond that are dropped and counted in `dropped`, so memory stays
+    bounded even if a caller puts unique values in custom_data. Any
+    exception raised by `send` is logged and its counts are counted in
+    `failed`, never propagated.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Counts], Any],
+        send_async: Callable[[Counts], Awaitable[Any]],
+        flush_interval: float = 10.0,
+        max_keys: int = 10_000,
+    ):
+        self._send = send
+        self._send_async = send_async
+        self._flush_interval = flush_interval
+        self._max_keys = max_keys
+        self._counts: Counts = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='umami-counters', daemon=True)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.in_flight = 0  # counter events being sent right now
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def respawn(self) -> 'CounterAggregator':
+        """A new, unstarted aggregator with the same settings and no counts (for a forked child)."""
+        return CounterAggregator(self._send, self._send_async, self._flush_interval, self._max_keys)
+
+    def add(self, key: Key, custom_data: dict, n: int) -> bool:
+        """Add `n` to the counter `key`. Returns False (and counts it) if it is new and max_keys are pending."""
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is not None:
+                self._counts[key] = (entry[0], entry[1] + n)
+                return True
+            if len(self._counts) >= self._max_keys:
+                self.dropped += n
+                return False
+            self._counts[key] = (custom_data, n)
+            return True
+
+    def drain(self) -> Counts:
+        """Take every pending count, leaving the aggregator empty."""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        return counts
+
+    def flush(self) -> None:
+        """Send the pending counts now, on the calling thread."""
+        counts = self.drain()
+        if not counts:
+            return
+        total = sum(n for _, n in counts.values())
+        self.in_flight = len(counts)
+        # noinspection PyBroadException
+        try:
+            self._send(counts)
+            self.sent += total
+        except Exception:
+            self.failed += total
+            log.warning('umami: sending %d counter(s) failed.', len(counts), exc_info=True)
+        finally:
+            self.in_flight = 0
+
+    async def flush_async(self) -> None:
+        """Async twin of flush()."""
+        counts = self.drain()
+        if not counts:
+            return
+        total = sum(n for _, n in counts.values())
+        # noinspection PyBroadException
+        try:
+            await self._send_async(counts)
+            self.sent += total
+        except Exception:
+            self.failed += total
+            log.warning('umami: sending %d counter(s) failed.', len(counts), exc_info=True)
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop the thread after it sends whatever is pending.
+
+        Waits up to `timeout` seconds (forever if None). Returns True if the
+        thread finished in time.
+        """
+        self._stopped.set()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._flush_interval):
+            self.flush()
+        self.flush()
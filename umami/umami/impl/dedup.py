@@ -0,0 +1,110 @@
+"""
+Idempotency keys for events and a window of keys already delivered.
+
+Internal module. The public switches are umami.set_dedup_window() and
+umami.clear_dedup_window(). While a window is set, every event body gets a
+random key under KEY_FIELD when it is built, before it is queued, spooled,
+or sent. Each POST of events drops the bodies whose key is already in the
+window and adds the rest once the server accepts them, so a send path (the
+background sender, the async batcher, a spool replay) never sends an event
+that another path already delivered while its key is remembered.
+
+Umami itself ignores the key, so a request the server may have stored
+before failing (a read timeout, a dropped connection, a 5xx) can't be
+safely sent again. Under a window such failures are not retried, and their
+keys are added as if delivered, so no spool replay sends them either: those
+events are delivered at most once, and may be lost. Only failures that
+certainly never reached the server (a refused connection, 429) are retried
+or spooled.
+
+The key never reaches Umami inside the event: it is removed from the body
+on the way out. A lone /api/send carries it as an Idempotency-Key header
+instead, for proxies or relays that deduplicate on it.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+# The body field that holds an event's key between being built and being sent (it is stored in the spool too).
+KEY_FIELD = 'idempotency_key'
+
+
+def new_key() -> str:
+    return uuid.uuid4().hex
+
+
+def strip_key(body: dict) -> dict:
+    """`body` as it goes on the wire: a copy without KEY_FIELD, or `body` itself if it has none."""
+    if KEY_FIELD not in body:
+        return body
+    body = dict(body)
+    del body[KEY_FIELD]
+    return body
+
+
+class DedupWindow:
+    """
+    The keys of the last `max_keys` delivered events, each remembered for `ttl` seconds.
+
+    Internal. An OrderedDict of key -> time added, oldest first, so lookups,
+    inserts, and evictions are all O(1) and memory is bounded by max_keys.
+    Thread-safe; the lock is only held for dict operations.
+    """
+
+    def __init__(self, max_keys: int = 10_000, ttl: float = 3600.0):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.skipped = 0
+        self._keys: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return key in self._keys
+
+    def unsent(self, bodies: list[dict]) -> list[dict]:
+        """
+        The bodies whose key has not been delivered yet, each key once (bodies without a key are all kept).
+
+        Counts the rest in `skipped`.
+        """
+        keep, keys = [], set()
+        with self._lock:
+            self._expire(time.monotonic())
+            for body in bodies:
+                key = body.get(KEY_FIELD)
+                if key is None:
+                    keep.append(body)
+                elif key not in self._keys and key not in keys:
+                    keys.add(key)
+                    keep.append(body)
+            self.skipped += len(bodies) - len(keep)
+        return keep
+
+    def add(self, bodies: list[dict]) -> None:
+        """Remember the keys of delivered bodies, evicting the oldest keys beyond max_keys."""
+        now = time.monotonic()
+        with self._lock:
+            for body in bodies:
+                key: Optional[str] = body.get(KEY_FIELD)
+                if key is not None:
+                    self._keys[key] = now
+                    self._keys.move_to_end(key)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+    def _expire(self, now: float) -> None:
+        # Oldest first, so stop at the first key that is still fresh.
+        cutoff = now - self.ttl
+        while self._keys:
+            key, added = next(iter(self._keys.items()))
+            if added > cutoff:
+                return
+            del self._keys[key]
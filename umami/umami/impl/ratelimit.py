@@ -0,0 +1,78 @@
+"""
+Client-side token-bucket rate limiting.
+
+Internal module. The public switches are umami.set_rate_limits() and
+umami.clear_rate_limits(). There is one bucket for ingestion traffic
+(/api/send and /api/batch) and one for everything else (the data,
+authentication, and heartbeat calls). Each bucket is shared by every
+thread and event loop in the process, and every HTTP attempt, retries
+included, takes one token from its bucket in the _http_* seams. A call
+with a per-call timeout never waits past it for a token.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, with bursts of up to `burst`.
+
+    Internal. Thread-safe; the lock is only held for arithmetic, so it is also
+    safe to use from event loops. A caller that finds the bucket empty takes
+    its token on credit (the balance goes negative) and waits until that
+    credit is paid off, so waiting callers are served roughly in arrival
+    order and together never exceed `rate`.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def has_token(self) -> bool:
+        """Whether a request could be sent right now without waiting (takes nothing)."""
+        with self._lock:
+            self._refill()
+            return self._tokens >= 1
+
+    def reserve(self, deadline: Optional[float] = None) -> Optional[float]:
+        """
+        Take one token and return how many seconds the caller must wait before using it.
+
+        Returns None, taking nothing, if that wait would run past `deadline` (a time.monotonic() value).
+        """
+        with self._lock:
+            self._refill()
+            delay = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if deadline is not None and delay and self._updated + delay > deadline:
+                return None
+            self._tokens -= 1
+            return delay
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Wait for a token. Returns False at once, without a token, if it would not come before `deadline`."""
+        delay = self.reserve(deadline)
+        if delay is None:
+            return False
+        if delay:
+            time.sleep(delay)
+        return True
+
+    async def acquire_async(self, deadline: Optional[float] = None) -> bool:
+        """Async counterpart of acquire()."""
+        delay = self.reserve(deadline)
+        if delay is None:
+            return False
+        if delay:
+            await asyncio.sleep(delay)
+        return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
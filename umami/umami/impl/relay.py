@@ -0,0 +1,65 @@
+"""
+The worker side of the local relay (see umami.relay).
+
+Internal module. The public switch is umami.configure(transport='relay',
+socket=...). While it is on, every event is encoded as one datagram and
+handed to the relay process with a single non-blocking sendto(); the relay
+does the HTTP, batching, retries, and spooling. Only the event body and its
+User-Agent travel over the socket, never credentials.
+"""
+
+import logging
+import socket
+import threading
+from typing import Union
+
+log = logging.getLogger('umami')
+
+# A Unix datagram socket path, or a (host, port) UDP address.
+Address = Union[str, tuple[str, int]]
+
+# Datagrams larger than this are refused by the relay (UDP's own limit is 65,507 bytes).
+MAX_DATAGRAM = 256 * 1024
+
+
+def open_socket(address: Address) -> socket.socket:
+    """A datagram socket of the right family for `address` (not bound or connected)."""
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    family = socket.getaddrinfo(address[0], address[1], type=socket.SOCK_DGRAM)[0][0]
+    return socket.socket(family, socket.SOCK_DGRAM)
+
+
+class RelayClient:
+    """
+    Sends encoded events to the relay at `address`, never blocking the caller.
+
+    Internal. If the relay is not running, its socket buffer is full, or a
+    datagram is too large, the event is dropped and counted in `dropped`;
+    the first drop of a run of failures is logged.
+    """
+
+    def __init__(self, address: Address):
+        self.address = address
+        self.dropped = 0
+        self._sock = open_socket(address)
+        self._sock.setblocking(False)
+        self._lock = threading.Lock()
+        self._failing = False
+
+    def send(self, datagram: bytes) -> bool:
+        try:
+            self._sock.sendto(datagram, self.address)
+        except OSError as e:
+            with self._lock:
+                self.dropped += 1
+                first, self._failing = not self._failing, True
+            if first:
+                log.warning('umami: could not hand an event to the relay at %r (%s); dropping it.', self.address, e)
+            return False
+
+        self._failing = False
+        return True
+
+    def close(self) -> None:
+        self._sock.close()
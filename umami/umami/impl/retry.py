@@ -0,0 +1,192 @@
+"""
+Retries with exponential backoff, full jitter, Retry-After, and a retry budget.
+
+Internal module. The public switch is umami.set_retry_policy(). Every HTTP
+call the SDK makes goes through one of the _http_* seams in umami.impl, and
+each seam runs its request through RetryPolicy.run() (or run_async()), so
+the sync and async twins of every function retry the same way.
+
+A request is retried when it fails to connect or times out (an
+httpx.TransportError), or when the server answers 429 or any 5xx. Every
+other response is returned to the caller unchanged, which then calls
+raise_for_status() as before. A caller that must not send a request twice
+(events under a dedup window) passes retry_ambiguous=False, and then only
+failures that certainly never reached the server are retried.
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+import httpx2 as httpx
+
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def may_have_been_processed(resp: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+    """
+    Whether a failed attempt may have been processed by the server anyway, so trying it again could duplicate it.
+
+    Only a failed connection (or no free connection in the pool) and 429 Too Many Requests certainly
+    weren't; after a read timeout, a dropped connection or a 5xx the server may have stored the request.
+    """
+    if error is not None:
+        return not isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    return resp is not None and resp.status_code >= 500
+
+
+def retry_after_seconds(resp: httpx.Response) -> Optional[float]:
+    """The response's Retry-After header in seconds (either delay-seconds or an HTTP date), or None."""
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryBudget:
+    """
+    A process-wide allowance of retries, shared by every thread and event loop.
+
+    Internal. Each first attempt earns `ratio` of a retry and each retry
+    spends one whole retry, with at most `reserve` saved up. In normal
+    operation the budget stays full, so isolated failures are retried
+    freely; during an outage retries quickly fall to `ratio` times the
+    request rate, so retrying can never multiply the load on a server that
+    is already struggling.
+    """
+
+    def __init__(self, ratio: float = 0.1, reserve: float = 10.0):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.reserve)
+
+    def withdraw(self) -> bool:
+        """Spend one retry. Returns False (and spends nothing) if the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    How many times, and how long apart, a failed request is tried again.
+
+    Internal. An attempt n (1-based) that fails is retried after a random
+    delay between 0 and min(backoff_max, backoff_base * 2 ** (n - 1))
+    seconds ("full jitter", so clients that failed together don't retry
+    together). If the server sent Retry-After, that delay is used instead;
+    when it is longer than backoff_max the request is not retried at all,
+    rather than retried sooner than the server asked. max_attempts=1
+    disables retries.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 1,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        budget: Optional[RetryBudget] = None,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def run(
+        self, send: Callable[[], httpx.Response], deadline: Optional[float] = None, retry_ambiguous: bool = True
+    ) -> httpx.Response:
+        """
+        Call `send` until it succeeds or the policy gives up; then return its response or raise its error.
+
+        No retry is started that could not finish its wait before `deadline` (a time.monotonic() value).
+        With retry_ambiguous=False, a failure that may_have_been_processed() is not retried.
+        """
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            resp, error = None, None
+            try:
+                resp = send()
+            except httpx.TransportError as e:
+                error = e
+
+            if not retry_ambiguous and may_have_been_processed(resp, error):
+                delay = None
+            else:
+                delay = self._retry_delay(attempt, resp, deadline)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return resp  # type: ignore[return-value]
+            time.sleep(delay)
+            attempt += 1
+
+    async def run_async(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        deadline: Optional[float] = None,
+        retry_ambiguous: bool = True,
+    ) -> httpx.Response:
+        """Async twin of run()."""
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            resp, error = None, None
+            try:
+                resp = await send()
+            except httpx.TransportError as e:
+                error = e
+
+            if not retry_ambiguous and may_have_been_processed(resp, error):
+                delay = None
+            else:
+                delay = self._retry_delay(attempt, resp, deadline)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return resp  # type: ignore[return-value]
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(
+        self, attempt: int, resp: Optional[httpx.Response], deadline: Optional[float] = None
+    ) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to stop here. `resp` is None after a transport error."""
+        if attempt >= self.max_attempts:
+            return None
+        if resp is not None and not is_retryable_status(resp.status_code):
+            return None
+
+        delay = retry_after_seconds(resp) if resp is not None else None
+        if delay is None:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        elif delay > self.backoff_max:
+            return None
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+
+        if not self.budget.withdraw():
+            return None
+        return delay
@@ -0,0 +1,61 @@
+"""
+Client-side sampling of high-volume events.
+
+Internal module. The public switches are umami.set_sampling() and
+umami.clear_sampling(). A Sampler picks the rate that applies to an event
+and decides whether to keep it. Events that are dropped never get a
+payload built, let alone a request sent.
+"""
+
+import random
+import zlib
+from typing import Optional
+
+
+class Sampler:
+    """
+    Per-event-name and per-URL-prefix sample rates.
+
+    Internal. An event's rate is its event_name's entry in `event_rates` if
+    it has one, else the entry for the longest prefix in `url_rates` that
+    its url starts with, else `default_rate`. Page views have no event name,
+    so only url_rates and default_rate apply to them.
+
+    Events with a distinct_id are sampled deterministically: the id is
+    hashed into [0, 1), and the event is kept if that falls below the rate.
+    A given user is therefore either kept or dropped for every event at
+    that rate, so sampled journeys stay whole. Events without a distinct_id
+    are sampled at random.
+    """
+
+    def __init__(
+        self,
+        event_rates: Optional[dict[str, float]] = None,
+        url_rates: Optional[dict[str, float]] = None,
+        default_rate: float = 1.0,
+    ):
+        self.event_rates = dict(event_rates or {})
+        # Longest prefix first, so the most specific rule wins.
+        self.url_rates = sorted((url_rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.default_rate = default_rate
+
+    def rate_for(self, event_name: Optional[str], url: str) -> float:
+        if event_name is not None and event_name in self.event_rates:
+            return self.event_rates[event_name]
+        for prefix, rate in self.url_rates:
+            if url.startswith(prefix):
+                return rate
+        return self.default_rate
+
+    def sample(self, event_name: Optional[str], url: str, distinct_id: Optional[str]) -> Optional[float]:
+        """The rate the event was kept at, or None if it should be dropped."""
+        rate = self.rate_for(event_name, url)
+        if rate >= 1.0:
+            return 1.0
+        if rate <= 0.0:
+            return None
+        if distinct_id:
+            point = zlib.crc32(distinct_id.encode('utf-8')) / 0x1_0000_0000
+        else:
+            point = random.random()
+        return rate if point < rate else None
@@ -0,0 +1,155 @@
+"""
+Durable on-disk spool for events that could not be delivered.
+
+Internal module. The public switches are umami.start_spool() and
+umami.stop_spool(). While a spool is active, an event whose send fails
+because Umami is unreachable or overloaded (a connection error, a 5xx, or a
+429) is written to a SQLite file instead of being lost, and a SpoolDrainer
+thread replays it once heartbeat() succeeds again.
+
+Only the event body and its User-Agent are stored. Credentials are never
+written to disk; the auth headers are rebuilt when the event is replayed.
+"""
+
+import json
+import logging
+import random
+import sqlite3
+import threading
+from typing import Any, Callable, Optional
+
+log = logging.getLogger('umami')
+
+
+class Spool:
+    """
+    A bounded FIFO of event bodies in a SQLite file, safe to share between threads.
+
+    Internal. Rows survive process restarts: reopening the same path picks up
+    whatever was left, and processes that share the file (a forked child
+    reopens it on its own connection) see each other's rows, so the length
+    is always read from the file rather than kept in memory. Once max_events
+    rows are stored, new events are dropped (and counted in `dropped`) so a
+    long outage can't fill the disk.
+    """
+
+    def __init__(self, path: str, max_events: int = 100_000):
+        self.path = path
+        self.max_events = max_events
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT, user_agent TEXT)'
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._stored()
+
+    def _stored(self) -> int:
+        """Rows in the file, written by any process (lock held)."""
+        return self._db.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    def add(self, bodies: list[dict], user_agent: str) -> int:
+        """Append bodies that share one User-Agent. Returns how many were stored."""
+        with self._lock:
+            room = max(self.max_events - self._stored(), 0)
+            keep = bodies[:room]
+            self.dropped += len(bodies) - len(keep)
+            if keep:
+                self._db.executemany(
+                    'INSERT INTO events (body, user_agent) VALUES (?, ?)',
+                    [(json.dumps(body), user_agent) for body in keep],
+                )
+            return len(keep)
+
+    def peek(self, limit: int) -> list[tuple[int, dict, str]]:
+        """The oldest `limit` rows as (id, body, user_agent), without removing them."""
+        with self._lock:
+            rows = self._db.execute('SELECT id, body, user_agent FROM events ORDER BY id LIMIT ?', (limit,)).fetchall()
+        return [(row_id, json.loads(body), user_agent) for row_id, body, user_agent in rows]
+
+    def remove(self, ids: list[int]) -> None:
+        with self._lock:
+            self._db.executemany('DELETE FROM events WHERE id = ?', [(row_id,) for row_id in ids])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class SpoolDrainer:
+    """
+    A daemon thread that replays a Spool once the server is healthy again.
+
+    Internal. While the spool file holds rows (from this process or any other
+    sharing it), the drainer calls `is_healthy`
+    every check_interval seconds. When it returns True the drainer first
+    waits a random fraction of check_interval, so many processes recovering
+    from the same outage don't all reconnect at once, then replays the spool
+    oldest-first in batches of batch_size. It paces itself to replay_rate
+    events per second so a backlog can't turn into a thundering herd. `send`
+    is called with (bodies, user_agent); a row is removed only after its
+    send succeeds, and any failure sends the drainer back to health checks.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        send: Callable[[list[dict], str], Any],
+        is_healthy: Callable[[], bool],
+        replay_rate: float = 100.0,
+        batch_size: int = 100,
+        check_interval: float = 10.0,
+    ):
+        self._spool = spool
+        self._send = send
+        self._is_healthy = is_healthy
+        self._replay_rate = replay_rate
+        self._batch_size = batch_size
+        self._check_interval = check_interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='umami-spool-drainer', daemon=True)
+        self.replayed = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        self._stopped.set()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._check_interval):
+            # noinspection PyBroadException
+            try:
+                if len(self._spool) and self._is_healthy():
+                    if self._stopped.wait(random.uniform(0, self._check_interval)):
+                        return
+                    self._replay()
+            except Exception:
+                log.warning('umami: replaying the event spool failed.', exc_info=True)
+
+    def _replay(self) -> None:
+        while not self._stopped.is_set():
+            rows = self._spool.peek(self._batch_size)
+            if not rows:
+                return
+
+            by_agent: dict[str, tuple[list[int], list[dict]]] = {}
+            for row_id, body, user_agent in rows:
+                ids, bodies = by_agent.setdefault(user_agent, ([], []))
+                ids.append(row_id)
+                bodies.append(body)
+
+            for user_agent, (ids, bodies) in by_agent.items():
+                self._send(bodies, user_agent)  # raises on failure; _run goes back to health checks
+                self._spool.remove(ids)
+                self.replayed += len(ids)
+
+            if self._stopped.wait(len(rows) / self._replay_rate):
+                return
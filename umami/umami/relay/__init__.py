@@ -0,0 +1,183 @@
+"""
+A local relay that takes sending analytics off your web workers' critical path.
+
+Run one relay per host, next to your application:
+
+    python -m umami.relay --socket /run/umami/relay.sock --url https://umami.example.com
+
+then point the workers at it:
+
+    umami.configure(transport='relay', socket='/run/umami/relay.sock')
+
+Each event a worker sends becomes one non-blocking sendto() on a Unix
+datagram socket (or UDP with --udp HOST:PORT). The relay queues what it
+receives on the SDK's background sender, which posts it to Umami in
+/api/batch requests with retries and, with --spool, a durable on-disk spool
+for outages. Workers never wait on Umami, and a slow or unavailable Umami
+never backs up into your request handlers.
+
+Each datagram is a JSON object {"ua": <User-Agent>, "event": <an /api/send
+body>}. Workers don't send credentials: the relay authenticates with its
+own settings (--url, or --cloud-api-key for Umami Cloud). Run
+`python -m umami.relay --help` for every option.
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+from typing import Any, Optional
+
+import umami
+from umami import impl
+from umami.impl.relay import MAX_DATAGRAM, Address, open_socket
+
+log = logging.getLogger('umami.relay')
+
+__all__ = ['Relay', 'run']
+
+
+class Relay:
+    """
+    Receives event datagrams on `address` and queues them on the background sender.
+
+    The background sender must be running (run() starts it). A Unix socket
+    path is created on bind and removed by close(); a stale socket file left
+    by a relay that crashed is replaced.
+
+    Args:
+        address: A Unix socket path or a (host, port) tuple for UDP.
+        receive_buffer: Bytes the kernel may hold for the relay, which
+            absorbs bursts while it is busy. Defaults to 4 MB (the OS may
+            cap it lower).
+    """
+
+    def __init__(self, address: Address, receive_buffer: int = 4 * 1024 * 1024):
+        self.address = address
+        self.received = 0
+        self.rejected = 0
+        self.dropped = 0
+        self._stopped = threading.Event()
+        self._sock = open_socket(address)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+        self._sock.bind(address)
+        if not isinstance(address, str):
+            self.address = self._sock.getsockname()[:2]  # the real port when bound to port 0
+        # Wake up regularly to notice stop().
+        self._sock.settimeout(0.5)
+
+    def serve_forever(self) -> None:
+        """Receive and queue events until stop() is called."""
+        while not self._stopped.is_set():
+            try:
+                datagram = self._sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._stopped.is_set():
+                    return
+                raise
+            self.handle(datagram)
+
+    def handle(self, datagram: bytes) -> bool:
+        """
+        Queue the event in one datagram. Returns False if it was not queued.
+
+        Datagrams that are not valid events are counted in `rejected`; any other error while queueing one is
+        logged and counted in `dropped`, so that one bad datagram never stops serve_forever().
+        """
+        sender = impl._background
+        if sender is None:
+            raise RuntimeError('The relay needs the background sender; start it with umami.start_background_sender().')
+
+        event, ua = self._decode(datagram)
+        if event is None:
+            self.rejected += 1
+            log.warning('umami relay: ignoring a datagram that is not an event (%d bytes).', len(datagram))
+            return False
+
+        self.received += 1
+        try:
+            return sender.submit(event, impl._send_headers(ua=ua))
+        except Exception:
+            self.dropped += 1
+            log.exception('umami relay: dropped an event that could not be queued.')
+            return False
+
+    def stop(self) -> None:
+        """Make serve_forever() return (safe to call from a signal handler or another thread)."""
+        self._stopped.set()
+
+    def close(self) -> None:
+        self._sock.close()
+        if isinstance(self.address, str):
+            try:
+                os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _decode(datagram: bytes) -> tuple[Optional[dict], str]:
+        try:
+            message: Any = impl.json_codec.decode(datagram)
+        except Exception:  # each codec raises its own error type for bad input
+            return None, ''
+        if not isinstance(message, dict):
+            return None, ''
+        event, ua = message.get('event'), message.get('ua')
+        if not isinstance(event, dict) or not isinstance(event.get('payload'), dict) or not isinstance(ua, str):
+            return None, ''
+        return event, ua
+
+
+def run(
+    address: Address,
+    batch_size: int = 100,
+    flush_interval: float = 1.0,
+    max_queue_size: int = 100_000,
+    retries: int = 5,
+    spool: Optional[str] = None,
+    drain_timeout: float = 10.0,
+) -> None:
+    """
+    Run a relay on `address` until SIGTERM or SIGINT, then send what is queued and exit.
+
+    Configure where events go first (umami.set_url_base() or
+    umami.set_cloud_api_key()). The process-wide SDK settings are changed:
+    the retry policy, the background sender, and the spool.
+
+    Args:
+        address: A Unix socket path or a (host, port) tuple for UDP.
+        batch_size: Most events per /api/batch request. Defaults to 100.
+        flush_interval: Most seconds an event waits for its batch to fill.
+            Defaults to 1.0.
+        max_queue_size: Most events waiting to be sent; more are dropped.
+            Defaults to 100,000.
+        retries: Attempts per request (see umami.set_retry_policy()).
+            Defaults to 5.
+        spool: Optional path of a spool file for events that could not be
+            delivered (see umami.start_spool()).
+        drain_timeout: Most seconds to spend sending queued events on
+            shutdown. Defaults to 10.0.
+    """
+    umami.set_retry_policy(max_attempts=retries)
+    if spool:
+        umami.start_spool(spool)
+    umami.start_background_sender(max_queue_size=max_queue_size, batch_size=batch_size, flush_interval=flush_interval)
+
+    relay = Relay(address)
+    previous = {sig: signal.signal(sig, lambda *_: relay.stop()) for sig in (signal.SIGTERM, signal.SIGINT)}
+    log.info('umami relay: listening on %r.', relay.address)
+    try:
+        relay.serve_forever()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        relay.close()
+        if not umami.stop_background_sender(drain_timeout):
+            log.warning('umami relay: gave up sending queued events after %s seconds.', drain_timeout)
+        umami.stop_spool()
+        log.info('umami relay: stopped after receiving %d event(s).', relay.received)
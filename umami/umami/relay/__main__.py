@@ -0,0 +1,87 @@
+"""
+Command line for the relay: python -m umami.relay --help
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Optional
+
+import umami
+from umami.impl.relay import Address
+from umami.relay import run
+
+
+def parse_udp(value: str) -> Address:
+    host, sep, port = value.rpartition(':')
+    if not sep or not port.isdigit():
+        raise argparse.ArgumentTypeError(f'expected HOST:PORT, got {value!r}')
+    return host.strip('[]') or '127.0.0.1', int(port)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m umami.relay',
+        description='Forward analytics events from local processes to Umami.',
+    )
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument('--socket', help='Unix datagram socket path to listen on.')
+    where.add_argument('--udp', type=parse_udp, metavar='HOST:PORT', help='UDP address to listen on instead.')
+
+    parser.add_argument(
+        '--url', default=os.environ.get('UMAMI_URL'), help='Self-hosted Umami base URL (env: UMAMI_URL).'
+    )
+    parser.add_argument(
+        '--cloud-api-key',
+        default=os.environ.get('UMAMI_CLOUD_API_KEY'),
+        help='Umami Cloud API key, instead of --url (env: UMAMI_CLOUD_API_KEY).',
+    )
+    parser.add_argument(
+        '--cloud-region',
+        choices=['us', 'eu'],
+        default=os.environ.get('UMAMI_CLOUD_REGION'),
+        help='Umami Cloud region (env: UMAMI_CLOUD_REGION).',
+    )
+    parser.add_argument('--batch-size', type=int, default=100, help='Most events per request (default 100).')
+    parser.add_argument(
+        '--flush-interval', type=float, default=1.0, help='Most seconds an event waits for a batch (default 1.0).'
+    )
+    parser.add_argument(
+        '--max-queue-size', type=int, default=100_000, help='Most events waiting to be sent (default 100000).'
+    )
+    parser.add_argument('--retries', type=int, default=5, help='Attempts per request (default 5).')
+    parser.add_argument('--spool', help='Spool file for events that could not be delivered.')
+    parser.add_argument(
+        '--drain-timeout', type=float, default=10.0, help='Most seconds to send queued events at exit (default 10).'
+    )
+    parser.add_argument('--log-level', default='INFO', help='Logging level (default INFO).')
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if bool(args.url) == bool(args.cloud_api_key):
+        parser.error('give exactly one of --url or --cloud-api-key')
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    if args.cloud_api_key:
+        umami.set_cloud_api_key(args.cloud_api_key, region=args.cloud_region)
+    else:
+        umami.set_url_base(args.url)
+
+    run(
+        args.socket or args.udp,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        max_queue_size=args.max_queue_size,
+        retries=args.retries,
+        spool=args.spool,
+        drain_timeout=args.drain_timeout,
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
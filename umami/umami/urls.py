@@ -1,6 +1,7 @@
 login = '/api/auth/login'
 websites = '/api/websites'
 events = '/api/send'
+batch = '/api/batch'  # many /api/send bodies in one request
 verify = '/api/auth/verify'
 heartbeat = '/api/heartbeat'
 me = '/api/me'  # current user; used to validate a Cloud API key in verify_token